@@ -0,0 +1,106 @@
+// rdiffweb, A web interface to rdiff-backup repositories
+// Copyright (C) 2026 rdiffweb contributors
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+/**
+ * Load the next entries of a folder on demand from the browse JSON endpoint
+ * and append them to the table.
+ */
+$(document).ready(function () {
+
+    function el(tag, attrs, ...children) {
+        const node = document.createElement(tag);
+        for (const [key, value] of Object.entries(attrs || {})) {
+            node.setAttribute(key, value);
+        }
+        node.append(...children);
+        return node;
+    }
+
+    function createRow(entry, labels, asOf) {
+        const filesize = $.fn.dataTable.render.filesize().display;
+        const datetime = $.fn.dataTable.render.datetime().display;
+        // Name
+        const name = el('td', { 'data-search': entry.name, 'data-order': (entry.isdir ? 'dir-' : 'file-') + entry.name },
+            el('i', { class: 'bi ' + (entry.isdir ? 'bi-folder-fill' : 'bi-file-earmark'), 'aria-hidden': 'true' }),
+            ' ',
+            el('a', { href: entry.url || '#', title: entry.name },
+                el('span', { class: 'visually-hidden' }, entry.isdir ? labels.labelDir : labels.labelFile),
+                entry.name));
+        // Status
+        const status = el('td', { class: 'nowrap', 'data-order': entry.exists ? 'True' : 'False' },
+            entry.exists ?
+                el('span', { class: 'text-muted small' }, labels.labelActive) :
+                el('span', { class: 'badge bg-warning-subtle text-warning-emphasis border border-warning-subtle rounded-pill' }, labels.labelDeleted));
+        // Size
+        let size;
+        if (entry.isdir) {
+            const total = (entry.mirror_size || 0) + (entry.increments_size || 0);
+            size = el('td', { class: 'nowrap', 'data-search': '', 'data-order': total });
+            if (entry.mirror_size || entry.increments_size) {
+                size.append(filesize(entry.mirror_size || 0), ' ',
+                    el('span', { class: 'badge bg-secondary-subtle text-secondary border border-secondary-subtle ms-1 history-hint' },
+                        '+' + filesize(entry.increments_size || 0)));
+            } else {
+                size.append(el('span', { 'data-bs-toggle': 'tooltip', 'data-bs-original-title': labels.labelNotComputed }, '—'));
+            }
+        } else {
+            size = el('td', { class: 'nowrap', 'data-search': '', 'data-order': entry.size });
+            size.append(!entry.exists && !asOf ? '—' : filesize(entry.size));
+        }
+        // Versions
+        const versions = el('td', { 'data-search': '', 'data-order': entry.last_change_date ? rdwToDate(entry.last_change_date).getTime() / 1000 : '' });
+        if (entry.last_change_date) {
+            const link = el('a', { href: entry.history_url });
+            link.innerHTML = datetime(entry.last_change_date);
+            versions.append(link);
+        }
+        return el('tr', entry.exists ? {} : { class: 'table-light' }, name, status, size, versions);
+    }
+
+    document.querySelectorAll('a.rdw-browse-more[data-url]').forEach(function (link) {
+        const table = $(document.querySelector(link.dataset.target).querySelector('table.cf-datatable')).DataTable();
+        let url = new URL(link.dataset.url, window.location.href);
+        link.addEventListener('click', function (event) {
+            event.preventDefault();
+            if (link.classList.contains('disabled')) {
+                return;
+            }
+            link.classList.add('disabled');
+            fetch(url, { credentials: 'same-origin' })
+                .then((response) => (response.ok ? response.json() : Promise.reject(response.status)))
+                .then(function (json) {
+                    for (const entry of json.data) {
+                        table.row.add(createRow(entry, link.dataset, url.searchParams.has('date')));
+                    }
+                    table.draw(false);
+                    if (json.next) {
+                        url.searchParams.set('cursor', json.next);
+                        const href = new URL(link.href);
+                        href.searchParams.set('cursor', json.next);
+                        link.href = href;
+                        link.classList.remove('disabled');
+                    } else {
+                        link.remove();
+                    }
+                })
+                .catch(function (error) {
+                    // Fallback to the next page.
+                    console.warn('fail to load next entries', error);
+                    window.location.href = link.href;
+                });
+        });
+    });
+});
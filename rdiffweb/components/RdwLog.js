@@ -0,0 +1,60 @@
+// rdiffweb, A web interface to rdiff-backup repositories
+// Copyright (C) 2026 rdiffweb contributors
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+// Delay between two requests. Doubled every time nothing new is written.
+const RDW_LOG_MIN_DELAY = 5000;
+const RDW_LOG_MAX_DELAY = 60000;
+
+/**
+ * Follow log file being written by fetching new content periodically until
+ * the server reports the log is ended.
+ */
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('pre.rdw-log[data-follow]').forEach(function (pre) {
+        const code = pre.querySelector('code');
+        let offset = pre.dataset.offset;
+        let delay = RDW_LOG_MIN_DELAY;
+        const follow = function () {
+            const url = new URL(pre.dataset.follow, window.location.href);
+            url.searchParams.set('offset', offset);
+            fetch(url, { credentials: 'same-origin' })
+                .then((response) => (response.ok ? response.json() : Promise.reject(response.status)))
+                .then(function (json) {
+                    const atBottom = window.innerHeight + window.scrollY >= document.body.scrollHeight - 10;
+                    if (json.reset) {
+                        code.textContent = '';
+                    }
+                    if (json.data) {
+                        code.append(json.data);
+                        if (atBottom) {
+                            window.scrollTo(0, document.body.scrollHeight);
+                        }
+                    }
+                    offset = json.offset;
+                    if (json.ended) {
+                        return;
+                    }
+                    delay = json.data ? RDW_LOG_MIN_DELAY : Math.min(delay * 2, RDW_LOG_MAX_DELAY);
+                    setTimeout(follow, delay);
+                })
+                .catch(function (error) {
+                    // Stop following on error.
+                    console.warn('fail to follow log file', error);
+                });
+        };
+        setTimeout(follow, delay);
+    });
+});
@@ -85,11 +85,14 @@ _pages = [
     Page('browse', _('Files'), 'browse', 'bi-folder'),
     Page('history', _('History'), 'history', None, False, 'browse'),
     Page('restore', _('Restore'), 'restore', None, False, 'browse'),
+    Page('search', _('Search'), 'search', None, False, 'browse'),
     Page('insights', _('Insights'), 'graphs', 'bi-lightbulb'),
     Page('settings', _('Settings'), 'settings', 'bi-sliders'),
     # Insights
     Page('graphs', _('Statistics'), 'graphs', 'bi-bar-chart-line', True, 'insights'),
     Page('stats', _('File Changes'), 'stats', 'bi-clock-history', True, 'insights'),
+    Page('stats_diff', _('Compare Backups'), 'stats/diff', None, False, 'insights'),
+    Page('stats_deleted', _('Deleted Files'), 'stats/deleted', None, False, 'insights'),
     Page('logs', _('Engine Logs'), 'logs', 'bi-journal-text', True, 'insights'),
     Page('repo_activity', _('Audit logs'), 'activity', None, True, 'insights'),
     # Admin
@@ -98,6 +101,7 @@ _pages = [
     Page('admin_user_edit', _('Edit User'), 'admin/users/edit', None, False, 'admin_users'),
     Page('admin_user_new', _('Add User'), 'admin/users/new', None, False, 'admin_users'),
     Page('admin_repos', _('Repositories'), 'admin/repos', 'bi-archive-fill'),
+    Page('admin_errors', _('Backup Errors'), 'admin/errors', 'bi-exclamation-triangle'),
     Page('admin_session', _('User Sessions'), 'admin/session', 'bi-display'),
     Page('admin_activity', _('Activity'), 'admin/activity', 'bi-activity'),
     Page('admin_logs', _('System Logs'), 'admin/logs', 'bi-journal-text'),
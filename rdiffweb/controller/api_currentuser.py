@@ -142,7 +142,7 @@ class ApiCurrentUser:
             "mfa": u.lang,
             "role": u.role,
             "report_time_range": u.report_time_range,
-            "repos": [
+            "repos": (
                 {
                     # Database fields.
                     "name": repo_obj.name,
@@ -156,7 +156,7 @@ class ApiCurrentUser:
                     "encoding": repo_obj.encoding,
                 }
                 for repo_obj in u.repo_objs
-            ],
+            ),
         }
 
     @cherrypy.tools.required_scope(scope='all,write_user')
@@ -17,6 +17,7 @@
 import cherrypy
 
 from rdiffweb.controller.page_admin_activity import AdminActivityPage
+from rdiffweb.controller.page_admin_errors import AdminErrorsPage
 from rdiffweb.controller.page_admin_logs import AdminLogsPage
 from rdiffweb.controller.page_admin_repos import AdminReposPage
 from rdiffweb.controller.page_admin_session import AdminSessionPage
@@ -36,3 +37,4 @@ class AdminPage:
     sysinfo = AdminSysinfoPage()
     users = AdminUsersPage()
     activity = AdminActivityPage()
+    errors = AdminErrorsPage()
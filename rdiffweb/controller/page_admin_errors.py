@@ -0,0 +1,52 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import cherrypy
+
+from rdiffweb.core.model import ErrorLog, RepoObject, UserObject
+
+
+@cherrypy.tools.is_admin()
+class AdminErrorsPage:
+    """
+    Search errors reported by backups of all repositories.
+    """
+
+    @cherrypy.expose
+    @cherrypy.tools.jinja2(template="admin_errors.html")
+    def index(self):
+        return {}
+
+    @cherrypy.expose()
+    @cherrypy.tools.allow(methods=['GET'])
+    @cherrypy.tools.json_out()
+    @cherrypy.tools.datatables_out(search_columns=[ErrorLog.message, ErrorLog.path, RepoObject.repopath])
+    def data_json(self, **kwargs):
+        """
+        Return a page of errors recorded from the error_log of each backup.
+        """
+        return (
+            ErrorLog.query.join(RepoObject, RepoObject.id == ErrorLog.repoid)
+            .join(UserObject, UserObject.id == RepoObject.userid)
+            .with_entities(
+                ErrorLog.backup_date,
+                UserObject.username,
+                RepoObject.repopath,
+                ErrorLog.error_class,
+                ErrorLog.path,
+                ErrorLog.message,
+            )
+        )
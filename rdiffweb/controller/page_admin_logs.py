@@ -15,11 +15,12 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
-import subprocess
 
 import cherrypy
 from cherrypy.lib.static import serve_file
 
+from rdiffweb.core.librdiff import read_lines_from, tail_lines
+
 from . import validate_int
 
 
@@ -38,14 +39,6 @@ class AdminLogsPage:
             return_value['log_access_file'] = os.path.abspath(cfg.log_access_file)
         return return_value
 
-    def _tail(self, filename, limit, encoding='utf-8'):
-        """
-        Return a list of log files to be shown in admin area.
-        """
-        return subprocess.check_output(
-            ['tail', '-n', str(limit), filename], stderr=subprocess.STDOUT, encoding=encoding, errors='replace'
-        )
-
     @cherrypy.expose
     @cherrypy.tools.jinja2(template="admin_logs.html")
     def index(self, name=None, limit='2000'):
@@ -60,11 +53,14 @@ class AdminLogsPage:
 
         # Read file
         data = None
+        offset = None
         if name:
             filename = log_files[name]
             try:
-                data = self._tail(filename, limit)
-            except subprocess.CalledProcessError:
+                # Keep track of the position to follow the log file.
+                offset = os.path.getsize(filename)
+                data = tail_lines(filename, limit, offset).decode('utf-8', errors='replace')
+            except OSError:
                 data = ''
 
         return {
@@ -72,6 +68,30 @@ class AdminLogsPage:
             'name': name,
             'limit': limit,
             'data': data,
+            'offset': offset,
+        }
+
+    @cherrypy.expose
+    @cherrypy.tools.json_out()
+    def follow(self, name=None, offset='0'):
+        """
+        Return the content written to server logs after the given offset.
+        """
+        offset = validate_int(offset, min=0)
+        # Validate filename
+        log_files = self._get_log_files()
+        if name not in log_files:
+            raise cherrypy.NotFound()
+        try:
+            start, data = read_lines_from(log_files[name], offset)
+        except OSError:
+            raise cherrypy.NotFound()
+        # Server logs are written as long as the server is running.
+        return {
+            'data': data.decode('utf-8', errors='replace'),
+            'offset': start + len(data),
+            'reset': start != offset,
+            'ended': False,
         }
 
     @cherrypy.expose
@@ -99,6 +99,32 @@ def get_hwinfo():
     )
 
 
+def get_cacheinfo():
+    repocache = cherrypy.repocache
+    yield _('Repository Cache Entries'), len(repocache)
+    yield _('Repository Cache Usage'), '%s / %s' % (
+        humanfriendly.format_size(repocache.size),
+        humanfriendly.format_size(repocache.max_size),
+    )
+    yield _('Repository Cache Hits'), repocache.hits
+    yield _('Repository Cache Misses'), repocache.misses
+    yield _('Repository Cache Evictions'), repocache.evictions
+    dircache = cherrypy.dircache
+    yield _('Directory Cache Entries'), '%s / %s' % (len(dircache), dircache.max_entries)
+    yield _('Directory Cache Usage'), '%s / %s' % (
+        humanfriendly.format_size(dircache.size),
+        humanfriendly.format_size(dircache.max_size),
+    )
+    yield _('Directory Cache Hits'), dircache.hits
+    yield _('Directory Cache Misses'), dircache.misses
+    yield _('Directory Cache Stale'), dircache.stale
+    yield _('Directory Cache Evictions'), dircache.evictions
+    yield _('Directory Cache Refreshes'), dircache.refreshes
+    yield _('Directory Cache Refresh Latency'), '%.1f ms' % (
+        dircache.refresh_time * 1000 / dircache.refresh_cycles if dircache.refresh_cycles else 0
+    )
+
+
 def get_pkginfo():
     yield _('Rdiff-Backup Version'), '.'.join([str(i) for i in rdiff_backup_version()])
     import jinja2
@@ -136,5 +162,6 @@ class AdminSysinfoPage:
             "pyinfo": list(get_pyinfo()),
             "osinfo": list(get_osinfo()),
             "hwinfo": list(get_hwinfo()),
+            "cacheinfo": list(get_cacheinfo()),
             "ldapinfo": list(get_pkginfo()),
         }
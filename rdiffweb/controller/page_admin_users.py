@@ -645,7 +645,7 @@ class AdminApiUsers:
         - `role`: User's role.
 
         """
-        return [self._to_json(user_obj) for user_obj in UserObject.query.all()]
+        return (self._to_json(user_obj) for user_obj in UserObject.query.yield_per(100))
 
     def get(self, username_or_id):
         """
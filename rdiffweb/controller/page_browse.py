@@ -14,17 +14,69 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import base64
+import binascii
 import logging
 
 import cherrypy
+from cherrypy_foundation.url import url_for
 
 import rdiffweb.tools.errors  # noqa
 from rdiffweb.core.librdiff import AccessDeniedError, DoesNotExistError
 from rdiffweb.core.model import RepoObject
 
+from . import validate_date, validate_int
+
 # Define the logger
 logger = logging.getLogger(__name__)
 
+# Maximum number of entries displayed at once.
+PAGE_SIZE = 1000
+
+
+def encode_cursor(value):
+    """
+    Return a continuation token to resume listing after the given filename.
+    """
+    return base64.urlsafe_b64encode(value).decode('ascii').rstrip('=')
+
+
+def decode_cursor(value):
+    """
+    Return the filename represented by the continuation token.
+    """
+    if not value:
+        return None
+    try:
+        return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+    except (binascii.Error, ValueError):
+        raise cherrypy.HTTPError(400, "Invalid cursor")
+
+
+def get_page(repo, path, cursor, limit, sort, date=None):
+    """
+    Return a page of directory entries and the continuation token of the next page.
+    """
+    if repo.status[0] == 'broken':
+        return [], None
+    if sort not in ['name', '-name']:
+        raise cherrypy.HTTPError(400, "Invalid sort")
+    entries = list(repo.iter_listdir(path, cursor=decode_cursor(cursor), limit=limit + 1, sort=sort, as_of=date))
+    if len(entries) > limit:
+        del entries[limit:]
+        return entries, encode_cursor(entries[-1].path.rsplit(b'/', 1)[-1])
+    return entries, None
+
+
+def _entry_url(repo, entry, date=None):
+    """
+    Return the link of an entry: the folder content or the file to be restored.
+    """
+    if entry.isdir:
+        return url_for('browse', repo, entry.path, date=date)
+    date = date or entry.last_change_date
+    return url_for('restore', repo, entry.path, date=date) if date else None
+
 
 @cherrypy.tools.poppath()
 class BrowsePage:
@@ -36,16 +88,58 @@ class BrowsePage:
         }
     )
     @cherrypy.tools.jinja2(template="browse.html")
-    def default(self, path):
+    def default(self, path, cursor=None, date=None):
         """
-        Browser view displaying files and folders in user's repository
+        Browser view displaying files and folders in user's repository.
+        When `date` is defined, display the content as it was at this backup date.
         """
+        date = validate_date(date, allow_none=True)
         # Check user access to the given repo & path
         repo, path = RepoObject.get_repo_path(path, refresh=True)
 
         # Get list of actual directory entries
-        if repo.status[0] == 'broken':
-            dir_entries = []
-        else:
-            dir_entries = repo.listdir(path)
-        return {"repo": repo, "path": path, "dir_entries": dir_entries}
+        dir_entries, next_cursor = get_page(repo, path, cursor, PAGE_SIZE, 'name', date)
+        return {
+            "repo": repo,
+            "path": path,
+            "date": date,
+            "dir_entries": dir_entries,
+            "cursor": cursor,
+            "next_cursor": next_cursor,
+        }
+
+    @cherrypy.expose
+    @cherrypy.tools.errors(
+        error_table={
+            DoesNotExistError: 404,
+            AccessDeniedError: 403,
+        }
+    )
+    @cherrypy.tools.allow(methods=['GET'])
+    @cherrypy.tools.json_out()
+    def data_json(self, path, cursor=None, limit=str(PAGE_SIZE), sort='name', date=None, **kwargs):
+        """
+        Return a page of files and folders. Use the `next` continuation
+        token as `cursor` to get the following page.
+        """
+        limit = validate_int(limit, min=1, max=PAGE_SIZE)
+        date = validate_date(date, allow_none=True)
+        repo, path = RepoObject.get_repo_path(path)
+        dir_entries, next_cursor = get_page(repo, path, cursor, limit, sort, date)
+        return {
+            'data': (
+                {
+                    'name': entry.display_name,
+                    'isdir': entry.isdir,
+                    'exists': entry.exists,
+                    'size': entry.file_size,
+                    'mirror_size': entry.mirror_size,
+                    'increments_size': entry.increments_size,
+                    'last_change_date': entry.last_change_date,
+                    'url': _entry_url(repo, entry, date),
+                    'history_url': url_for('history', repo, entry.path),
+                }
+                for entry in dir_entries
+            ),
+            'next': next_cursor,
+        }
@@ -17,7 +17,7 @@
 
 import cherrypy
 
-from rdiffweb.core.librdiff import AccessDeniedError, DoesNotExistError
+from rdiffweb.core.librdiff import AccessDeniedError, DoesNotExistError, SessionStatisticsEntry
 from rdiffweb.core.model import RepoObject
 
 from . import validate_int
@@ -25,15 +25,17 @@ from . import validate_int
 
 class Data:
     def __init__(self, repo_obj, limit):
-        self.repo_obj = repo_obj
+        self.series = repo_obj.session_statistics_series
         self.limit = limit
 
     @property
     def labels(self):
-        return [s.starttime for s in self.repo_obj.session_statistics[-self.limit :]]
+        return self.starttime
 
     def __getattr__(self, name):
-        return [getattr(s, name) for s in self.repo_obj.session_statistics[-self.limit :]]
+        if name not in SessionStatisticsEntry.ATTRS:
+            raise AttributeError(name)
+        return self.series[name][-self.limit :].tolist()
 
 
 @cherrypy.tools.poppath()
@@ -19,6 +19,7 @@ import cherrypy
 
 from rdiffweb.core.librdiff import AccessDeniedError, DoesNotExistError
 from rdiffweb.core.model import RepoObject
+from rdiffweb.core.restore import ARCHIVERS
 
 from . import validate_int
 
@@ -47,4 +48,5 @@ class HistoryPage:
             "repo": repo,
             "path": path,
             "path_obj": path_obj,
+            "archivers": ARCHIVERS,
         }
@@ -82,7 +82,9 @@ class HomePage:
             "total_interrupted": status_counts["interrupted"],
             "total_in_progress": status_counts["in_progress"],
             # Errors
-            "error_count": sum(r.session_statistics[-1].errors for r in repo_objs if r.last_backup_date),
+            "error_count": sum(
+                r.session_statistics_series['errors'][-1] for r in repo_objs if r.session_statistics_series
+            ),
             # last_backup
             "last_backup_date": last_backup.last_backup_date if last_backup else None,
             "last_backup_repo": last_backup.display_name if last_backup else None,
@@ -93,7 +95,9 @@ class HomePage:
             "activity_start": activity_start,
             "activity_end": activity_end,
             "activity_dates": [
-                d.date for repo in repo_objs for d in repo.session_statistics[activity_start:activity_end]
+                d
+                for series in (r.session_statistics_series for r in repo_objs)
+                for d in series.dates[series.range(activity_start, activity_end)]
             ],
         }
 
@@ -15,6 +15,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
+import os
 from urllib.parse import unquote_to_bytes
 
 import cherrypy
@@ -23,7 +24,7 @@ from cherrypy.lib.static import serve_fileobj
 from rdiffweb.core.librdiff import AccessDeniedError, DoesNotExistError
 from rdiffweb.core.model import RepoObject
 
-from . import validate_date
+from . import validate_date, validate_int
 
 # Define the logger
 logger = logging.getLogger(__name__)
@@ -33,9 +34,14 @@ class LogsPage:
 
     def _cp_dispatch(self, vpath):
         """
-        Return the right handle if raw=1
+        Return the right handle if raw=1 or follow=1
         """
-        func = self._raw if 'raw=1' in cherrypy.request.query_string else self._page
+        if 'raw=1' in cherrypy.request.query_string:
+            func = self._raw
+        elif 'follow=1' in cherrypy.request.query_string:
+            func = self._follow
+        else:
+            func = self._page
         cherrypy.serving.request.params = {
             'path': b"/".join([unquote_to_bytes(segment.encode('ISO-8859-1')) for segment in vpath])
         }
@@ -78,14 +84,19 @@ class LogsPage:
             file = 'backup.log'
         entry = self._get_log_entry(repo_obj, date, file)
         data = None
+        offset = None
         try:
-            if entry:
+            if entry and entry._is_compressed:
                 data = entry.tail()
+            elif entry:
+                # Keep track of the position to follow the log file.
+                offset = os.path.getsize(entry.path)
+                data = entry.tail(end=offset)
         except FileNotFoundError:
             # If the file doesn't exists, swallow the error.
             pass
 
-        return {'repo': repo_obj, 'date': date, 'file': file, 'data': data}
+        return {'repo': repo_obj, 'date': date, 'file': file, 'data': data, 'offset': offset}
 
     @cherrypy.expose
     @cherrypy.tools.errors(
@@ -104,3 +115,31 @@ class LogsPage:
             return cherrypy.HTTPError(404)
 
     _raw._cp_config = {"response.stream": True}
+
+    @cherrypy.expose
+    @cherrypy.tools.errors(
+        error_table={
+            DoesNotExistError: 404,
+            AccessDeniedError: 403,
+        }
+    )
+    @cherrypy.tools.json_out()
+    def _follow(self, path, date=None, file=None, offset='0', **kwargs):
+        """
+        Return the content written to the log file after the given offset.
+        `ended` is True when the log file is not expected to be written anymore.
+        """
+        repo_obj = RepoObject.get_repo(path)
+        date = validate_date(date, allow_none=True)
+        offset = validate_int(offset, min=0)
+        entry = self._get_log_entry(repo_obj, date, file)
+        if entry is None or entry._is_compressed:
+            # Compressed log are not written anymore.
+            return {'data': '', 'offset': offset, 'reset': False, 'ended': True}
+        try:
+            start, end, data = entry.read_from(offset)
+        except FileNotFoundError:
+            raise cherrypy.HTTPError(404)
+        # Logs are only written while a backup is running.
+        ended = repo_obj.status[0] != 'in_progress'
+        return {'data': data, 'offset': end, 'reset': start != offset, 'ended': ended}
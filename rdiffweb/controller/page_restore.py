@@ -15,10 +15,12 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import logging
+import os
 from urllib.parse import quote, unquote_to_bytes
 
 import cherrypy
-from cherrypy.lib.static import mimetypes
+from cherrypy.lib import cptools, httputil
+from cherrypy.lib.static import mimetypes, serve_fileobj
 from cherrypy_foundation.url import url_for
 
 import rdiffweb.tools.errors  # noqa: cherrypy.tools.errors
@@ -66,6 +68,25 @@ def _content_type(filename):
     return mimetypes.types_map.get(ext, "application/octet-stream")
 
 
+def _validate_range(fileobj):
+    """
+    Define the ETag of the given file and ignore the Range header when
+    If-Range doesn't match.
+    """
+    st = os.fstat(fileobj.fileno())
+    # Restored files and archives are identified by the digest of their
+    # cache key. Otherwise, the file is read from the mirror and may be
+    # modified in place.
+    etag = getattr(fileobj, 'etag', None) or '%x-%x-%x' % (st.st_ino, st.st_size, st.st_mtime_ns)
+    etag = '"%s"' % etag
+    cherrypy.response.headers['ETag'] = etag
+    cptools.validate_etags()
+    request = cherrypy.request
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag and if_range != httputil.HTTPDate(st.st_mtime):
+        request.headers.pop('Range', None)
+
+
 class _file_generator(object):
     """
     Yield the given input (a file object) in chunks (default 64k).
@@ -168,7 +189,16 @@ class RestorePage:
         # To detect download in restore page.
         cherrypy.response.cookie['downloadStarted'] = 1
 
-        # Stream the data.
+        # Serve a complete file with Content-Length and Range support.
+        if fileobj.seekable():
+            _validate_range(fileobj)
+            return serve_fileobj(fileobj, content_type=content_type)
+
+        # Range may be requested once the restore is completed and kept in cache.
+        if cherrypy.restore_cache.enabled:
+            cherrypy.response.headers['Accept-Ranges'] = 'bytes'
+
+        # Stream the data from the beginning while the restore is in progress.
         return _file_generator(fileobj)
 
     _raw._cp_config = {"response.stream": True}
@@ -0,0 +1,86 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import cherrypy
+
+from rdiffweb.core.librdiff import AccessDeniedError, DoesNotExistError
+from rdiffweb.core.model import RepoObject
+
+from . import validate_int
+
+# Maximum number of results returned by a search.
+MAX_RESULTS = 500
+
+
+def search(repo, q, limit):
+    """
+    Return the files and folders matching the query.
+    """
+    if repo.status[0] == 'broken' or not q or not q.strip():
+        return []
+    return repo.search(q.strip(), limit)
+
+
+@cherrypy.tools.poppath()
+class SearchPage:
+    @cherrypy.expose
+    @cherrypy.tools.allow(methods=['GET'])
+    @cherrypy.tools.errors(
+        error_table={
+            DoesNotExistError: 404,
+            AccessDeniedError: 403,
+        }
+    )
+    @cherrypy.tools.jinja2(template="search.html")
+    def default(self, path, q=None, **kwargs):
+        """
+        Search files and folders by name across the backup history.
+        """
+        repo = RepoObject.get_repo(path)
+        return {
+            'repo': repo,
+            'q': q or '',
+            'results': [
+                (file_path, file_path.rpartition(b'/')[0], ranges) for file_path, ranges in search(repo, q, MAX_RESULTS)
+            ],
+            'max_results': MAX_RESULTS,
+        }
+
+    @cherrypy.expose
+    @cherrypy.tools.allow(methods=['GET'])
+    @cherrypy.tools.errors(
+        error_table={
+            DoesNotExistError: 404,
+            AccessDeniedError: 403,
+        }
+    )
+    @cherrypy.tools.json_out()
+    def data_json(self, path, q=None, limit=str(MAX_RESULTS), **kwargs):
+        """
+        Return files and folders with a name containing `q` and the ranges
+        of backup dates where they exist.
+        """
+        limit = validate_int(limit, min=1, max=MAX_RESULTS)
+        repo = RepoObject.get_repo(path)
+        return {
+            'data': [
+                {
+                    'path': repo._decode(file_path),
+                    'dates': [{'first': first, 'last': last} for first, last in ranges],
+                }
+                for file_path, ranges in search(repo, q, limit)
+            ]
+        }
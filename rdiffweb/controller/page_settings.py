@@ -371,7 +371,7 @@ class ApiRepos:
         u = cherrypy.serving.request.currentuser
         if u.refresh_repos():
             u.commit()
-        return [self._to_json(repo_obj) for repo_obj in u.repo_objs]
+        return (self._to_json(repo_obj) for repo_obj in u.repo_objs)
 
     def get(self, name_or_repoid):
         """
@@ -15,38 +15,107 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import bisect
+import itertools
+import re
+from datetime import timedelta
+
 import cherrypy
 from cherrypy_foundation.tools.i18n import ugettext as _
+from cherrypy_foundation.url import url_for
 
+from rdiffweb.core.indexcache import FileStatisticsIndex
 from rdiffweb.core.librdiff import AccessDeniedError, DoesNotExistError
-from rdiffweb.core.model import RepoObject
+from rdiffweb.core.model import FileStatisticsSummary, RepoObject
+
+from . import validate_date, validate_int
+from .page_browse import decode_cursor, encode_cursor
+
+# Maximum number of lines returned by a single request.
+MAX_LENGTH = 100
+
+# Maximum number of changes displayed at once.
+DIFF_PAGE_SIZE = 1000
+
+# Default number of days searched for deleted files.
+DELETED_DAYS = 7
+
+_COLUMN_SEARCH = re.compile(r'^columns\[(\d+)\]\[search\]\[value\]$')
 
-from . import validate_date
 
+def _search_states(value, regex):
+    """
+    Return the states matching a datatables column search.
+    """
+    if regex:
+        try:
+            pattern = re.compile(value, re.IGNORECASE)
+        except re.error:
+            raise cherrypy.HTTPError(400, _('Invalid search pattern.'))
+        return [state for state in FileStatisticsIndex.STATES if pattern.search(state)]
+    return [state for state in FileStatisticsIndex.STATES if value.lower() in state]
 
-def line_to_state(line):
+
+def get_diff_page(repo, start, end, cursor, limit):
     """
-    For a file statistics entry, determine if the file was changed.
+    Return a page of changes between two backup dates and the continuation
+    token of the next page.
     """
-    if line.changed == '0':
-        return 'unchanged'
-    elif line.source_size == 'NA':
-        return 'deleted'
-    elif line.mirror_size == 'NA' and line.increment_size == '0':
-        return 'new'
-    else:
-        return 'changed'
+    try:
+        changes = list(itertools.islice(repo.diff(start, end, cursor=decode_cursor(cursor)), limit + 1))
+    except DoesNotExistError:
+        raise cherrypy.HTTPError(404, _('Invalid date.'))
+    if len(changes) > limit:
+        del changes[limit:]
+        return changes, encode_cursor(changes[-1].path)
+    return changes, None
 
 
-def line_to_size(line):
+def _diff_dates(repo, start, end):
     """
-    Return either the source or mirror file size.
+    Return the backup dates to be compared. By default, compare the last
+    backup with the previous one.
     """
-    if line.source_size != 'NA':
-        return line.source_size
-    elif line.mirror_size != 'NA':
-        return line.mirror_size
-    return 0
+    dates = [entry.date for entry in repo.mirror_metadata]
+    if end is None:
+        end = dates[-1] if dates else None
+    if start is None and end is not None:
+        idx = bisect.bisect_left(dates, end)
+        start = dates[idx - 1] if idx > 0 else end
+    return dates, start, end
+
+
+def get_changes_page(repo, start, end, states, cursor, limit):
+    """
+    Return a page of files deleted or changed between two backup dates and
+    the continuation token of the next page.
+    """
+    cursor = decode_cursor(cursor)
+    if cursor is not None:
+        path, unused, state = cursor.rpartition(b'\0')
+        cursor = (path, state.decode('ascii', errors='replace'))
+    try:
+        changes = repo.file_changes(start, end, states=states, cursor=cursor, limit=limit + 1)
+    except DoesNotExistError:
+        raise cherrypy.HTTPError(404, _('Invalid date.'))
+    if len(changes) > limit:
+        del changes[limit:]
+        return changes, encode_cursor(changes[-1].path + b'\0' + changes[-1].state.encode('ascii'))
+    return changes, None
+
+
+def _deleted_dates(repo, start, end):
+    """
+    Return the backup dates to be searched for deleted files. By default,
+    search the backups of the last days.
+    """
+    dates = [entry.date for entry in repo.file_statistics]
+    if end is None:
+        end = dates[-1] if dates else None
+    if start is None and end is not None:
+        idx = bisect.bisect_left(dates, end - timedelta(days=DELETED_DAYS))
+        start = dates[idx] if idx < len(dates) else end
+    return dates, start, end
 
 
 @cherrypy.tools.poppath()
@@ -80,7 +149,10 @@ class StatsPage:
         # Provide list of available dates.
         source_dates = [{'value': str(f.date), 'display': str(f.date)} for f in repo_obj.file_statistics]
 
-        return {'repo': repo_obj, 'date': date, 'source_dates': source_dates}
+        # Largest files and folders precomputed for this backup.
+        summary = FileStatisticsSummary.get_summary(repo_obj, date) if date else None
+
+        return {'repo': repo_obj, 'date': date, 'source_dates': source_dates, 'summary': summary}
 
     @cherrypy.expose
     @cherrypy.tools.errors(
@@ -90,11 +162,18 @@ class StatsPage:
         }
     )
     @cherrypy.tools.json_out()
-    def data_json(self, path, date=None, **kwargs):
+    def data_json(self, path, date=None, draw='0', start='0', length=str(MAX_LENGTH), **kwargs):
         """
-        Return a json array with stats
+        Return a page of file statistics using the datatables server-side
+        protocol. Sorting, filtering and pagination are served by the index
+        of the file statistics.
         """
         date = validate_date(date)
+        draw = validate_int(draw)
+        start = validate_int(start, min=0)
+        length = validate_int(length)
+        if length < 0 or length > MAX_LENGTH:
+            length = MAX_LENGTH
         # If Repo is broken return no data
         repo_obj = RepoObject.get_repo(path)
         if repo_obj.status[0] == 'broken':
@@ -106,14 +185,190 @@ class StatsPage:
         except KeyError:
             raise cherrypy.HTTPError(404, _('Invalid date.'))
 
+        # Resolve sorting column.
+        order = kwargs.get('columns[%s][data]' % kwargs.get('order[0][column]', 0), 'path')
+        if order not in FileStatisticsIndex.ORDERS:
+            order = 'path'
+        reverse = kwargs.get('order[0][dir]') == 'desc'
+
+        # Global search matches the path. Column search is supported for path and state.
+        search = kwargs.get('search[value]', '').strip() or None
+        states = None
+        for key, value in kwargs.items():
+            m = _COLUMN_SEARCH.match(key)
+            if not m or not value.strip():
+                continue
+            column = kwargs.get('columns[%s][data]' % m.group(1))
+            if column == 'path' and not search:
+                search = value.strip()
+            elif column == 'state':
+                regex = kwargs.get('columns[%s][search][regex]' % m.group(1), 'false').lower() == 'true'
+                states = _search_states(value.strip(), regex)
+
+        total, filtered, lines = stat.query(start, length, order, reverse, search, states)
+        return {
+            'draw': draw,
+            'recordsTotal': total,
+            'recordsFiltered': filtered,
+            'data': [
+                {'path': file_path, 'state': state, 'size': size, 'increment_size': increment_size}
+                for file_path, state, size, increment_size in lines
+            ],
+        }
+
+    @cherrypy.expose()
+    @cherrypy.tools.allow(methods=['GET'])
+    @cherrypy.tools.errors(
+        error_table={
+            DoesNotExistError: 404,
+            AccessDeniedError: 403,
+        }
+    )
+    @cherrypy.tools.jinja2(template="stats_diff.html")
+    def diff(self, path, start=None, end=None, cursor=None, **kwargs):
+        """
+        Show files added, removed or modified between two backup dates.
+        """
+        start = validate_date(start, allow_none=True)
+        end = validate_date(end, allow_none=True)
+        repo_obj = RepoObject.get_repo(path)
+        if repo_obj.status[0] == 'broken':
+            return {'repo': repo_obj, 'dates': [], 'changes': []}
+        dates, start, end = _diff_dates(repo_obj, start, end)
+        changes, next_cursor = [], None
+        if start is not None:
+            changes, next_cursor = get_diff_page(repo_obj, start, end, cursor, DIFF_PAGE_SIZE)
+        return {
+            'repo': repo_obj,
+            'dates': dates,
+            'start': start,
+            'end': end,
+            'changes': changes,
+            'cursor': cursor,
+            'next_cursor': next_cursor,
+        }
+
+    @cherrypy.expose
+    @cherrypy.tools.errors(
+        error_table={
+            DoesNotExistError: 404,
+            AccessDeniedError: 403,
+        }
+    )
+    @cherrypy.tools.allow(methods=['GET'])
+    @cherrypy.tools.json_out()
+    def diff_json(self, path, start=None, end=None, cursor=None, limit=str(DIFF_PAGE_SIZE), **kwargs):
+        """
+        Return a page of files added, removed or modified between two backup
+        dates. Use the `next` continuation token as `cursor` to get the
+        following page.
+        """
+        start = validate_date(start, allow_none=True)
+        end = validate_date(end, allow_none=True)
+        limit = validate_int(limit, min=1, max=DIFF_PAGE_SIZE)
+        repo_obj = RepoObject.get_repo(path)
+        if repo_obj.status[0] == 'broken':
+            return {}
+        unused, start, end = _diff_dates(repo_obj, start, end)
+        if start is None:
+            raise cherrypy.HTTPError(404, _('Invalid date.'))
+        changes, next_cursor = get_diff_page(repo_obj, start, end, cursor, limit)
+        return {
+            'start': start,
+            'end': end,
+            'data': [
+                {
+                    'path': repo_obj._decode(change.path),
+                    'change': change.change,
+                    'type': change.type,
+                    'old_size': change.old_size,
+                    'new_size': change.new_size,
+                }
+                for change in changes
+            ],
+            'next': next_cursor,
+        }
+
+    @cherrypy.expose()
+    @cherrypy.tools.allow(methods=['GET'])
+    @cherrypy.tools.errors(
+        error_table={
+            DoesNotExistError: 404,
+            AccessDeniedError: 403,
+        }
+    )
+    @cherrypy.tools.jinja2(template="stats_deleted.html")
+    def deleted(self, path, start=None, end=None, changed=None, cursor=None, **kwargs):
+        """
+        Show files deleted, and optionally changed, by the backups made
+        between two dates.
+        """
+        start = validate_date(start, allow_none=True)
+        end = validate_date(end, allow_none=True)
+        changed = changed in ['1', 'on', 'true']
+        repo_obj = RepoObject.get_repo(path)
+        if repo_obj.status[0] == 'broken':
+            return {'repo': repo_obj, 'dates': [], 'changes': []}
+        dates, start, end = _deleted_dates(repo_obj, start, end)
+        changes, next_cursor = [], None
+        if start is not None:
+            states = None if changed else ['deleted']
+            changes, next_cursor = get_changes_page(repo_obj, start, end, states, cursor, DIFF_PAGE_SIZE)
+        return {
+            'repo': repo_obj,
+            'dates': dates,
+            'start': start,
+            'end': end,
+            'changed': changed,
+            'changes': changes,
+            'cursor': cursor,
+            'next_cursor': next_cursor,
+        }
+
+    @cherrypy.expose
+    @cherrypy.tools.errors(
+        error_table={
+            DoesNotExistError: 404,
+            AccessDeniedError: 403,
+        }
+    )
+    @cherrypy.tools.allow(methods=['GET'])
+    @cherrypy.tools.json_out()
+    def deleted_json(self, path, start=None, end=None, changed=None, cursor=None, limit=str(DIFF_PAGE_SIZE), **kwargs):
+        """
+        Return a page of files deleted, and optionally changed, by the
+        backups made between two dates. Use the `next` continuation token as
+        `cursor` to get the following page.
+        """
+        start = validate_date(start, allow_none=True)
+        end = validate_date(end, allow_none=True)
+        changed = changed in ['1', 'on', 'true']
+        limit = validate_int(limit, min=1, max=DIFF_PAGE_SIZE)
+        repo_obj = RepoObject.get_repo(path)
+        if repo_obj.status[0] == 'broken':
+            return {}
+        unused, start, end = _deleted_dates(repo_obj, start, end)
+        if start is None:
+            raise cherrypy.HTTPError(404, _('Invalid date.'))
+        states = None if changed else ['deleted']
+        changes, next_cursor = get_changes_page(repo_obj, start, end, states, cursor, limit)
         return {
+            'start': start,
+            'end': end,
             'data': [
-                [
-                    line.path,
-                    line_to_state(line),
-                    line_to_size(line),
-                    line.increment_size,
-                ]
-                for line in stat.readlines()
+                {
+                    'path': repo_obj._decode(change.path),
+                    'state': change.state,
+                    'size': change.size,
+                    'date': change.date,
+                    'restore_date': change.restore_date,
+                    'url': (
+                        url_for('restore', repo_obj, repo_obj.quote(change.path), date=change.restore_date)
+                        if change.restore_date
+                        else None
+                    ),
+                }
+                for change in changes
             ],
+            'next': next_cursor,
         }
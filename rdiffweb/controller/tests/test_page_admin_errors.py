@@ -0,0 +1,73 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import cherrypy
+
+import rdiffweb.core.metadata_index  # noqa
+import rdiffweb.test
+from rdiffweb.core.model import RepoObject, UserObject
+
+
+class AdminErrorsTest(rdiffweb.test.WebCase):
+    login = True
+
+    def setUp(self):
+        super().setUp()
+        # Given a repository with errors recorded
+        repo = RepoObject.get_repo('admin/testcases', UserObject.get_user(self.USERNAME))
+        with open(repo.error_log[-1].path, 'wb') as f:
+            f.write(
+                b"ListError: 'Revisions/Data' [Errno 13] Permission denied: b'Revisions/Data'\n"
+                b"UpdateError: 'Fichier @ <root>' Updated mirror temp file does not match source\n"
+            )
+        cherrypy.metadata_index.metadata_index_job()
+
+    def test_get_errors(self):
+        # When getting the errors page
+        self.getPage("/admin/errors/")
+        # Then the page return without error
+        self.assertStatus(200)
+        # Then an ajax table is displayed
+        self.assertInBody('data-ajax="http://127.0.0.1:%s/admin/errors/data.json"' % self.PORT)
+
+    def test_data_json(self):
+        # When searching errors
+        data = self.getJson("/admin/errors/data.json?search[value]=permission")
+        # Then matching errors are returned
+        self.assertEqual(2, data['recordsTotal'])
+        self.assertEqual(1, data['recordsFiltered'])
+        self.assertEqual(
+            {
+                'backup_date': '2016-02-02T21:30:40+00:00',
+                'username': 'admin',
+                'repopath': 'testcases',
+                'error_class': 'ListError',
+                'path': 'Revisions/Data',
+                'message': "[Errno 13] Permission denied: b'Revisions/Data'",
+            },
+            data['data'][0],
+        )
+
+    def test_data_json_as_user(self):
+        # Given a user without admin role
+        user = UserObject.add_user('user', 'password')
+        user.commit()
+        self.getPage("/logout", method="POST")
+        self.getPage("/login/", method='POST', body={'login': 'user', 'password': 'password'})
+        # When querying errors
+        self.getPage("/admin/errors/data.json")
+        # Then access is denied
+        self.assertStatus(403)
@@ -114,6 +114,21 @@ class AdminWithLogsTest(rdiffweb.test.WebCase):
         # Then it contains logs data.
         self.assertInBody(expected_data)
 
+    def test_follow(self):
+        # Given a log file being written
+        self.getPage("/admin/logs/?name=log_file")
+        self.assertInBody('data-offset="3"')
+        with open('/tmp/rdiffweb.log', 'a') as f:
+            f.write("\nBAR\n")
+        # When following the file
+        data = self.getJson("/admin/logs/follow?name=log_file&offset=3")
+        # Then new lines are returned
+        self.assertEqual({'data': '\nBAR\n', 'offset': 8, 'reset': False, 'ended': False}, data)
+
+    def test_follow_invalid(self):
+        self.getPage("/admin/logs/follow?name=invalid&offset=0")
+        self.assertStatus(404)
+
     def test_raw_invalid(self):
         # When getting raw file
         self.getPage("/admin/logs/raw?name=invalid")
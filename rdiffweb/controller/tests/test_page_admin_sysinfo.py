@@ -26,3 +26,5 @@ class AdminSysinfoTest(rdiffweb.test.WebCase):
         self.assertStatus(200)
         self.assertInBody("Operating System Info")
         self.assertInBody("Python Info")
+        self.assertInBody("Repository Cache Hits")
+        self.assertInBody("Directory Cache Hits")
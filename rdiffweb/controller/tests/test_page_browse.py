@@ -15,9 +15,11 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
+from unittest import mock
 
 from cherrypy_foundation.url import url_for
 from parameterized import parameterized
+from selenium.webdriver.support.ui import WebDriverWait
 
 import rdiffweb.test
 from rdiffweb.core.model import UserObject
@@ -142,6 +144,138 @@ class BrowsePageTest(rdiffweb.test.WebCase):
             for value in expected_in_body:
                 self.assertIn(value, text)
 
+    def test_browse_data_json(self):
+        # Given a repository
+        # When querying the first page
+        data = self.getJson(url_for('browse', 'data.json', self.USERNAME, self.REPO, '', limit=3))
+        # Then a page of entries is returned
+        self.assertStatus(200)
+        self.assertEqual(3, len(data['data']))
+        self.assertEqual(
+            {
+                'name',
+                'isdir',
+                'exists',
+                'size',
+                'mirror_size',
+                'increments_size',
+                'last_change_date',
+                'url',
+                'history_url',
+            },
+            set(data['data'][0].keys()),
+        )
+        self.assertIsNotNone(data['next'])
+        # When querying all pages
+        names = [e['name'] for e in data['data']]
+        while data['next']:
+            data = self.getJson(
+                url_for('browse', 'data.json', self.USERNAME, self.REPO, '', limit=3, cursor=data['next'])
+            )
+            names.extend(e['name'] for e in data['data'])
+        # Then all entries are returned once
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn('Revisions', names)
+        self.assertIn('Répertoire Supprimé', names)
+
+    def test_browse_data_json_invalid_sort(self):
+        self.getPage(url_for('browse', 'data.json', self.USERNAME, self.REPO, '', sort='size'))
+        self.assertStatus(400)
+
+    def test_browse_without_cursor(self):
+        # When browsing a folder fitting in a single page
+        self.getPage(url_for('browse', self.USERNAME, self.REPO, ''))
+        # Then client-side filter and sort are enabled
+        self.assertStatus(200)
+        self.assertInBody('data-searching="true"')
+        self.assertInBody('data-ordering="true"')
+        self.assertNotInBody('Next entries')
+
+    def test_browse_with_cursor(self):
+        # Given a page size smaller then the number of entries
+        with mock.patch('rdiffweb.controller.page_browse.PAGE_SIZE', 3):
+            # When browsing the repository
+            self.getPage(url_for('browse', self.USERNAME, self.REPO, ''))
+            # Then a link to the next entries is displayed
+            self.assertStatus(200)
+            self.assertInBody('Next entries')
+            self.assertNotInBody('First entries')
+            # Then client-side filter and sort are disabled
+            self.assertInBody('data-searching="false"')
+            self.assertInBody('data-ordering="false"')
+            # Then the next entries are loaded on demand from the JSON endpoint
+            self.assertInBody('data-url="%s?cursor=' % url_for('browse', 'data.json', self.USERNAME, self.REPO, ''))
+            # When browsing the next entries
+            self.getPage(url_for('browse', self.USERNAME, self.REPO, '', cursor='UmV2aXNpb25z'))
+            # Then a link to the first entries is displayed
+            self.assertStatus(200)
+            self.assertInBody('First entries')
+            self.assertNotInBody('>Revisions<')
+
+    def test_browse_with_cursor_selenium(self):
+        # Given a page size smaller then the number of entries
+        with mock.patch('rdiffweb.controller.page_browse.PAGE_SIZE', 3), self.selenium() as driver:
+            # When browsing the repository
+            driver.get(url_for('browse', self.USERNAME, self.REPO, ''))
+            self.assertNotIn('Revisions', driver.find_element('css selector', ".rdw-table").text)
+            # When loading the next entries until the end
+            wait = WebDriverWait(driver, timeout=10)
+            while driver.find_elements('css selector', ".rdw-browse-more"):
+                driver.find_element('css selector', ".rdw-browse-more").click()
+                wait.until(lambda d: not d.find_elements('css selector', ".rdw-browse-more.disabled"))
+            # Then all entries are displayed in the table without error
+            self.assertFalse(driver.get_log('browser'))
+            text = driver.find_element('css selector', ".rdw-table").text
+            self.assertIn('Revisions', text)
+            self.assertIn('Répertoire Supprimé', text)
+
+    def test_browse_as_of(self):
+        # Given a folder deleted from the repository
+        # When browsing the repository as it was before the deletion
+        self.getPage(url_for('browse', self.USERNAME, self.REPO, '', date='2014-11-01T15:50:26-04:00'))
+        # Then the content at this date is displayed
+        self.assertStatus(200)
+        self.assertInBody('Répertoire Supprimé')
+        self.assertInBody('Fichier @ &lt;root&gt;')
+        self.assertNotInBody('>Revisions<')
+        # Then links keep the selected date
+        self.assertInBody(
+            url_for('browse', self.USERNAME, self.REPO, 'Répertoire Existant', date='2014-11-01T15:50:26-04:00')
+        )
+
+    def test_browse_as_of_quoted(self):
+        # Given a folder with quoted characters
+        # When browsing the folder as of a backup date
+        self.getPage(
+            url_for('browse', self.USERNAME, self.REPO, 'Char ;059090 to quote', date='2016-02-02T16:30:40-05:00')
+        )
+        # Then the content at this date is displayed
+        self.assertStatus(200)
+        self.assertInBody('Untitled Testcase.doc')
+        # Then links use the quoted path
+        self.assertInBody(
+            url_for('restore', self.USERNAME, self.REPO, 'Char ;059090 to quote/Data', date='2016-02-02T16:30:40-05:00')
+        )
+
+    def test_browse_as_of_data_json(self):
+        # When querying entries as of a backup date
+        data = self.getJson(
+            url_for('browse', 'data.json', self.USERNAME, self.REPO, 'Subdirectory', date='2016-02-02T16:30:40-05:00')
+        )
+        # Then entries at this date are returned
+        self.assertEqual(['Foldèr with éncodïng', 'LoopSymlink'], [e['name'] for e in data['data']])
+        self.assertTrue(data['data'][0]['isdir'])
+
+    def test_browse_as_of_not_found(self):
+        # Given a folder created after the given backup date
+        # When browsing the folder as of this date
+        self.getPage(url_for('browse', self.USERNAME, self.REPO, 'Subdirectory', date='2014-11-01T15:50:26-04:00'))
+        # Then a 404 is returned
+        self.assertStatus(404)
+        # When browsing with a date not matching a backup
+        self.getPage(url_for('browse', self.USERNAME, self.REPO, '', date='2014-11-01T15:50:27-04:00'))
+        self.assertStatus(404)
+
     def test_invalid_repo(self):
         """
         Browse to an invalid repository.
@@ -80,6 +80,39 @@ class LogsPageTest(rdiffweb.test.WebCase):
         self.assertInBody("Starting restore of")
         self.assertNotInBody("<html")
 
+    def test_logs_with_follow(self):
+        # Given a backup log being written
+        path = os.path.join(self.testcases, self.REPO, 'rdiff-backup-data', 'backup.log')
+        with open(path, 'a') as f:
+            f.write('first line\n')
+        offset = os.path.getsize(path)
+        # When displaying the log
+        self._log(self.USERNAME, self.REPO, file='backup.log')
+        # Then the page include the position to follow the file
+        self.assertInBody('data-offset="%s"' % offset)
+        # When new lines get written
+        with open(path, 'a') as f:
+            f.write('new line\n')
+        # Then new lines are returned
+        data = self.getJson(url_for('logs', self.USERNAME, self.REPO, file='backup.log', follow=1, offset=offset))
+        self.assertEqual({'data': 'new line\n', 'offset': offset + 9, 'reset': False, 'ended': True}, data)
+        # When nothing get written
+        # Then no data is returned
+        data = self.getJson(url_for('logs', self.USERNAME, self.REPO, file='backup.log', follow=1, offset=offset + 9))
+        self.assertEqual({'data': '', 'offset': offset + 9, 'reset': False, 'ended': True}, data)
+
+    def test_logs_with_follow_truncated(self):
+        # Given a log file truncated
+        # When following the file
+        data = self.getJson(url_for('logs', self.USERNAME, self.REPO, file='restore.log', follow=1, offset=99999999))
+        # Then the file is read from the beginning
+        self.assertTrue(data['reset'])
+        self.assertIn('Starting restore of', data['data'])
+
+    def test_logs_with_follow_invalid_offset(self):
+        self.getPage(url_for('logs', self.USERNAME, self.REPO, file='backup.log', follow=1, offset=-1))
+        self.assertStatus(400)
+
     def test_logs_does_not_exists(self):
         # Given an invalid repo
         repo = 'invalid'
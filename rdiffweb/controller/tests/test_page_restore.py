@@ -15,7 +15,9 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import io
+import os
 import tarfile
+import tempfile
 import unittest
 import zipfile
 
@@ -134,6 +136,43 @@ class RestoreTest(rdiffweb.test.WebCase):
         self.assertBody("Bring me some Data !\n")
         self.assertHeader('Content-Type', 'application/octet-stream')
 
+    def test_file_with_range(self):
+        # Given a file restored from the last backup
+        url = f"/restore/{self.USERNAME}/{self.REPO}/Revisions/Data?date=1454448640&raw=1"
+        self.getPage(url)
+        self.assertStatus(200)
+        self.assertBody("Version3\n")
+        self.assertHeader('Accept-Ranges', 'bytes')
+        self.assertHeader('Content-Length', '9')
+        etag = self.assertHeader('ETag')
+        # When requesting a range
+        self.getPage(url, headers=[('Range', 'bytes=3-'), ('If-Range', etag)])
+        # Then partial content is returned
+        self.assertStatus(206)
+        self.assertBody("sion3\n")
+        self.assertHeader('Content-Range', 'bytes 3-8/9')
+        # When requesting a range of an outdated file
+        self.getPage(url, headers=[('Range', 'bytes=3-'), ('If-Range', '"outdated"')])
+        # Then the whole file is returned
+        self.assertStatus(200)
+        self.assertBody("Version3\n")
+
+    def test_file_with_range_modified_in_place(self):
+        # Given a file restored from the last backup
+        url = f"/restore/{self.USERNAME}/{self.REPO}/Revisions/Data?date=1454448640&raw=1"
+        self.getPage(url)
+        etag = self.assertHeader('ETag')
+        # When the file is modified in place with the same size
+        path = os.path.join(self.testcases, self.REPO, 'Revisions', 'Data')
+        with open(path, 'r+b') as f:
+            f.write(b'version3\n')
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+        # Then a range request with the previous ETag returns the whole file
+        self.getPage(url, headers=[('Range', 'bytes=3-'), ('If-Range', etag)])
+        self.assertStatus(200)
+        self.assertBody("version3\n")
+
     def test_root_as_tar_gz(self):
         self._restore(self.USERNAME, self.REPO, "", "1414871387", "tar.gz")
         self.assertStatus(200)
@@ -373,3 +412,38 @@ class RestoreTest(rdiffweb.test.WebCase):
         self._restore(self.USERNAME, "broker-repo", "NTDETECT.COM", "1474444786")
         # Then an error is returned
         self.assertInBody('Download is not possible in the current state of your repository:')
+
+
+class RestoreWithCacheTest(rdiffweb.test.WebCase):
+    login = True
+
+    default_config = {'restore-cache-dir': os.path.join(tempfile.gettempdir(), 'test_rdiffweb_restore_cache')}
+
+    def test_folder_with_range(self):
+        # Given a folder restored from the last backup
+        url = f"/restore/{self.USERNAME}/{self.REPO}/Revisions?date=1454448640&kind=tar&raw=1"
+        self.getPage(url)
+        self.assertStatus(200)
+        data = self.body
+        # When requesting a range
+        self.getPage(url, headers=[('Range', 'bytes=512-')])
+        # Then partial content is returned from the cache
+        self.assertStatus(206)
+        self.assertEqual(data[512:], self.body)
+        self.assertHeader('Content-Range', 'bytes 512-%s/%s' % (len(data) - 1, len(data)))
+
+    def test_folder_with_range_in_progress(self):
+        # Given a folder not yet restored
+        url = f"/restore/{self.USERNAME}/{self.REPO}/Revisions?date=1454448640&kind=zip&raw=1"
+        # When requesting a range
+        self.getPage(url, headers=[('Range', 'bytes=0-')])
+        # Then the whole archive is streamed without waiting for the restore to complete
+        self.assertStatus(200)
+        self.assertNoHeader('Content-Range')
+        self.assertHeader('Accept-Ranges', 'bytes')
+        data = self.body
+        # When requesting a range once the archive is in cache
+        self.getPage(url, headers=[('Range', 'bytes=10-')])
+        # Then partial content is returned
+        self.assertStatus(206)
+        self.assertEqual(data[10:], self.body)
@@ -0,0 +1,89 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import cherrypy
+from cherrypy_foundation.url import url_for
+
+import rdiffweb.test
+from rdiffweb.core.model import UserObject
+
+
+class SearchPageTest(rdiffweb.test.WebCase):
+    login = True
+
+    def setUp(self):
+        super().setUp()
+        # Build the file names index.
+        cherrypy.filename_index.filename_index_job()
+
+    def test_search(self):
+        # When searching a deleted file
+        self.getPage(url_for('search', self.USERNAME, self.REPO, q='Empty Text File 3'))
+        # Then the file is found
+        self.assertStatus(200)
+        self.assertInBody('Répertoire Supprimé/Untitled Empty Text File 3')
+        self.assertInBody(
+            url_for('browse', self.USERNAME, self.REPO, 'Répertoire Supprimé', date='2014-11-01T15:51:15-04:00')
+        )
+
+    def test_search_quoted(self):
+        # When searching a file with quoted characters
+        self.getPage(url_for('search', self.USERNAME, self.REPO, q='Char Z'))
+        # Then the file is found
+        self.assertStatus(200)
+        self.assertInBody('Char Z to quote')
+        # Then links use the quoted path
+        self.assertInBody(url_for('history', self.USERNAME, self.REPO, 'Char ;090 to quote'))
+        # When searching a file in a folder with quoted characters
+        self.getPage(url_for('search', self.USERNAME, self.REPO, q='Untitled Testcase'))
+        # Then links to the folder use the quoted path
+        self.assertStatus(200)
+        self.assertInBody('Char Z to quote/Untitled Testcase.doc')
+        self.assertInBody(url_for('browse', self.USERNAME, self.REPO, 'Char ;090 to quote') + '?date=')
+
+    def test_search_not_found(self):
+        self.getPage(url_for('search', self.USERNAME, self.REPO, q='invalid'))
+        self.assertStatus(200)
+        self.assertInBody('No files found')
+
+    def test_search_without_query(self):
+        self.getPage(url_for('search', self.USERNAME, self.REPO))
+        self.assertStatus(200)
+        self.assertNotInBody('No files found')
+
+    def test_search_data_json(self):
+        # When searching files
+        data = self.getJson(url_for('search', 'data.json', self.USERNAME, self.REPO, q='untitled', limit=2))
+        # Then matching files are returned with the dates they exist
+        self.assertStatus(200)
+        self.assertEqual(2, len(data['data']))
+        self.assertEqual(
+            {
+                'path': 'Char ;059090 to quote/Untitled Testcase.doc',
+                'dates': [{'first': '2016-01-20T10:42:21-05:00', 'last': '2016-01-20T10:42:21-05:00'}],
+            },
+            data['data'][0],
+        )
+
+    def test_search_as_another_user(self):
+        # Given a user without access to the repository
+        user_obj = UserObject.add_user('anotheruser', 'password')
+        user_obj.commit()
+        # When searching files of admin
+        self._login('anotheruser', 'password')
+        self.getPage(url_for('search', self.USERNAME, self.REPO, q='untitled'))
+        # Then access is denied
+        self.assertStatus(403)
@@ -14,8 +14,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from unittest import mock
+
+import cherrypy
 from cherrypy_foundation.url import url_for
 
+import rdiffweb.core.metadata_index  # noqa
 import rdiffweb.test
 from rdiffweb.core.model import UserObject
 
@@ -35,10 +39,81 @@ class StatsTest(rdiffweb.test.WebCase):
         self.assertInBody('<table')
         self.assertNotInBody('No backup date selected')
 
+    def test_stats_date_with_summary(self):
+        # Given the largest files of each backup are computed
+        cherrypy.metadata_index.metadata_index_job()
+        # When displaying the statistics of a backup
+        self.getPage(url_for('stats', self.USERNAME, self.REPO, date=1454448640))
+        # Then the largest files are displayed
+        self.assertStatus('200 OK')
+        self.assertInBody('Largest Files')
+        self.assertInBody('YIRUMA - River Flows in You.mp3')
+        self.assertInBody('Folders with Largest Increments')
+        # Then links use the quoted path
+        self.assertInBody(
+            url_for(
+                'restore',
+                self.USERNAME,
+                self.REPO,
+                'Char ;059090 to quote/Untitled Testcase.doc',
+                date='2016-02-02T21:30:40Z',
+            )
+        )
+
     def test_stats_data_json(self):
         self.getPage(url_for('stats', 'data.json', self.USERNAME, self.REPO, date=1454448640))
         self.assertStatus('200 OK')
 
+    def test_stats_data_json_server_side(self):
+        # Given a datatables request sorted by size with a state filter
+        params = {
+            'date': 1454448640,
+            'draw': 3,
+            'start': 0,
+            'length': 2,
+            'order[0][column]': 2,
+            'order[0][dir]': 'desc',
+            'columns[0][data]': 'path',
+            'columns[1][data]': 'state',
+            'columns[1][search][value]': '^unchanged',
+            'columns[1][search][regex]': 'true',
+            'columns[2][data]': 'size',
+            'columns[3][data]': 'increment_size',
+        }
+        # When querying the stats
+        data = self.getJson(url_for('stats', 'data.json', self.USERNAME, self.REPO, **params))
+        # Then a single page is returned
+        self.assertEqual(3, data['draw'])
+        self.assertGreater(data['recordsTotal'], data['recordsFiltered'])
+        self.assertEqual(2, len(data['data']))
+        self.assertEqual({'path', 'state', 'size', 'increment_size'}, set(data['data'][0]))
+        self.assertEqual(['unchanged', 'unchanged'], [row['state'] for row in data['data']])
+        self.assertGreaterEqual(data['data'][0]['size'], data['data'][1]['size'])
+
+    def test_stats_data_json_search(self):
+        # When searching the stats
+        data = self.getJson(
+            url_for('stats', 'data.json', self.USERNAME, self.REPO, date=1454448640, **{'search[value]': 'REVISIONS/'})
+        )
+        # Then only matching path are returned
+        self.assertTrue(data['data'])
+        self.assertTrue(all(row['path'].startswith('Revisions/') for row in data['data']))
+
+    def test_stats_data_json_invalid_regex(self):
+        # When searching with an invalid pattern
+        self.getPage(
+            url_for(
+                'stats',
+                'data.json',
+                self.USERNAME,
+                self.REPO,
+                date=1454448640,
+                **{'columns[1][data]': 'state', 'columns[1][search][value]': '(', 'columns[1][search][regex]': 'true'},
+            )
+        )
+        # Then an error is returned
+        self.assertStatus(400)
+
     def test_stats_date_selenium(self):
         with self.selenium() as driver:
             # When browsing graph
@@ -66,6 +141,178 @@ class StatsTest(rdiffweb.test.WebCase):
         self.getPage("/stats/anotheruser/testcases/")
         self.assertStatus('403 Forbidden')
 
+    def test_stats_diff(self):
+        # When comparing the last backup with the previous one
+        self.getPage(url_for('stats', 'diff', self.USERNAME, self.REPO))
+        # Then changes are displayed
+        self.assertStatus(200)
+        self.assertInBody('Compare Backups')
+        self.assertInBody('BrokenSymlink')
+        self.assertInBody('Char ;090 to quote')
+        self.assertInBody('Removed')
+        # Then links use the quoted path
+        self.assertInBody(
+            url_for('browse', self.USERNAME, self.REPO, 'Char ;059090 to quote', date='2016-02-02T16:30:40-05:00')
+        )
+
+    def test_stats_diff_paged(self):
+        # Given a page size smaller then the number of changes
+        with mock.patch('rdiffweb.controller.page_stats.DIFF_PAGE_SIZE', 2):
+            # When comparing backups
+            self.getPage(url_for('stats', 'diff', self.USERNAME, self.REPO, start=1414871387, end=1454448640))
+            # Then client-side filter and sort are disabled
+            self.assertStatus(200)
+            self.assertInBody('Next changes')
+            self.assertInBody('data-searching="false"')
+            self.assertInBody('data-ordering="false"')
+        # When all changes fit in a single page
+        self.getPage(url_for('stats', 'diff', self.USERNAME, self.REPO, start=1414871387, end=1454448640))
+        # Then client-side filter and sort are enabled
+        self.assertNotInBody('Next changes')
+        self.assertInBody('data-searching="true"')
+        self.assertInBody('data-ordering="true"')
+
+    def test_stats_diff_no_changes(self):
+        # When comparing a backup with itself
+        self.getPage(url_for('stats', 'diff', self.USERNAME, self.REPO, start=1454448640, end=1454448640))
+        # Then no changes are displayed
+        self.assertStatus(200)
+        self.assertInBody('No changes')
+
+    def test_stats_diff_json(self):
+        # When querying the first page of changes
+        data = self.getJson(
+            url_for('stats', 'diff.json', self.USERNAME, self.REPO, start=1414871387, end=1454448640, limit=5)
+        )
+        # Then a page of changes is returned
+        self.assertStatus(200)
+        self.assertEqual(5, len(data['data']))
+        self.assertEqual({'path', 'change', 'type', 'old_size', 'new_size'}, set(data['data'][0].keys()))
+        self.assertIsNotNone(data['next'])
+        # When querying all pages
+        changes = data['data']
+        while data['next']:
+            data = self.getJson(
+                url_for(
+                    'stats',
+                    'diff.json',
+                    self.USERNAME,
+                    self.REPO,
+                    start=1414871387,
+                    end=1454448640,
+                    limit=5,
+                    cursor=data['next'],
+                )
+            )
+            changes.extend(data['data'])
+        # Then all changes are returned once
+        paths = [c['path'] for c in changes]
+        self.assertEqual(len(paths), len(set(paths)))
+        self.assertIn(
+            {'path': 'Revisions', 'change': 'added', 'type': 'dir', 'old_size': None, 'new_size': None}, changes
+        )
+        self.assertIn(
+            {'path': 'Fichier @ <root>', 'change': 'modified', 'type': 'reg', 'old_size': 0, 'new_size': 13}, changes
+        )
+
+    def test_stats_diff_json_invalid_date(self):
+        self.getPage(url_for('stats', 'diff.json', self.USERNAME, self.REPO, start=1414871388, end=1454448640))
+        self.assertStatus(404)
+
+    def test_stats_deleted_paged(self):
+        # Given a page size smaller then the number of deleted files
+        with mock.patch('rdiffweb.controller.page_stats.DIFF_PAGE_SIZE', 1):
+            # When searching for deleted files
+            self.getPage(url_for('stats', 'deleted', self.USERNAME, self.REPO, start=1414871387, end=1454448640))
+            # Then client-side filter and sort are disabled
+            self.assertStatus(200)
+            self.assertInBody('Next files')
+            self.assertInBody('data-searching="false"')
+            self.assertInBody('data-ordering="false"')
+
+    def test_stats_deleted(self):
+        # When searching for files deleted during the last days of backups
+        self.getPage(url_for('stats', 'deleted', self.USERNAME, self.REPO))
+        # Then deleted files are displayed with a link to restore them
+        self.assertStatus(200)
+        self.assertInBody('Deleted Files')
+        self.assertInBody('Char ;059090 to quote/Untitled Testcase.doc')
+        self.assertInBody(
+            url_for(
+                'restore',
+                self.USERNAME,
+                self.REPO,
+                'Char ;059059090 to quote/Untitled Testcase.doc',
+                date='2016-01-20T10:42:21-05:00',
+            )
+        )
+        # When following the link
+        self.getPage(
+            url_for(
+                'restore',
+                self.USERNAME,
+                self.REPO,
+                'Char ;059059090 to quote/Untitled Testcase.doc',
+                date='2016-01-20T10:42:21-05:00',
+            )
+        )
+        # Then the file is restored
+        self.assertStatus(200)
+
+    def test_stats_deleted_json(self):
+        # When querying deleted files over the whole history
+        params = {'start': 1414871387, 'end': 1454448640, 'limit': 5}
+        data = self.getJson(url_for('stats', 'deleted.json', self.USERNAME, self.REPO, **params))
+        # Then a page of deleted files is returned
+        self.assertStatus(200)
+        self.assertEqual(5, len(data['data']))
+        self.assertEqual(
+            {'path', 'state', 'size', 'date', 'restore_date', 'url'},
+            set(data['data'][0].keys()),
+        )
+        # When querying all pages
+        changes = data['data']
+        while data['next']:
+            data = self.getJson(
+                url_for('stats', 'deleted.json', self.USERNAME, self.REPO, cursor=data['next'], **params)
+            )
+            changes.extend(data['data'])
+        # Then all deleted files are returned once
+        paths = [c['path'] for c in changes]
+        self.assertEqual(14, len(paths))
+        self.assertEqual(len(paths), len(set(paths)))
+        self.assertEqual({'deleted'}, {c['state'] for c in changes})
+        self.assertIn(
+            {
+                'path': 'Répertoire Existant/Fichier supprimé',
+                'state': 'deleted',
+                'size': 19,
+                'date': '2014-11-01T15:51:29-04:00',
+                'restore_date': '2014-11-01T15:51:15-04:00',
+                'url': url_for(
+                    'restore',
+                    self.USERNAME,
+                    self.REPO,
+                    'Répertoire Existant/Fichier supprimé',
+                    date='2014-11-01T15:51:15-04:00',
+                ),
+            },
+            changes,
+        )
+
+    def test_stats_deleted_json_with_changed(self):
+        # When including changed files
+        data = self.getJson(
+            url_for('stats', 'deleted.json', self.USERNAME, self.REPO, start=1414871387, end=1454448640, changed=1)
+        )
+        # Then changed files are returned
+        self.assertStatus(200)
+        self.assertEqual({'deleted', 'changed'}, {c['state'] for c in data['data']})
+
+    def test_stats_deleted_json_invalid_cursor(self):
+        self.getPage(url_for('stats', 'deleted.json', self.USERNAME, self.REPO, cursor='a'))
+        self.assertStatus(400)
+
     def test_does_not_exists(self):
         # Given an invalid repo
         repo = 'invalid'
@@ -811,6 +811,96 @@ def get_parser():
         help='alternate temporary folder to be used when restoring files. Might be useful if the default location has limited disk space. Default to TEMPDIR environment or `/tmp`.',
     )
 
+    parser.add(
+        '--cache-dir',
+        metavar='FOLDER',
+        help='location where to store indexes built from repositories metadata to speed up the web interface. When undefined, a temporary folder is used and indexes are rebuilt every time the server restarts.',
+    )
+
+    parser.add(
+        '--restore-cache-dir',
+        metavar='FOLDER',
+        help='location where to keep restored files and archives so repeated downloads are served without running rdiff-backup again. When undefined, restored files are not cached.',
+    )
+
+    parser.add(
+        '--restore-cache-size',
+        metavar='MIB',
+        help='maximum amount of disk space in MiB used by the restore cache. Least recently used entries are deleted first. Default to 1024 MiB.',
+        type=int,
+        default=1024,
+    )
+
+    parser.add(
+        '--restore-compression-level',
+        metavar='LEVEL',
+        help='compression level of archives created when restoring a folder. From 1 to 9 for zip and tar.gz, from 1 to 22 for tar.zst. Default to 6 for zip, 9 for tar.gz and 3 for tar.zst.',
+        type=int,
+    )
+
+    parser.add(
+        '--restore-compression-threads',
+        metavar='COUNT',
+        help='number of threads used to compress tar.gz and tar.zst archives. Default to the number of CPUs.',
+        type=int,
+    )
+
+    parser.add(
+        '--metadata-index-interval',
+        metavar='MINUTES',
+        help='interval in minutes between two executions of the job building the index of the last backup of each repository. Set to 0 to disable. Default to 15 minutes.',
+        type=int,
+        default=15,
+    )
+
+    parser.add(
+        '--top-files-count',
+        metavar='COUNT',
+        help='number of largest files and folders kept for each backup and displayed in file statistics. Default to 20.',
+        type=int,
+        default=20,
+    )
+
+    parser.add(
+        '--top-folders-depth',
+        metavar='DEPTH',
+        help='maximum depth of folders for which the size of increments is summed up for each backup. Default to 2.',
+        type=int,
+        default=2,
+    )
+
+    parser.add(
+        '--filename-index-interval',
+        metavar='MINUTES',
+        help='interval in minutes between two updates of the index used to search file names in the backup history of each repository. Set to 0 to disable. Default to 60 minutes.',
+        type=int,
+        default=60,
+    )
+
+    parser.add(
+        '--repo-cache-size',
+        metavar='MIB',
+        help='maximum amount of memory in MiB used to keep repositories metadata in memory between requests. Default to 64 MiB.',
+        type=int,
+        default=64,
+    )
+
+    parser.add(
+        '--dir-cache-size',
+        metavar='MIB',
+        help='maximum amount of memory in MiB used to keep directory listings in memory. Default to 32 MiB.',
+        type=int,
+        default=32,
+    )
+
+    parser.add(
+        '--dir-cache-entries',
+        metavar='COUNT',
+        help='maximum number of directory listings to keep in memory. Default to 10000.',
+        type=int,
+        default=10000,
+    )
+
     parser.add(
         '--disable-ssh-keys',
         action='store_true',
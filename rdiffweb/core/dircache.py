@@ -13,16 +13,35 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import errno
 import logging
 import os
+import sys
 import threading
 import time
+from collections import OrderedDict
 
 import cherrypy
 from cherrypy.process.plugins import Monitor
 
+from rdiffweb.core import inotify
+from rdiffweb.core.memsize import estimate_size
+
 logger = logging.getLogger(__name__)
 
+# Events making a directory listing outdated.
+_WATCH_MASK = (
+    inotify.IN_CREATE
+    | inotify.IN_DELETE
+    | inotify.IN_MOVED_FROM
+    | inotify.IN_MOVED_TO
+    | inotify.IN_ATTRIB
+    | inotify.IN_DELETE_SELF
+    | inotify.IN_MOVE_SELF
+    | inotify.IN_ONLYDIR
+    | inotify.IN_DONT_FOLLOW
+)
+
 
 class DirCache(Monitor):
     """
@@ -30,20 +49,65 @@ class DirCache(Monitor):
     periodically in the background so listdir() rarely needs to rescan.
 
     frequency: seconds between maintenance cycles (default 1 min).
+
+    inotify: on Linux, watch cached directories using inotify. Listing of
+    watched directories are served without lstat() until they get updated.
+    Pending events are read before serving a listing, so changes made by
+    this process are visible immediately. Directories that cannot be
+    watched, e.g. when the watch limit is reached, are validated using
+    their mtime.
+
+    max_entries, max_size: maximum number of directories and approximate
+    memory in bytes used by the listings. Least recently used listings are
+    evicted when a limit is reached.
     """
 
     frequency = 60  # default cadence (1 min)
 
     max_refresh_per_cycle = 10
 
+    inotify = True
+
+    max_entries = 10000
+
+    max_size = 32 * 1024 * 1024
+
     def __init__(self, bus, frequency=frequency, max_refresh_per_cycle=max_refresh_per_cycle):
         self._lock = threading.RLock()
-        # Ordered "set+cache": path -> None or (mtime_ns, tuple(names))
-        self._cache_entries = {}
-        self._max_refresh = max_refresh_per_cycle
+        # Ordered "set+cache" from least to most recently used: path -> None or (mtime_ns, tuple(names))
+        self._cache_entries = OrderedDict()
+        # Values derived from listing: path -> (mtime_ns, {key: value})
+        self._derived = {}
+        # Approximate memory used by path: path -> (listing size, derived values size)
+        self._sizes = {}
+        self._size = 0
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.refreshes = 0
+        self.refresh_cycles = 0
+        self.refresh_time = 0.0
+        self.max_refresh_per_cycle = max_refresh_per_cycle
         self._round_robin_idx = 0
+        # Inotify state: watched path -> wd, wd -> set(paths)
+        self._inotify = None
+        self._inotify_failed = False
+        self._watches = {}
+        self._wd_paths = {}
+        # Watched paths without changes since last listing.
+        self._clean = set()
+        # Number of events received by watched path. Used to detect changes during a scan.
+        self._changes = {}
+        self._overflows = 0
+        self._watch_limit_reached = False
         super().__init__(bus, self.run, frequency or self.frequency, "dir-cache")
 
+    def stop(self):
+        super().stop()
+        self._stop_inotify()
+
     # ------------- public API -------------
 
     def add_path(self, path):
@@ -51,30 +115,87 @@ class DirCache(Monitor):
         with self._lock:
             # Insert only if absent; keep position otherwise
             self._cache_entries.setdefault(path, None)
+            self._evict()
 
     def remove_path(self, path):
         path = os.path.abspath(path)
         with self._lock:
-            self._cache_entries.pop(path, None)
+            self._discard(path)
 
-    def listdir(self, path, _update=False):
+    @property
+    def size(self):
+        """Approximate memory used by the cached listings in bytes."""
+        return self._size
+
+    def __len__(self):
+        return len(self._cache_entries)
+
+    def _discard(self, path):
+        # Called with lock.
+        self._cache_entries.pop(path, None)
+        self._derived.pop(path, None)
+        self._size -= sum(self._sizes.pop(path, (0, 0)))
+        self._unwatch(path)
+
+    def _account(self, path, listing_size=None, derived_size=0):
+        # Called with lock. Update memory usage of path and evict least recently used listings.
+        old = self._sizes.get(path, (0, 0))
+        new = (old[0] if listing_size is None else listing_size, derived_size)
+        self._sizes[path] = new
+        self._size += sum(new) - sum(old)
+        self._evict()
+
+    def _evict(self):
+        # Called with lock. Keep at least the most recent entry.
+        entries = self._cache_entries
+        while len(entries) > 1 and (len(entries) > self.max_entries or self._size > self.max_size):
+            self._discard(next(iter(entries)))
+            self.evictions += 1
+
+    def _mtime(self, path):
+        """
+        Return the modification time of `path`. Avoid lstat() when the path
+        is watched and did not change since last listing.
+        """
+        with self._lock:
+            self._read_events()
+            if path in self._clean:
+                entry = self._cache_entries.get(path)
+                if entry is not None:
+                    return entry[0]
         try:
-            mtime = os.lstat(path).st_mtime_ns
+            return os.lstat(path).st_mtime_ns
         except OSError:
             self.remove_path(path)
             raise
 
+    def listdir(self, path, _update=False):
+        mtime = self._mtime(path)
+
         with self._lock:
             entry = self._cache_entries.get(path)
-
-        # Fast path: have cache and mtime matches
-        if entry is not None and entry[0] == mtime:
-            # return a copy as list to avoid exposing our tuple
-            return False if _update else list(entry[1])
+            # Fast path: have cache and mtime matches
+            if entry is not None and entry[0] == mtime:
+                if _update:
+                    return False
+                self.hits += 1
+                self._cache_entries.move_to_end(path)
+                # return a copy as list to avoid exposing our tuple
+                return list(entry[1])
+            if not _update:
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self.stale += 1
 
         # Miss or stale: refresh on caller’s thread (avoid holding the lock during I/O)
         if not _update:
             logger.debug("cache miss for %s", path)
+        # Start watching before the scan to not miss any changes.
+        watched = self._watch(path)
+        with self._lock:
+            self._clean.discard(path)
+            changes = (self._changes.get(path, 0), self._overflows)
         names = [e.name for e in os.scandir(path)]
         try:
             mtime2 = os.lstat(path).st_mtime_ns
@@ -83,12 +204,137 @@ class DirCache(Monitor):
             raise
 
         with self._lock:
+            self._read_events()
             # Only publish if not changed during scan; otherwise let background run catch up
             if mtime == mtime2:
-                self._cache_entries[path] = (mtime2, tuple(names))
+                names_tuple = tuple(names)
+                self._cache_entries[path] = (mtime2, names_tuple)
+                if not _update:
+                    self._cache_entries.move_to_end(path)
+                derived = self._derived.get(path)
+                if derived is not None and derived[0] != mtime2:
+                    # Derived values are outdated.
+                    del self._derived[path]
+                    derived = None
+                listing_size = sys.getsizeof(names_tuple) + sum(sys.getsizeof(n) for n in names_tuple)
+                self._account(path, listing_size, self._sizes.get(path, (0, 0))[1] if derived else 0)
+                if watched and changes == (self._changes.get(path, 0), self._overflows):
+                    self._clean.add(path)
 
         return True if _update else names
 
+    def derive(self, path, key, func):
+        """
+        Return a value derived from the listing of `path` computed using
+        `func(names)`. The value is cached alongside the listing and
+        computed again when the directory get updated.
+        """
+        mtime = self._mtime(path)
+
+        with self._lock:
+            derived = self._derived.get(path)
+            if derived is not None and derived[0] == mtime and key in derived[1]:
+                self.hits += 1
+                self._cache_entries.move_to_end(path)
+                return derived[1][key]
+
+        names = self.listdir(path)
+        value = func(names)
+
+        with self._lock:
+            # Only keep values derived from a listing matching the mtime.
+            entry = self._cache_entries.get(path)
+            if entry is not None and entry[0] == mtime:
+                derived = self._derived.get(path)
+                if derived is None or derived[0] != mtime:
+                    derived = self._derived[path] = (mtime, {})
+                derived[1][key] = value
+                self._account(path, derived_size=estimate_size(derived[1]))
+        return value
+
+    # ------------- inotify -------------
+
+    def _start_inotify(self):
+        # Called with lock.
+        try:
+            self._inotify = inotify.Inotify()
+        except OSError as e:
+            logger.info("inotify not available, directory cache is using polling: %s", e)
+            self._inotify_failed = True
+            return False
+        return True
+
+    def _stop_inotify(self):
+        with self._lock:
+            if self._inotify is None:
+                return
+            self._inotify.close()
+            self._inotify = None
+            self._watches.clear()
+            self._wd_paths.clear()
+            self._clean.clear()
+            self._changes.clear()
+
+    def _watch(self, path):
+        """
+        Start watching the given path. Return True if the path is watched.
+        """
+        with self._lock:
+            if path in self._watches:
+                return True
+            if not self.inotify or self._inotify_failed:
+                return False
+            if self._inotify is None and not self._start_inotify():
+                return False
+            try:
+                wd = self._inotify.add_watch(path, _WATCH_MASK)
+            except OSError as e:
+                if e.errno == errno.ENOSPC and not self._watch_limit_reached:
+                    logger.warning("inotify watch limit reached, directory cache is using polling")
+                    self._watch_limit_reached = True
+                return False
+            self._watches[path] = wd
+            self._wd_paths.setdefault(wd, set()).add(path)
+            return True
+
+    def _unwatch(self, path):
+        # Called with lock.
+        self._clean.discard(path)
+        self._changes.pop(path, None)
+        wd = self._watches.pop(path, None)
+        if wd is None:
+            return
+        paths = self._wd_paths.get(wd)
+        paths.discard(path)
+        if not paths:
+            del self._wd_paths[wd]
+            self._inotify.rm_watch(wd)
+
+    def _read_events(self):
+        # Called with lock. Process pending events without blocking.
+        while self._inotify is not None:
+            events = self._inotify.read_events()
+            if not events:
+                return
+            for wd, mask, _name in events:
+                self._handle_event(wd, mask)
+
+    def _handle_event(self, wd, mask):
+        # Called with lock.
+        if mask & inotify.IN_Q_OVERFLOW:
+            # Events are lost, every listing need to be validated again.
+            self._overflows += 1
+            self._clean.clear()
+            return
+        for path in self._wd_paths.get(wd, ()):
+            self._clean.discard(path)
+            self._changes[path] = self._changes.get(path, 0) + 1
+        if mask & inotify.IN_IGNORED:
+            # Watch removed by the kernel, e.g. directory deleted.
+            for path in self._wd_paths.pop(wd, ()):
+                self._watches.pop(path, None)
+                self._changes.pop(path, None)
+
     # ------------- background maintenance -------------
 
     def run(self):
@@ -96,12 +342,16 @@ class DirCache(Monitor):
 
         # Snapshot keys and compute the batch in round-robin order
         with self._lock:
+            self._read_events()
             if not self._cache_entries:
                 return
-            keys = list(self._cache_entries.keys())
+            # Watched directories are known to be up to date.
+            keys = [path for path in self._cache_entries.keys() if path not in self._clean]
+            if not keys:
+                return
             n_total = len(keys)
             start = self._round_robin_idx % n_total
-            n = n_total if self._max_refresh is None else min(self._max_refresh, n_total)
+            n = n_total if self.max_refresh_per_cycle is None else min(self.max_refresh_per_cycle, n_total)
             batch_idx = [(start + i) % n_total for i in range(n)]
             batch_paths = [keys[i] for i in batch_idx]
 
@@ -121,13 +371,17 @@ class DirCache(Monitor):
 
         # Apply removals and advance the RR index
         if last_path:
-            # Advance to the element after the last processed path that still exists.
-            keys_now = list(self._cache_entries.keys())
-            next_idx = (keys_now.index(last_path) + 1) % len(keys_now)
-            self._round_robin_idx = next_idx
+            # Advance to the element after the last processed path.
+            self._round_robin_idx = (keys.index(last_path) + 1) % n_total
+
+        elapsed = time.time() - t0
+        with self._lock:
+            self.refreshes += refreshed
+            self.refresh_cycles += 1
+            self.refresh_time += elapsed
 
         if refreshed:
-            logger.debug("dir-cache refreshed %d/%d dirs in %.3fs", refreshed, len(batch_paths), time.time() - t0)
+            logger.debug("dir-cache refreshed %d/%d dirs in %.3fs", refreshed, len(batch_paths), elapsed)
 
 
 cherrypy.dircache = DirCache(cherrypy.engine)
@@ -0,0 +1,119 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import os
+import threading
+
+import cherrypy
+import psutil
+from cherrypy.process.plugins import SimplePlugin
+
+from rdiffweb.core.model import RepoObject
+
+_logger = logging.getLogger(__name__)
+
+
+class FilenameIndexPlugin(SimplePlugin):
+    """
+    Periodically update the index of file names of each repository used to
+    search files across the backup history. The index is updated from a
+    dedicated thread running with low CPU and I/O priority to reduce its
+    impact on system resources.
+    """
+
+    # Interval in seconds between two executions. Zero to disable.
+    interval = 3600
+
+    # `nice` CPU priority level (0-19, higher means lower priority)
+    nice_level = 19
+
+    # `ionice` class: 1=realtime, 2=best-effort, 3=idle
+    ionice_class = 3
+
+    _lock = threading.Lock()
+
+    def start(self):
+        if not self.interval:
+            return
+        self.bus.log('Start FilenameIndex plugin')
+        self.bus.publish('scheduler:add_job', self.filename_index_job, self.interval, run_on_start=True)
+
+    def stop(self):
+        self.bus.log('Stop FilenameIndex plugin')
+        self.bus.publish('scheduler:remove_job', self.filename_index_job)
+
+    stop.priority = 49
+
+    def graceful(self):
+        """Reload of subscribers."""
+        self.stop()
+        self.start()
+
+    def _set_low_priority(self):
+        """
+        Lower CPU and I/O priority of the current thread.
+        """
+        tid = threading.get_native_id()
+        try:
+            os.setpriority(os.PRIO_PROCESS, tid, self.nice_level)
+        except (AttributeError, OSError):
+            _logger.debug('fail to change thread priority', exc_info=1)
+        try:
+            psutil.Process(tid).ionice(self.ionice_class)
+        except (AttributeError, ValueError, psutil.Error):
+            _logger.debug('fail to change thread I/O priority', exc_info=1)
+
+    def _update_filename_index(self, repos):
+        self._set_low_priority()
+        for repo in repos:
+            if not os.path.isdir(repo.full_path):
+                continue
+            try:
+                if repo.status[0] != 'ok':
+                    continue
+                repo.update_filename_index()
+            except Exception:
+                _logger.exception("fail to update file names index for repo [%r]", repo.full_path)
+
+    def filename_index_job(self):
+        # Skip execution if an update is already running
+        if not self._lock.acquire(blocking=False):
+            _logger.info('file names index update already running, skipping')
+            return
+        try:
+            # A race condition may occur.
+            if cherrypy.db.session is None:
+                return
+            # Make sure to start from a clean session.
+            cherrypy.db.clear_sessions()
+            with cherrypy.db.session.begin():
+                repos = RepoObject.query.all()
+                cherrypy.db.session.expunge_all()
+            # Priority is changed in a dedicated thread since it cannot be restored.
+            thread = threading.Thread(
+                target=self._update_filename_index, args=(repos,), name='filename_index', daemon=True
+            )
+            thread.start()
+            thread.join()
+        finally:
+            self._lock.release()
+
+
+cherrypy.filename_index = FilenameIndexPlugin(cherrypy.engine)
+cherrypy.filename_index.subscribe()
+
+cherrypy.config.namespaces['filename_index'] = lambda key, value: setattr(cherrypy.filename_index, key, value)
@@ -0,0 +1,849 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+On-disk indexes derived from rdiff-backup-data metadata files.
+
+Metadata files like `file_statistics.<date>.data.gz` are compressed text files
+that can only be read sequentially. Looking up a single path requires reading
+the whole file. This module maintains a sidecar index for each of these files,
+either an SQLite database or a compact memory-mapped file, stored in a cache
+folder, so a single path can be looked up in O(log n). Each index records the
+size and mtime of its source file and is rebuilt transparently when the source
+changes.
+"""
+
+import bisect
+import hashlib
+import logging
+import mmap
+import os
+import re
+import shutil
+import sqlite3
+import struct
+import tempfile
+import threading
+from urllib.parse import quote
+
+import cherrypy
+from cherrypy.process.plugins import SimplePlugin
+
+logger = logging.getLogger(__name__)
+
+
+# Characters with special meaning in a LIKE pattern.
+_LIKE_ESCAPE = re.compile(rb'[\\%_]')
+
+
+def _state(changed, source_size, mirror_size, increment_size):
+    """
+    Determine how the file was changed by the backup.
+    """
+    if changed == 0:
+        return 'unchanged'
+    elif source_size is None:
+        return 'deleted'
+    elif mirror_size is None and increment_size == 0:
+        return 'new'
+    return 'changed'
+
+
+def _size(changed, source_size, mirror_size, increment_size):
+    """
+    Return either the source or mirror file size.
+    """
+    if source_size is not None:
+        return source_size
+    elif mirror_size is not None:
+        return mirror_size
+    return 0
+
+
+class SQLiteIndex:
+    """
+    Base class of an SQLite index derived from a single source file.
+    Subclasses define the schema and how rows are stored in `_populate()`.
+    """
+
+    # Bump this version when the schema changes to force a rebuild.
+    VERSION = 1
+
+    SUFFIX = b'.idx'
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    @classmethod
+    def _populate(cls, conn, rows):
+        raise NotImplementedError()
+
+    @classmethod
+    def build(cls, index_path, rows, source_stat):
+        """
+        Create a new index from the given `rows`. The index is written into
+        a temporary file then moved in place to avoid exposing a partial
+        index to concurrent readers.
+        """
+        fd, tmp_path = tempfile.mkstemp(prefix=b'.', suffix=b'.tmp', dir=os.path.dirname(index_path))
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(os.fsdecode(tmp_path))
+            try:
+                conn.execute('PRAGMA journal_mode=OFF')
+                conn.execute('PRAGMA synchronous=OFF')
+                conn.execute('CREATE TABLE source (mtime INTEGER, size INTEGER)')
+                cls._populate(conn, rows)
+                conn.execute('INSERT INTO source VALUES (?, ?)', (source_stat.st_mtime_ns, source_stat.st_size))
+                conn.execute('PRAGMA user_version=%d' % cls.VERSION)
+                conn.commit()
+            finally:
+                conn.close()
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def open(cls, index_path, source_stat):
+        """
+        Open an existing index. Return None if the index doesn't exists or
+        doesn't match the source file.
+        """
+        try:
+            conn = sqlite3.connect('file:%s?mode=ro' % quote(os.fsdecode(index_path)), uri=True)
+        except sqlite3.OperationalError:
+            # Raised when the file doesn't exists
+            return None
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            row = conn.execute('SELECT mtime, size FROM source').fetchone()
+            if version == cls.VERSION and row == (source_stat.st_mtime_ns, source_stat.st_size):
+                return cls(conn)
+        except sqlite3.DatabaseError:
+            logger.warning('invalid index %r', index_path, exc_info=1)
+        conn.close()
+        return None
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class FileStatisticsIndex(SQLiteIndex):
+    """
+    SQLite index of a single `file_statistics` file keyed by path.
+    """
+
+    STATES = ['new', 'deleted', 'changed', 'unchanged']
+
+    ORDERS = ['path', 'state', 'size', 'increment_size']
+
+    VERSION = 2
+
+    @classmethod
+    def _populate(cls, conn, rows):
+        conn.execute(
+            'CREATE TABLE file_statistics ('
+            'path BLOB PRIMARY KEY, '
+            'changed INTEGER, '
+            'source_size INTEGER, '
+            'mirror_size INTEGER, '
+            'increment_size INTEGER, '
+            'state TEXT, '
+            'size INTEGER) WITHOUT ROWID'
+        )
+        conn.executemany(
+            'INSERT OR REPLACE INTO file_statistics VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (row + (_state(*row[1:]), _size(*row[1:])) for row in rows),
+        )
+        # Secondary indexes used to sort and filter without loading every rows.
+        conn.execute('CREATE INDEX file_statistics_state ON file_statistics (state, path)')
+        conn.execute('CREATE INDEX file_statistics_size ON file_statistics (size, path)')
+        conn.execute('CREATE INDEX file_statistics_increment_size ON file_statistics (increment_size, path)')
+
+    def get(self, path):
+        """
+        Return a tuple (changed, source_size, mirror_size, increment_size) for
+        the given path or None if the path is not found.
+        """
+        return self._conn.execute(
+            'SELECT changed, source_size, mirror_size, increment_size FROM file_statistics WHERE path=?',
+            (path,),
+        ).fetchone()
+
+    def query(self, start=0, length=None, order='path', reverse=False, search=None, states=None):
+        """
+        Return a tuple (total, filtered, rows) where `rows` is a page of
+        (path, state, size, increment_size) sorted by `order` and filtered
+        using `search`, a bytes substring of the path, and `states`, a list
+        of accepted states. Sorting, filtering and pagination are done by
+        SQLite, so memory usage doesn't depend on the number of entries.
+        """
+        if order not in self.ORDERS:
+            raise ValueError('invalid order %r' % order)
+        where = []
+        args = []
+        if search:
+            # LIKE only matches text values. Paths are stored as BLOB.
+            where.append("CAST(path AS TEXT) LIKE CAST(? AS TEXT) ESCAPE '\\'")
+            args.append(b'%' + _LIKE_ESCAPE.sub(rb'\\\g<0>', search) + b'%')
+        if states is not None:
+            where.append('state IN (%s)' % ','.join('?' * len(states)))
+            args.extend(states)
+        where = (' WHERE ' + ' AND '.join(where)) if where else ''
+        total = self._conn.execute('SELECT count(*) FROM file_statistics').fetchone()[0]
+        if where:
+            filtered = self._conn.execute('SELECT count(*) FROM file_statistics' + where, args).fetchone()[0]
+        else:
+            filtered = total
+        direction = ' DESC' if reverse else ''
+        order_by = order + direction if order == 'path' else '%s%s, path%s' % (order, direction, direction)
+        rows = self._conn.execute(
+            'SELECT path, state, size, increment_size FROM file_statistics%s ORDER BY %s LIMIT ? OFFSET ?'
+            % (where, order_by),
+            args + [-1 if length is None else length, start],
+        ).fetchall()
+        return total, filtered, rows
+
+
+class FileChangesIndex(SQLiteIndex):
+    """
+    SQLite index of the files deleted or changed by the backups of a range
+    of dates, built from multiple `file_statistics` files. Each path is
+    recorded once per state with the most recent backup date.
+    """
+
+    STATES = ['deleted', 'changed']
+
+    SUFFIX = b'.changes'
+
+    @classmethod
+    def _populate(cls, conn, rows):
+        """
+        Rows are (path, changed, source_size, mirror_size, increment_size, date)
+        sorted by date.
+        """
+        conn.execute(
+            'CREATE TABLE changes ('
+            'path BLOB, '
+            'state TEXT, '
+            'size INTEGER, '
+            'date INTEGER, '
+            'PRIMARY KEY (path, state)) WITHOUT ROWID'
+        )
+        conn.executemany(
+            'INSERT OR REPLACE INTO changes VALUES (?, ?, ?, ?)',
+            (
+                (row[0], state, _size(*row[1:5]), row[5])
+                for row in rows
+                for state in [_state(*row[1:5])]
+                if state in cls.STATES
+            ),
+        )
+
+    def query(self, states=None, cursor=None, limit=None):
+        """
+        Return a list of (path, state, size, date) sorted by path and state.
+        `cursor` is the tuple (path, state) of the last row returned by a
+        previous call.
+        """
+        where = []
+        args = []
+        if states is not None:
+            where.append('state IN (%s)' % ','.join('?' * len(states)))
+            args.extend(states)
+        if cursor is not None:
+            where.append('(path, state) > (?, ?)')
+            args.extend(cursor)
+        where = (' WHERE ' + ' AND '.join(where)) if where else ''
+        return self._conn.execute(
+            'SELECT path, state, size, date FROM changes%s ORDER BY path, state LIMIT ?' % where,
+            args + [-1 if limit is None else limit],
+        ).fetchall()
+
+
+class _Names:
+    """
+    Read-only sequence of the names referenced by a range of fixed-width
+    records of a MirrorMetadataIndex. Used with `bisect`.
+    """
+
+    def __init__(self, index, offset, record, start, stop):
+        self._index = index
+        self._offset = offset + start * record.size
+        self._record = record
+        self._len = stop - start
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._len:
+            raise IndexError(i)
+        return self._index._name(self._offset + i * self._record.size)
+
+
+class MirrorMetadataIndex:
+    """
+    Compact memory-mapped index of the tree recorded by rdiff-backup at a
+    given date, searched by parent directory and name.
+
+    The file is made of fixed-width arrays that are searched by bisection
+    directly in the mapped memory. Opening an index doesn't read it and a
+    lookup only touches the pages it needs.
+
+    * header: magic, version, stat of the source file and location of each section.
+    * entries: (name offset, name length, type, size, mtime, SHA1, symlink
+      target offset, symlink target length) grouped by parent directory and
+      sorted by name.
+    * directories: (path offset, path length, first entry, number of entries)
+      sorted by path.
+    * names: every name, symlink target and directory path concatenated.
+    """
+
+    VERSION = 2
+
+    SUFFIX = b'.tree'
+
+    MAGIC = b'RDWTREE\0'
+
+    # Type of entries. Unknown types are stored as None.
+    TYPES = [None, 'reg', 'dir', 'sym', 'fifo', 'sock', 'dev']
+
+    # Value stored for undefined size or mtime.
+    _UNDEFINED = -(2**63)
+
+    _NO_SHA1 = bytes(20)
+
+    _HEADER = struct.Struct('<8sIqqQQQQ')
+    _ENTRY = struct.Struct('<QIBqq20sQI')
+    _DIR = struct.Struct('<QIQQ')
+    # Common prefix of entries and directories.
+    _NAME = struct.Struct('<QI')
+
+    def __init__(self, data, entries_offset, dirs_offset, dirs_count, names_offset):
+        self._data = data
+        self._entries_offset = entries_offset
+        self._dirs_offset = dirs_offset
+        self._dirs_count = dirs_count
+        self._names_offset = names_offset
+
+    @classmethod
+    def build(cls, index_path, rows, source_stat):
+        """
+        Create a new index from `rows`, tuples of (path, type, size, mtime, sha1, target)
+        sorted like mirror_metadata. Entries are written while reading the
+        rows: only the children of the directories being walked are kept in
+        memory.
+        """
+        fd, tmp_path = tempfile.mkstemp(prefix=b'.', suffix=b'.tmp', dir=os.path.dirname(index_path))
+        try:
+            with open(fd, 'wb') as f, tempfile.TemporaryFile(dir=os.path.dirname(index_path)) as names:
+                f.write(bytes(cls._HEADER.size))
+                entries_count = 0
+                names_size = 0
+                dirs = []
+                # Directories being walked with their children. The root
+                # directory is stored as the entry `.` of an unnamed parent.
+                stack = [(b'', [])]
+
+                def _add_name(name):
+                    nonlocal names_size
+                    names.write(name)
+                    names_size += len(name)
+                    return names_size - len(name)
+
+                def _flush():
+                    nonlocal entries_count
+                    path, children = stack.pop()
+                    dirs.append((path, _add_name(path), entries_count, len(children)))
+                    for name, type_, size, mtime, sha1, target in children:
+                        # Symlink target is never empty. Use an empty target for undefined.
+                        target = target or b''
+                        f.write(
+                            cls._ENTRY.pack(
+                                _add_name(name),
+                                len(name),
+                                cls.TYPES.index(type_) if type_ in cls.TYPES else 0,
+                                cls._UNDEFINED if size is None else size,
+                                cls._UNDEFINED if mtime is None else mtime,
+                                sha1 or cls._NO_SHA1,
+                                _add_name(target),
+                                len(target),
+                            )
+                        )
+                    entries_count += len(children)
+
+                for path, type_, size, mtime, sha1, target in rows:
+                    if path == b'.':
+                        parent, name = b'', b'.'
+                    else:
+                        parent, unused, name = path.rpartition(b'/')
+                        parent = parent or b'.'
+                    if not any(p == parent for p, unused in stack):
+                        logger.warning('skip %r from %r: parent directory not found', path, index_path)
+                        continue
+                    while stack[-1][0] != parent:
+                        _flush()
+                    stack[-1][1].append((name, type_, size, mtime, sha1, target))
+                    if type_ == 'dir':
+                        stack.append((path, []))
+                while stack:
+                    _flush()
+
+                dirs.sort()
+                dirs_offset = f.tell()
+                for path, path_offset, first, count in dirs:
+                    f.write(cls._DIR.pack(path_offset, len(path), first, count))
+                names_offset = f.tell()
+                names.seek(0)
+                shutil.copyfileobj(names, f)
+                f.seek(0)
+                f.write(
+                    cls._HEADER.pack(
+                        cls.MAGIC,
+                        cls.VERSION,
+                        source_stat.st_mtime_ns,
+                        source_stat.st_size,
+                        cls._HEADER.size,
+                        dirs_offset,
+                        len(dirs),
+                        names_offset,
+                    )
+                )
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def open(cls, index_path, source_stat):
+        """
+        Map an existing index in memory. Return None if the index doesn't
+        exists or doesn't match the source file.
+        """
+        try:
+            with open(index_path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # ValueError is raised for empty file.
+            return None
+        try:
+            header = cls._HEADER.unpack_from(data)
+        except struct.error:
+            header = None
+        if header is None or header[:4] != (cls.MAGIC, cls.VERSION, source_stat.st_mtime_ns, source_stat.st_size):
+            data.close()
+            return None
+        return cls(data, *header[4:])
+
+    def close(self):
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _name(self, offset):
+        name_offset, name_len = self._NAME.unpack_from(self._data, offset)
+        start = self._names_offset + name_offset
+        return self._data[start : start + name_len]
+
+    def _entry(self, i):
+        offset = self._entries_offset + i * self._ENTRY.size
+        unused, unused, type_, size, mtime, sha1, target_offset, target_len = self._ENTRY.unpack_from(
+            self._data, offset
+        )
+        start = self._names_offset + target_offset
+        return (
+            self._name(offset),
+            self.TYPES[type_] if type_ < len(self.TYPES) else None,
+            None if size == self._UNDEFINED else size,
+            None if mtime == self._UNDEFINED else mtime,
+            None if sha1 == self._NO_SHA1 else sha1,
+            self._data[start : start + target_len] if target_len else None,
+        )
+
+    def _children(self, parent):
+        """
+        Return the range of entries found in the given directory.
+        """
+        dirs = _Names(self, self._dirs_offset, self._DIR, 0, self._dirs_count)
+        i = bisect.bisect_left(dirs, parent)
+        if i == len(dirs) or dirs[i] != parent:
+            return range(0)
+        unused, unused, first, count = self._DIR.unpack_from(self._data, self._dirs_offset + i * self._DIR.size)
+        return range(first, first + count)
+
+    def get(self, parent, name):
+        """
+        Return a tuple (type, size, mtime, sha1, target) for the given entry or None if not found.
+        """
+        children = self._children(parent)
+        names = _Names(self, self._entries_offset, self._ENTRY, children.start, children.stop)
+        i = bisect.bisect_left(names, name)
+        if i == len(names) or names[i] != name:
+            return None
+        return self._entry(children.start + i)[1:]
+
+    def listdir(self, parent, cursor=None, limit=None, reverse=False):
+        """
+        Return the list of (name, type, size, mtime, sha1, target) found in the given
+        directory sorted by name. `cursor` is the name of the last entry
+        returned by a previous call.
+        """
+        children = self._children(parent)
+        if cursor is not None:
+            names = _Names(self, self._entries_offset, self._ENTRY, children.start, children.stop)
+            if reverse:
+                children = children[: bisect.bisect_left(names, cursor)]
+            else:
+                children = children[bisect.bisect_right(names, cursor) :]
+        if reverse:
+            children = children[::-1]
+        if limit is not None:
+            children = children[:limit]
+        return [self._entry(i) for i in children]
+
+
+def _trigrams(value):
+    """
+    Return the set of 3 characters substrings of the given value.
+    """
+    return {value[i : i + 3] for i in range(len(value) - 2)}
+
+
+class FilenameIndex:
+    """
+    SQLite trigram index of every file and folder name found in the backup
+    history of a repository, with the ranges of backup dates where each path
+    exists. Unlike other indexes, it's not derived from a single source file:
+    it's updated one backup date at a time so an interrupted build is resumed
+    where it stopped.
+
+    Dates are stored as epoch. A range without `first` extends to the oldest
+    indexed date and a range without `last` extends to the newest indexed date.
+    """
+
+    VERSION = 1
+
+    SUFFIX = b'.db'
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    @classmethod
+    def open(cls, index_path):
+        """
+        Open the index, creating it if missing or outdated.
+        """
+        os.makedirs(os.path.dirname(index_path), mode=0o700, exist_ok=True)
+        conn = sqlite3.connect(os.fsdecode(index_path), timeout=30)
+        try:
+            # Let readers search the index while it's being updated.
+            conn.execute('PRAGMA journal_mode=WAL')
+            if conn.execute('PRAGMA user_version').fetchone()[0] != cls.VERSION:
+                with conn:
+                    for table in ['meta', 'paths', 'ranges', 'trigrams']:
+                        conn.execute('DROP TABLE IF EXISTS %s' % table)
+                    conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value INTEGER)')
+                    conn.execute('CREATE TABLE paths (id INTEGER PRIMARY KEY, path BLOB UNIQUE, name TEXT)')
+                    conn.execute('CREATE TABLE ranges (path_id INTEGER, first INTEGER, last INTEGER)')
+                    conn.execute('CREATE INDEX ranges_path_id ON ranges (path_id)')
+                    conn.execute(
+                        'CREATE TABLE trigrams (trigram TEXT, path_id INTEGER, PRIMARY KEY (trigram, path_id)) WITHOUT ROWID'
+                    )
+                    conn.execute('PRAGMA user_version=%d' % cls.VERSION)
+        except BaseException:
+            conn.close()
+            raise
+        return cls(conn)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_meta(self, key):
+        row = self._conn.execute('SELECT value FROM meta WHERE key=?', (key,)).fetchone()
+        return row and row[0]
+
+    @property
+    def oldest(self):
+        """Oldest indexed backup date."""
+        return self._get_meta('oldest')
+
+    @property
+    def newest(self):
+        """Newest indexed backup date."""
+        return self._get_meta('newest')
+
+    def set_dates(self, oldest, newest):
+        """
+        Update the range of indexed backup dates and commit the changes.
+        """
+        self._conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', [('oldest', oldest), ('newest', newest)])
+        self._conn.commit()
+
+    def reset(self):
+        """
+        Delete every entry of the index.
+        """
+        with self._conn:
+            for table in ['meta', 'paths', 'ranges', 'trigrams']:
+                self._conn.execute('DELETE FROM %s' % table)
+
+    def _path_id(self, path, name):
+        row = self._conn.execute('SELECT id FROM paths WHERE path=?', (path,)).fetchone()
+        if row:
+            return row[0]
+        name = name.casefold()
+        path_id = self._conn.execute('INSERT INTO paths (path, name) VALUES (?, ?)', (path, name)).lastrowid
+        self._conn.executemany(
+            'INSERT INTO trigrams VALUES (?, ?)', [(trigram, path_id) for trigram in _trigrams(name)]
+        )
+        return path_id
+
+    def add(self, path, name, first=None, last=None):
+        """
+        Record the path as existing between the given dates.
+        """
+        path_id = self._path_id(path, name)
+        self._conn.execute('INSERT INTO ranges VALUES (?, ?, ?)', (path_id, first, last))
+
+    def exists_first(self, path):
+        """
+        Check if the path exists at the oldest indexed date.
+        """
+        return (
+            self._conn.execute(
+                'SELECT 1 FROM ranges JOIN paths ON paths.id = path_id WHERE path=? AND first IS NULL', (path,)
+            ).fetchone()
+            is not None
+        )
+
+    def set_first(self, path, first):
+        """
+        Record the path as not existing before the given date.
+        """
+        self._conn.execute(
+            'UPDATE ranges SET first=? WHERE path_id=(SELECT id FROM paths WHERE path=?) AND first IS NULL',
+            (first, path),
+        )
+
+    def set_last(self, path, last):
+        """
+        Record the path as not existing after the given date.
+        """
+        self._conn.execute(
+            'UPDATE ranges SET last=? WHERE path_id=(SELECT id FROM paths WHERE path=?) AND last IS NULL',
+            (last, path),
+        )
+
+    def search(self, query, limit=None):
+        """
+        Return a list of (path, ranges) for every path with a name containing
+        `query`, case insensitive, sorted by path. `ranges` is a sorted list
+        of (first, last) dates where the path exists.
+        """
+        query = query.casefold()
+        trigrams = sorted(_trigrams(query))
+        where = ''
+        if trigrams:
+            # Narrow down candidates using the trigrams. Short queries scan every name.
+            where = 'id IN (%s) AND ' % ' INTERSECT '.join(
+                ['SELECT path_id FROM trigrams WHERE trigram=?'] * len(trigrams)
+            )
+        rows = self._conn.execute(
+            'SELECT id, path FROM paths WHERE %sinstr(name, ?) > 0 ORDER BY path LIMIT ?' % where,
+            trigrams + [query, -1 if limit is None else limit],
+        ).fetchall()
+        oldest, newest = self.oldest, self.newest
+        return [
+            (
+                path,
+                sorted(
+                    (oldest if first is None else first, newest if last is None else last)
+                    for first, last in self._conn.execute('SELECT first, last FROM ranges WHERE path_id=?', (path_id,))
+                ),
+            )
+            for path_id, path in rows
+        ]
+
+
+class IndexCache(SimplePlugin):
+    """
+    Manage the cache folder where indexes are stored.
+
+    cache_dir: location of the cache folder. When undefined, a private temporary
+    folder is created and deleted when the server stops.
+    """
+
+    cache_dir = None
+
+    # Time of day when indexes of deleted files are removed.
+    execution_time = '23:00'
+
+    # Name of the file recording the source folder of the indexes.
+    SOURCE_FILE = b'source'
+
+    # Suffixes of indexes derived from a single source file.
+    _INDEX_SUFFIXES = (SQLiteIndex.SUFFIX, FileChangesIndex.SUFFIX, MirrorMetadataIndex.SUFFIX)
+
+    def __init__(self, bus):
+        super().__init__(bus)
+        self._lock = threading.Lock()
+        # Lock per index path to avoid building the same index twice.
+        self._build_locks = {}
+        self._tempdir = None
+
+    def start(self):
+        self.bus.publish('scheduler:add_job_daily', self.execution_time, self.cleanup)
+
+    def stop(self):
+        self.bus.publish('scheduler:remove_job', self.cleanup)
+        with self._lock:
+            if self._tempdir:
+                shutil.rmtree(self._tempdir, ignore_errors=True)
+                self._tempdir = None
+
+    def _get_cache_dir(self):
+        if self.cache_dir:
+            return os.fsencode(self.cache_dir)
+        with self._lock:
+            if self._tempdir is None:
+                self._tempdir = tempfile.mkdtemp(prefix=b'rdiffweb_cache_')
+            return self._tempdir
+
+    def get_index_path(self, source, suffix):
+        """
+        Return the location of the index derived from the given `source` file.
+        Indexes of the same repository are grouped in the same folder.
+        """
+        assert isinstance(source, bytes)
+        source = os.path.abspath(source)
+        digest = hashlib.sha1(os.path.dirname(source)).hexdigest().encode('ascii')
+        return os.path.join(self._get_cache_dir(), digest, os.path.basename(source) + suffix)
+
+    def open_index(self, cls, source, rows_func, key=b''):
+        """
+        Return an up-to-date index of type `cls` for the given `source` file.
+        The index is built from `rows_func()` when missing or outdated. `key`
+        distinguishes multiple indexes of the same type derived from `source`.
+        """
+        source_stat = os.stat(source)
+        index_path = self.get_index_path(source, key + cls.SUFFIX)
+        index = cls.open(index_path, source_stat)
+        if index is not None:
+            return index
+
+        # Keep track of the number of threads using the lock so it's only
+        # removed when no other thread is waiting for it.
+        with self._lock:
+            entry = self._build_locks.setdefault(index_path, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                # Check again in case another thread built the index.
+                index = cls.open(index_path, source_stat)
+                if index is None:
+                    index = self._build_index(cls, source, rows_func, index_path)
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._build_locks[index_path]
+        return index
+
+    def _build_index(self, cls, source, rows_func, index_path):
+        os.makedirs(os.path.dirname(index_path), mode=0o700, exist_ok=True)
+        self._write_source_dir(os.path.dirname(index_path), os.path.dirname(os.path.abspath(source)))
+        source_stat = os.stat(source)
+        logger.debug('building index %r', index_path)
+        cls.build(index_path, rows_func(), source_stat)
+        index = cls.open(index_path, source_stat)
+        if index is not None:
+            return index
+        raise OSError('fail to open index %r' % index_path)
+
+    def _write_source_dir(self, folder, source_dir):
+        """
+        Record the source folder of the indexes stored in `folder` to allow
+        `cleanup()` to find indexes of deleted source files.
+        """
+        marker = os.path.join(folder, self.SOURCE_FILE)
+        if not os.path.exists(marker):
+            with open(marker, 'wb') as f:
+                f.write(source_dir)
+
+    def cleanup(self):
+        """
+        Remove the indexes whose source file no longer exists.
+        """
+        cache_dir = self._get_cache_dir()
+        try:
+            folders = os.listdir(cache_dir)
+        except FileNotFoundError:
+            return
+        for folder in folders:
+            folder = os.path.join(cache_dir, folder)
+            try:
+                with open(os.path.join(folder, self.SOURCE_FILE), 'rb') as f:
+                    source_dir = f.read()
+            except OSError:
+                # Source folder not recorded.
+                continue
+            try:
+                sources = os.listdir(source_dir)
+            except FileNotFoundError:
+                # The repository was deleted.
+                logger.debug('removing indexes %r', folder)
+                shutil.rmtree(folder, ignore_errors=True)
+                continue
+            except OSError:
+                logger.debug('fail to list source folder of %r', folder, exc_info=1)
+                continue
+            sources = set(sources)
+            for name in os.listdir(folder):
+                if not name.endswith(self._INDEX_SUFFIXES):
+                    continue
+                # The index name is made of the source name, an optional key
+                # and the suffix.
+                base = name.rsplit(b'.', 1)[0]
+                if base in sources or base.rsplit(b'.', 1)[0] in sources:
+                    continue
+                logger.debug('removing index %r', name)
+                try:
+                    os.remove(os.path.join(folder, name))
+                except OSError:
+                    pass
+
+
+cherrypy.indexcache = IndexCache(cherrypy.engine)
+cherrypy.indexcache.subscribe()
+
+cherrypy.config.namespaces['indexcache'] = lambda key, value: setattr(cherrypy.indexcache, key, value)
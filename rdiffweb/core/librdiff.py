@@ -13,16 +13,23 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import array
 import bisect
 import encodings
+import functools
+import heapq
+import io
+import itertools
 import logging
 import os
 import re
 import shutil
+import sqlite3
+import stat
 import subprocess
 import sys
 import time
-from collections import namedtuple
+from collections import deque, namedtuple
 from datetime import datetime, timedelta, timezone
 from subprocess import CalledProcessError
 
@@ -32,11 +39,27 @@ from cached_property import cached_property
 from cherrypy_foundation.tools.i18n import gettext_lazy as _
 
 import rdiffweb.core.dircache  # noqa
-from rdiffweb.core.restore import pipe_restore
+import rdiffweb.core.repocache  # noqa
+import rdiffweb.core.restorecache  # noqa
+from rdiffweb.core.indexcache import FileChangesIndex, FilenameIndex, FileStatisticsIndex, MirrorMetadataIndex
+from rdiffweb.core.restore import ARCHIVERS, ArchiveSettings, pipe_archive, pipe_restore
+
+# Use a faster zlib implementation when available.
+try:
+    from isal import isal_zlib as zlib
+except ImportError:
+    try:
+        from zlib_ng import zlib_ng as zlib
+    except ImportError:
+        import zlib
 
 # Cached os.listdir
 listdir = cherrypy.dircache.listdir
 
+# Settings used to create archives when restoring.
+cherrypy.archive = ArchiveSettings()
+cherrypy.config.namespaces['archive'] = lambda key, value: setattr(cherrypy.archive, key, value)
+
 # Define the logger
 logger = logging.getLogger(__name__)
 
@@ -52,6 +75,12 @@ INCREMENTS = b"increments"
 STDOUT_ENCODING = 'utf-8'
 LANG = "en_US." + STDOUT_ENCODING
 
+# Buffer size used to read metadata files. Larger buffers reduce the number of
+# read and decompress calls when scanning large metadata files.
+READ_BUFFER_SIZE = 1024 * 1024
+
+TAIL_BLOCK_SIZE = 64 * 1024
+
 
 def rdiff_backup_version():
     """
@@ -112,6 +141,119 @@ def unquote(name):
     return re.sub(pattern=b";[0-9]{3}", repl=unquoted_char, string=name, flags=re.S)
 
 
+def quote(name, chars_to_quote):
+    """
+    Quote the given name as rdiff-backup does. `chars_to_quote` is the
+    content of rdiff-backup-data/chars_to_quote. Nothing is quoted when
+    undefined.
+    """
+    assert isinstance(name, bytes)
+    if not chars_to_quote:
+        return name
+    return re.sub(
+        pattern=b"[%s]|;" % chars_to_quote,
+        repl=lambda match: b";%03d" % ord(match.group()),
+        string=name,
+        flags=re.S,
+    )
+
+
+class _GzipReader(io.RawIOBase):
+    """
+    Raw stream decompressing a gzip file using large input chunks. Like
+    `zcat`, a truncated file is read up to the last complete block.
+    """
+
+    def __init__(self, path, chunk_size=READ_BUFFER_SIZE):
+        self.name = path
+        self._fp = open(path, 'rb', buffering=0)
+        self._chunk_size = chunk_size
+        self._decompressor = zlib.decompressobj(wbits=31)
+        self._input = b''
+
+    def readable(self):
+        return True
+
+    def close(self):
+        if not self.closed:
+            self._fp.close()
+        super().close()
+
+    def readinto(self, b):
+        while True:
+            if self._decompressor.eof:
+                # Gzip file may contains multiple members.
+                self._input = self._decompressor.unused_data
+                self._decompressor = zlib.decompressobj(wbits=31)
+            if not self._input:
+                self._input = self._fp.read(self._chunk_size)
+                if not self._input:
+                    return 0
+            try:
+                data = self._decompressor.decompress(self._input, len(b))
+            except zlib.error as e:
+                raise OSError('%s: not in gzip format: %s' % (os.fsdecode(self.name), e))
+            self._input = self._decompressor.unconsumed_tail
+            if data:
+                b[: len(data)] = data
+                return len(data)
+
+
+def open_metadata(path, buffer_size=READ_BUFFER_SIZE):
+    """
+    Open a metadata file for reading in binary mode. Gzip compressed files
+    are decompressed on the fly within the current process.
+    """
+    assert isinstance(path, bytes)
+    if path.endswith(b'.gz'):
+        return io.BufferedReader(_GzipReader(path), buffer_size=buffer_size)
+    return open(path, 'rb', buffering=buffer_size)
+
+
+def tail_lines(path, num, end=None):
+    """
+    Return the last `num` lines of a plain file as bytes. The file is read
+    backward by blocks starting from `end` or the end of file.
+    """
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END) if end is None else end
+        chunks = []
+        count = 0
+        while pos > 0 and count <= num:
+            size = min(TAIL_BLOCK_SIZE, pos)
+            pos -= size
+            f.seek(pos)
+            chunk = f.read(size)
+            chunks.append(chunk)
+            count += chunk.count(b'\n')
+    data = b''.join(reversed(chunks))
+    # Search backward for the start of the first line to return.
+    idx = len(data) - 1 if data.endswith(b'\n') else len(data)
+    for unused in range(num):
+        idx = data.rfind(b'\n', 0, idx)
+        if idx < 0:
+            return data
+    return data[idx + 1 :]
+
+
+def read_lines_from(path, offset, size=READ_BUFFER_SIZE):
+    """
+    Read complete lines written after `offset` in a plain file. Return a
+    tuple (offset, data) where offset is the position where data was read.
+    The file is read from the beginning when it was truncated, e.g. by log
+    rotation.
+    """
+    with open(path, 'rb') as f:
+        if offset > f.seek(0, os.SEEK_END):
+            offset = 0
+        f.seek(offset)
+        data = f.read(size)
+    # Keep incomplete line for next call, unless the line is too long.
+    if len(data) < size:
+        data = data[: data.rfind(b'\n') + 1]
+    return offset, data
+
+
 class AccessDeniedError(Exception):
     pass
 
@@ -268,22 +410,39 @@ class RdiffDirEntry(object):
     local dates when backed up.
     """
 
-    def __init__(self, repo, path, exists, increments):
+    __slots__ = [
+        '_repo',
+        'path',
+        'exists',
+        '_increments',
+        '_dir_entry',
+        '_isdir',
+        '_file_size',
+        '_change_dates',
+        'mirror_size',
+        'increments_size',
+    ]
+
+    def __init__(self, repo, path, exists, increments, dir_entry=None, isdir=None, file_size=None):
         assert isinstance(repo, RdiffRepo)
         assert isinstance(path, bytes)
         # Keep reference to the path and repo object.
         self._repo = repo
         self.path = path
-        # Absolute path to the directory
-        if self.isroot:
-            self.full_path = self._repo.full_path
-        else:
-            self.full_path = os.path.join(self._repo.full_path, self.path)
         # May need to compute our own state if not provided.
         self.exists = exists
         # Store the increments sorted by date.
         # See self.last_change_date()
-        self._increments = sorted(increments, key=lambda x: x.date)
+        self._increments = tuple(sorted(increments, key=lambda x: x.date))
+        # os.DirEntry from scandir() used to avoid extra stat calls.
+        self._dir_entry = dir_entry
+        # Known type and size, e.g. read from mirror_metadata.
+        self._isdir = isdir
+        self._file_size = file_size
+        self._change_dates = None
+        # Disk usage, when available. See RepoObject.listdir()
+        self.mirror_size = None
+        self.increments_size = None
 
     @property
     def display_name(self):
@@ -298,11 +457,33 @@ class RdiffDirEntry(object):
         """
         return self.path == b''
 
-    @cached_property
+    @property
+    def full_path(self):
+        """Absolute path to the entry."""
+        if self.isroot:
+            return self._repo.full_path
+        return os.path.join(self._repo.full_path, self.path)
+
+    def _lstat(self):
+        if self._dir_entry is not None:
+            return self._dir_entry.stat(follow_symlinks=False)
+        return os.lstat(self.full_path)
+
+    @property
     def isdir(self):
         """Lazy check if entry is a directory"""
+        if self._isdir is None:
+            self._isdir = self._get_isdir()
+        return self._isdir
+
+    def _get_isdir(self):
         if self.exists:
             # If the entry exists, check if it's a directory
+            if self._dir_entry is not None:
+                try:
+                    return self._dir_entry.is_dir()
+                except OSError:
+                    return False
             return os.path.isdir(self.full_path)
         # Check if increments is a directory
         for increment in self._increments:
@@ -312,20 +493,35 @@ class RdiffDirEntry(object):
             return increment.isdir
         return False
 
-    @cached_property
+    @property
     def file_size(self):
         """
         Return the current file size in bytes.
         Return negative value (-1) for folder and deleted files.
         """
-        if self.isdir or not self.exists:
-            return -1
-        else:
-            try:
-                return os.lstat(self.full_path).st_size
-            except Exception:
-                logger.warning("cannot lstat on file [%s]", self.full_path, exc_info=1)
-                return 0
+        if self._file_size is None:
+            if self.isdir or not self.exists:
+                self._file_size = -1
+            else:
+                try:
+                    self._file_size = self._lstat().st_size
+                except Exception:
+                    logger.warning("cannot lstat on file [%s]", self.full_path, exc_info=1)
+                    self._file_size = 0
+        return self._file_size
+
+    @property
+    def mtime(self):
+        """
+        Return the current modification time or None for deleted files.
+        """
+        if not self.exists:
+            return None
+        try:
+            return RdiffTime(int(self._lstat().st_mtime))
+        except OSError:
+            logger.warning("cannot lstat on file [%s]", self.full_path, exc_info=1)
+            return None
 
     def get_file_size(self, date=None):
         # A viable place to get the filesize of a deleted entry
@@ -335,16 +531,24 @@ class RdiffDirEntry(object):
             # File stats uses unquoted name.
             unquote_path = unquote(self.path)
             return stats.get_source_size(unquote_path)
+        except KeyError:
+            # Entry not found in file statistics.
+            pass
         except Exception:
             logger.warning("cannot find file statistic [%s]", self.last_change_date, exc_info=1)
         return -1
 
-    @cached_property
+    @property
     def change_dates(self):
         """
         Return a list of dates when this item has changes. Represent the
         previous revision. From old to new.
         """
+        if self._change_dates is None:
+            self._change_dates = self._get_change_dates()
+        return self._change_dates
+
+    def _get_change_dates(self):
         # Exception for root path, use backups dates.
         if self.isroot:
             return self._repo.backup_dates
@@ -369,12 +573,22 @@ class RdiffDirEntry(object):
         # Return the list of dates.
         return sorted(change_dates)
 
-    @cached_property
+    @property
     def last_change_date(self):
         """Return last change date or False."""
         return self.change_dates and self.change_dates[-1]
 
 
+@functools.lru_cache(maxsize=65536)
+def _parse_date(value):
+    """
+    Parse the quoted date found in rdiff-backup filenames. The same dates are
+    found in most metadata and increment filenames, so parsed values are kept
+    in a memo. RdiffTime is immutable and safe to share.
+    """
+    return RdiffTime(unquote(value).decode('ascii'))
+
+
 class AbstractEntry:
     SUFFIXES = None
 
@@ -396,9 +610,8 @@ class AbstractEntry:
         parts = filename_without_suffix.rsplit(b'.', 1)
         if len(parts) != 2:
             return onerror(ValueError(''))
-        date_string = unquote(parts[1]).decode('ascii')
         try:
-            return RdiffTime(date_string)
+            return _parse_date(parts[1])
         except Exception as e:
             if onerror is None:
                 raise
@@ -425,16 +638,92 @@ class MetadataEntry(AbstractEntry):
         Should be used to open the increment file. This method handle
         compressed vs not-compressed file.
         """
-        if self._is_compressed:
-            process = subprocess.Popen(['zcat', self.path], stdout=subprocess.PIPE)
-            return process.stdout
-        return open(self.path, 'rb')
+        return open_metadata(self.path)
 
     @property
     def _is_compressed(self):
         return self.name.endswith(b".gz")
 
 
+def _unquote_metadata_path(path):
+    """
+    Reverse the quoting of newline and backslash used by rdiff-backup in metadata files.
+    """
+    if b'\\' not in path:
+        return path
+    return re.sub(rb'\\(.)', lambda m: b'\n' if m.group(1) == b'n' else m.group(1), path)
+
+
+def _metadata_key(path):
+    """
+    Sort key of a path in mirror_metadata. Records are sorted by path
+    components, so `a/b` comes before `a b`.
+    """
+    return () if path == b'.' else tuple(path.split(b'/'))
+
+
+def _patch_metadata(base, diff):
+    """
+    Apply the records of a mirror_metadata diff on top of the records of a
+    newer state. Both iterables must be sorted. Entries of type `None`
+    are removed.
+    """
+    diff = iter(diff)
+    d = next(diff, None)
+    dkey = d and _metadata_key(d[0])
+    for b in base:
+        bkey = _metadata_key(b[0])
+        while d is not None and dkey <= bkey:
+            if d[1] != 'None':
+                yield d
+            replaced = dkey == bkey
+            d = next(diff, None)
+            dkey = d and _metadata_key(d[0])
+            if replaced:
+                break
+        else:
+            yield b
+    while d is not None:
+        if d[1] != 'None':
+            yield d
+        d = next(diff, None)
+
+
+MetadataChange = namedtuple('MetadataChange', 'path,change,type,old_size,new_size')
+
+FileChange = namedtuple('FileChange', 'path,state,size,date,restore_date')
+
+
+def _diff_metadata(old, new):
+    """
+    Compare two sorted iterables of mirror_metadata records and yield a
+    MetadataChange for every path added, removed or modified. Folders are
+    only reported when added or removed.
+    """
+    old = iter(old)
+    new = iter(new)
+    o = next(old, None)
+    n = next(new, None)
+    okey = o and _metadata_key(o[0])
+    nkey = n and _metadata_key(n[0])
+    while o is not None or n is not None:
+        if n is None or (o is not None and okey < nkey):
+            yield MetadataChange(o[0], 'removed', o[1], o[2], None)
+            o = next(old, None)
+            okey = o and _metadata_key(o[0])
+        elif o is None or nkey < okey:
+            yield MetadataChange(n[0], 'added', n[1], None, n[2])
+            n = next(new, None)
+            nkey = n and _metadata_key(n[0])
+        else:
+            if o[1] != n[1] or (n[1] != 'dir' and o[2:] != n[2:]):
+                yield MetadataChange(n[0], 'modified', n[1], o[2], n[2])
+            o = next(old, None)
+            okey = o and _metadata_key(o[0])
+            n = next(new, None)
+            nkey = n and _metadata_key(n[0])
+
+
 class MirrorMetadataEntry(MetadataEntry):
     PREFIX = b'mirror_metadata.'
     SUFFIXES = [
@@ -444,6 +733,40 @@ class MirrorMetadataEntry(MetadataEntry):
         b".snapshot",
     ]
 
+    @property
+    def is_snapshot(self):
+        return b'.snapshot' in self.name
+
+    def records(self):
+        """
+        Read the file and yield a tuple (path, type, size, mtime, sha1, target)
+        for each entry in the order they are stored. Type is `None` for entries
+        deleted in a diff. Target is the destination of symlinks.
+        """
+        logger.debug("read mirror_metadata [%r]", self.name)
+        path = type_ = size = mtime = sha1 = target = None
+        with self._open() as f:
+            for line in f:
+                if line.startswith(b'File '):
+                    if path is not None:
+                        yield path, type_, size, mtime, sha1, target
+                    path = _unquote_metadata_path(line[5:].rstrip(b'\r\n'))
+                    type_ = size = mtime = sha1 = target = None
+                elif path is None:
+                    continue
+                elif line.startswith(b'  Type '):
+                    type_ = line[7:].strip().decode('ascii', errors='replace')
+                elif line.startswith(b'  Size '):
+                    size = int(line[7:])
+                elif line.startswith(b'  ModTime '):
+                    mtime = int(line[10:])
+                elif line.startswith(b'  SHA1Digest '):
+                    sha1 = bytes.fromhex(line[13:].strip().decode('ascii'))
+                elif line.startswith(b'  SymData '):
+                    target = _unquote_metadata_path(line[10:].rstrip(b'\r\n'))
+        if path is not None:
+            yield path, type_, size, mtime, sha1, target
+
 
 class IncrementEntry(AbstractEntry):
     """Instance of the class represent one increment at a specific date for one
@@ -489,8 +812,7 @@ class IncrementEntry(AbstractEntry):
         # Parse date and raise error on failure
         filename_without_suffix = filename[: -len(suffix)]
         name, date_string = filename_without_suffix.rsplit(b'.', 1)
-        date_string = unquote(date_string).decode('ascii')
-        date = RdiffTime(date_string)
+        date = _parse_date(date_string)
         return (name, date, suffix)
 
     def __gt__(self, other):
@@ -500,9 +822,35 @@ class IncrementEntry(AbstractEntry):
         return self.date.__lt__(other.date)
 
 
+def _group_increments(names):
+    """
+    Group the increments found in an increments folder by name. Return a
+    dict of name to tuple of IncrementEntry sorted by date.
+    """
+    increments = {}
+    for item in names:
+        try:
+            increment = IncrementEntry(item)
+        except ValueError:
+            # Ignore any increment that cannot be parsed
+            continue
+        increments.setdefault(increment.name, []).append(increment)
+    return {name: tuple(sorted(value)) for name, value in increments.items()}
+
+
 FileStatisticLine = namedtuple('FileStatisticLine', 'path,changed,source_size,mirror_size,increment_size')
 
 
+def _push_largest(heap, count, item):
+    """
+    Push `item` into a min-heap keeping only the `count` largest items.
+    """
+    if len(heap) < count:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
 class FileStatisticsEntry(MetadataEntry):
     """
     Represent a single file_statistics.
@@ -518,41 +866,99 @@ class FileStatisticsEntry(MetadataEntry):
     def get_mirror_size(self, path):
         """Return the value of MirrorSize for the given file.
         path is the relative path from repo root."""
-        try:
-            return int(self._search(path)["mirror_size"])
-        except ValueError:
-            logger.warning("mirror size not found for [%r]", path, exc_info=1)
+        value = self._search(path)["mirror_size"]
+        if value is None:
+            logger.warning("mirror size not found for [%r]", path)
             return 0
+        return value
 
     def get_source_size(self, path):
         """Return the value of SourceSize for the given file.
         path is the relative path from repo root."""
-        try:
-            return int(self._search(path)["source_size"])
-        except ValueError:
-            logger.warning("source size not found for [%r]", path, exc_info=1)
+        value = self._search(path)["source_size"]
+        if value is None:
+            logger.warning("source size not found for [%r]", path)
             return 0
+        return value
 
     def _search(self, path):
         """
-        This function search for a file entry in the file_statistics compress
-        file. Since python gzip.open() seams to be 2 time slower, we directly use
-        zlib library on python2.
+        Search for a file entry in the file_statistics. Lookups are served by
+        an on-disk index built on first access. If the index cannot be used,
+        fallback to a sequential scan of the file.
+
+        Raise KeyError if the path is not found.
+        """
+        try:
+            with cherrypy.indexcache.open_index(FileStatisticsIndex, self.path, self._rows) as index:
+                row = index.get(path)
+        except (OSError, sqlite3.Error):
+            logger.warning("cannot use file_statistics index for [%r]", self.name, exc_info=1)
+            row = next((row[1:] for row in self._rows() if row[0] == path), None)
+        if row is None:
+            raise KeyError(path)
+        return dict(zip(['changed', 'source_size', 'mirror_size', 'increment_size'], row))
+
+    def query(self, start=0, length=None, order='path', reverse=False, search=None, states=None):
         """
-        logger.debug("read file_statistics [%r]", self.name)
+        Return a tuple (total, filtered, lines) with a single page of file
+        statistics. Lines are (path, state, size, increment_size) sorted by
+        `order` and filtered by `search`, a substring of the path, and by
+        `states`. The query is answered by the on-disk index.
+        """
+        if search:
+            search = search.encode(self.repo._encoding.name, errors='replace')
+        with cherrypy.indexcache.open_index(FileStatisticsIndex, self.path, self._rows) as index:
+            total, filtered, rows = index.query(start, length, order, reverse, search, states)
+        return total, filtered, [(self.repo._decode(row[0]),) + tuple(row[1:]) for row in rows]
 
-        path += b' '
+    def summary(self, count=20, depth=2):
+        """
+        Return the `count` largest files by source size and by increment size
+        and the `count` folders, up to `depth` levels deep, with the largest
+        sum of increment size. The file is read once and only the largest
+        items are kept in memory. Return a dict of lists of (path, value)
+        sorted by value.
+        """
+        sizes = []
+        increments = []
+        folders = {}
+        for path, changed, source_size, mirror_size, increment_size in self._rows():
+            if path == b'.':
+                continue
+            if source_size is not None:
+                _push_largest(sizes, count, (source_size, path))
+            if increment_size:
+                _push_largest(increments, count, (increment_size, path))
+                parts = path.split(b'/')
+                for i in range(1, min(depth, len(parts) - 1) + 1):
+                    prefix = b'/'.join(parts[:i])
+                    folders[prefix] = folders.get(prefix, 0) + increment_size
+        return {
+            'size': [(path, value) for value, path in sorted(sizes, reverse=True)],
+            'increment_size': [(path, value) for value, path in sorted(increments, reverse=True)],
+            'folder_increment_size': heapq.nlargest(count, folders.items(), key=lambda item: item[1]),
+        }
 
+    def _rows(self):
+        """
+        Read content of the file and yield a tuple
+        (path, changed, source_size, mirror_size, increment_size) for each
+        entry. Path is kept as bytes and `NA` values are replaced by None.
+        """
+        logger.debug("read file_statistics [%r]", self.name)
         with self._open() as f:
             for line in f:
-                if not line.startswith(path):
+                if line.startswith(b'#'):
+                    # Skip comments.
                     continue
-                break
-
-        # Split the line into array
-        data = line.rstrip(b'\r\n').rsplit(b' ', 4)
-        # From array create an entry
-        return {'changed': data[1], 'source_size': data[2], 'mirror_size': data[3], 'increment_size': data[4]}
+                data = line.rstrip(b'\r\n').rsplit(b' ', 4)
+                if len(data) != 5:
+                    continue
+                try:
+                    yield (data[0],) + tuple(None if v == b'NA' else int(v) for v in data[1:])
+                except ValueError:
+                    logger.warning("invalid file_statistics line [%r]", line)
 
     def readlines(self):
         """
@@ -594,13 +1000,12 @@ class SessionStatisticsEntry(MetadataEntry):
         'errors',
     ]
 
-    def _load(self):
-        """This method is used to read the session_statistics and create the
-        appropriate structure to quickly get the data.
-
-        Snapshot Changes contains different information related to each file of
-        the backup. This class provide a simple and easy way to access this
-        data."""
+    def _read(self):
+        """
+        Read the session_statistics file and return a dict of attribute name
+        to value.
+        """
+        values = {}
         with self._open() as f:
             for line in f.readlines():
                 # Read the line into array
@@ -612,7 +1017,17 @@ class SessionStatisticsEntry(MetadataEntry):
                     value = float(value)
                 else:
                     value = int(value)
-                setattr(self, key.lower().decode('ascii'), value)
+                values[key.lower().decode('ascii')] = value
+        return values
+
+    def _load(self):
+        """This method is used to read the session_statistics and create the
+        appropriate structure to quickly get the data.
+
+        Snapshot Changes contains different information related to each file of
+        the backup. This class provide a simple and easy way to access this
+        data."""
+        self.__dict__.update(self._read())
 
     def __getattr__(self, name):
         """
@@ -623,6 +1038,67 @@ class SessionStatisticsEntry(MetadataEntry):
         return self.__dict__[name]
 
 
+class SessionStatisticsSeries:
+    """
+    Columnar view of all session_statistics of a repository. Each attribute
+    of `SessionStatisticsEntry.ATTRS` is stored in a typed array with one row
+    per backup session, sorted by date. Used to plot graphs and compute
+    aggregates without opening every session_statistics file.
+    """
+
+    # Time related attributes are float, every other are integers.
+    FLOAT_ATTRS = ['starttime', 'endtime', 'elapsedtime']
+
+    def __init__(self, names=(), dates=(), columns=None):
+        self.names = tuple(names)
+        self.dates = list(dates)
+        self._columns = columns or {
+            attr: array.array('d' if attr in self.FLOAT_ATTRS else 'q') for attr in SessionStatisticsEntry.ATTRS
+        }
+
+    @classmethod
+    def build(cls, repo, previous=None):
+        """
+        Create a new series from the repository session_statistics files.
+        When a `previous` series is given, only the new files are read.
+        """
+        catalog = repo.session_statistics._catalog
+        names = tuple(catalog.names)
+        if previous is not None and names[: len(previous.names)] == previous.names:
+            # New backup sessions were appended. Re-use existing rows.
+            series = cls(previous.names, previous.dates, {k: v[:] for k, v in previous._columns.items()})
+        else:
+            series = cls()
+        for date, name in zip(catalog.dates[len(series.names) :], catalog.names[len(series.names) :]):
+            entry = SessionStatisticsEntry(repo, name)
+            try:
+                values = entry._read()
+            except (OSError, ValueError):
+                logger.warning('fail to read session statistics %r', entry.path, exc_info=1)
+                values = {}
+            for attr, column in series._columns.items():
+                column.append(values.get(attr, 0))
+            series.dates.append(date)
+        series.names = names
+        return series
+
+    def __getitem__(self, attr):
+        """
+        Return the array of values of the given attribute.
+        """
+        return self._columns[attr]
+
+    def __len__(self):
+        return len(self.dates)
+
+    def range(self, start, stop):
+        """
+        Return a slice object to get rows between `start` and `stop` dates
+        inclusively.
+        """
+        return slice(bisect.bisect_left(self.dates, start), bisect.bisect_right(self.dates, stop))
+
+
 class CurrentMirrorEntry(MetadataEntry):
     PID_RE = re.compile(b"^PID\\s*([0-9]+)", re.I | re.M)
 
@@ -644,6 +1120,14 @@ class LogEntry(MetadataEntry):
     PREFIX = b'error_log.'
     SUFFIXES = [b'.data', b'.data.gz']
 
+    # Error lines written by rdiff-backup 2.x: `<ErrorClass>: '<path>' <message>`
+    # and by older versions: `<ErrorClass> <path> <message>`.
+    ERROR_RES = [
+        re.compile(rb"^(\w+Error): '(.*?)' ?(.*)$"),
+        re.compile(rb'^(\w+Error) (.*?) (\[Errno .*)$'),
+        re.compile(rb'^(\w+Error) (\S+) ?(.*)$'),
+    ]
+
     @cached_property
     def is_empty(self):
         """
@@ -658,37 +1142,57 @@ class LogEntry(MetadataEntry):
         if self.is_empty:
             return ""
         encoding = self.repo._encoding.name
-        if self._is_compressed:
-            return subprocess.check_output(
-                ['zcat', self.path],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                encoding=encoding,
-                errors='replace',
-            )
-        with open(self.path, 'r', encoding=encoding, errors='replace') as f:
+        with io.TextIOWrapper(self._open(), encoding=encoding, errors='replace') as f:
             return f.read()
 
-    def tail(self, num=2000):
+    def errors(self):
+        """
+        Parse the error log and yield a tuple (error_class, path, message)
+        for each error. Path is kept as bytes. Lines not matching an error
+        are appended to the message of the previous error.
         """
-        Tail content of the file. This is used for logs.
+        if self.is_empty:
+            return
+        encoding = self.repo._encoding.name
+        error = None
+        with self._open() as f:
+            for line in f:
+                line = line.rstrip(b'\r\n')
+                if not line:
+                    continue
+                m = next(filter(None, (r.match(line) for r in self.ERROR_RES)), None)
+                if m:
+                    if error:
+                        yield error
+                    error = (m.group(1).decode('ascii'), m.group(2), m.group(3).decode(encoding, errors='replace'))
+                elif error:
+                    error = error[:2] + (error[2] + '\n' + line.decode(encoding, errors='replace'),)
+        if error:
+            yield error
+
+    def tail(self, num=2000, end=None):
+        """
+        Tail content of the file. This is used for logs. For plain file,
+        `end` is the position where to stop reading.
         """
         # To avoid opening empty file, check the file size first.
         if self.is_empty:
-            return b''
+            return ''
         encoding = self.repo._encoding.name
         if self._is_compressed:
-            zcat = subprocess.Popen([b'zcat', self.path], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-            return subprocess.check_output(
-                ['tail', '-n', str(num)],
-                stdin=zcat.stdout,
-                stderr=subprocess.STDOUT,
-                encoding=encoding,
-                errors='replace',
-            )
-        return subprocess.check_output(
-            ['tail', '-n', str(num), self.path], stderr=subprocess.STDOUT, encoding=encoding, errors='replace'
-        )
+            # Compressed file must be read sequentially. Keep the last lines.
+            with self._open() as f:
+                lines = deque(f, maxlen=num)
+            return b''.join(lines).decode(encoding, errors='replace')
+        return tail_lines(self.path, num, end).decode(encoding, errors='replace')
+
+    def read_from(self, offset):
+        """
+        Return a tuple (start, end, content) with the lines written after
+        `offset`. Used to follow a log file being written.
+        """
+        start, data = read_lines_from(self.path, offset)
+        return start, start + len(data), data.decode(self.repo._encoding.name, errors='replace')
 
 
 class RestoreLogEntry(LogEntry):
@@ -714,20 +1218,57 @@ class MetadataKeys:
     Provide a view on metadata dict keys. See MetadataDict#keys()
     """
 
-    def __init__(self, pairs):
-        self._pairs = pairs
+    def __init__(self, dates):
+        self._dates = dates
 
     def __iter__(self):
-        return (pair[0] for pair in self._pairs)
+        return iter(self._dates)
 
     def __getitem__(self, i):
-        if isinstance(i, slice):
-            return [pair[0] for pair in self._pairs[i]]
-        else:
-            return self._pairs[i][0]
+        return self._dates[i]
 
     def __len__(self):
-        return len(self._pairs)
+        return len(self._dates)
+
+
+class MetadataCatalog:
+    """
+    Entries of a single metadata type, sorted by *date* (not by name). This
+    avoids the assumption that filename lexicographic order == chronological
+    order, which breaks across timezone-offset changes.
+
+    Dates are also stored as epoch in a compact array used for lookups.
+    """
+
+    __slots__ = ['epochs', 'dates', 'names']
+
+    def __init__(self, rows=()):
+        rows = sorted(rows, key=lambda t: t[0])
+        self.epochs = array.array('q', (row[0] for row in rows))
+        self.dates = [row[1] for row in rows]
+        self.names = [row[2] for row in rows]
+
+    @classmethod
+    def build(cls, entries, classes):
+        """
+        Classify the given rdiff-backup-data `entries` in a single pass. Return
+        a dict of prefix to MetadataCatalog.
+        """
+        rows = {prefix: [] for prefix in classes}
+        for name in entries:
+            prefix = name[: name.find(b'.') + 1]
+            if prefix not in rows:
+                continue
+            try:
+                date = classes[prefix]._extract_date(name, onerror=lambda ex: None)
+            except ValueError:
+                # Skip entries with unknown suffix.
+                continue
+            if date is None:
+                # Skip entries whose date cannot be parsed
+                continue
+            rows[prefix].append((date.epoch, date, name))
+        return {prefix: cls(r) for prefix, r in rows.items()}
 
 
 class MetadataDict(object):
@@ -745,59 +1286,43 @@ class MetadataDict(object):
         self._prefix = cls.PREFIX
         self._cls = cls
 
-    @cached_property
-    def _pairs(self):
-        """
-        List of (date, filename) tuples, sorted by *date* (not by name),
-        computed once and cached. This avoids the assumption that
-        filename lexicographic order == chronological order, which
-        breaks across timezone-offset changes.
-        """
-        pairs = []
-        for e in self._repo._entries:
-            if not e.startswith(self._prefix):
-                continue
-            date = self._cls._extract_date(e, onerror=lambda ex: None)
-            if date is None:
-                # Skip entries whose date cannot be parsed
-                continue
-            pairs.append((date, e))
-        pairs.sort(key=lambda t: t[0])
-        return pairs
+    @property
+    def _catalog(self):
+        return self._repo._catalog[self._prefix]
 
     def __getitem__(self, key):
+        catalog = self._catalog
         if isinstance(key, (RdiffTime, datetime)):
-            idx = bisect.bisect_left(self.keys(), key)
-            if idx < len(self._pairs):
-                item = self._cls(self._repo, self._pairs[idx][1])
-                if item.date == key:
-                    return item
+            epoch = key.timestamp()
+            idx = bisect.bisect_left(catalog.epochs, epoch)
+            if idx < len(catalog.epochs) and catalog.epochs[idx] == epoch:
+                return self._cls(self._repo, catalog.names[idx])
             raise KeyError(key)
         elif isinstance(key, slice):
             if isinstance(key.start, (RdiffTime, datetime)):
-                idx = bisect.bisect_left(self.keys(), key.start)
+                idx = bisect.bisect_left(catalog.epochs, key.start.timestamp())
                 key = slice(idx, key.stop, key.step)
             if isinstance(key.stop, (RdiffTime, datetime)):
-                idx = bisect.bisect_right(self.keys(), key.stop)
+                idx = bisect.bisect_right(catalog.epochs, key.stop.timestamp())
                 key = slice(key.start, idx, key.step)
-            return [self._cls(self._repo, pair[1]) for pair in self._pairs[key]]
+            return [self._cls(self._repo, name) for name in catalog.names[key]]
         elif isinstance(key, int):
             try:
-                return self._cls(self._repo, self._pairs[key][1])
+                return self._cls(self._repo, catalog.names[key])
             except IndexError:
                 raise KeyError(key)
         else:
             raise KeyError(key)
 
     def __iter__(self):
-        for _key, e in self._pairs:
+        for e in self._catalog.names:
             yield self._cls(self._repo, e)
 
     def __len__(self):
-        return len(self._pairs)
+        return len(self._catalog.names)
 
     def keys(self):
-        return MetadataKeys(self._pairs)
+        return MetadataKeys(self._catalog.dates)
 
 
 class RdiffRepo(object):
@@ -831,6 +1356,17 @@ class RdiffRepo(object):
         'mirror_metadata' file located in rdiff-backup-data are used."""
         return self.mirror_metadata.keys()
 
+    @property
+    def session_statistics_series(self):
+        """
+        Return the columnar view of session_statistics. The series is shared
+        between requests and updated when rdiff-backup-data get updated.
+        """
+        return self._metadata.get(
+            'session_statistics_series',
+            lambda: SessionStatisticsSeries.build(self, self._metadata.previous.get('session_statistics_series')),
+        )
+
     @property
     def backup_log(self):
         """
@@ -891,50 +1427,96 @@ class RdiffRepo(object):
         return self._encoding.decode(value, errors)[0]
 
     @cached_property
+    def _metadata(self):
+        """
+        Parsed metadata shared by every instance of the same repository.
+        """
+        return cherrypy.repocache.get(self._data_path)
+
+    @property
     def _entries(self):
         """
         List content of rdiff-backup-data.
         """
+        return self._metadata.get('entries', self._list_entries)[0]
+
+    @property
+    def _entries_status(self):
+        """
+        Status of the repository if rdiff-backup-data cannot be listed.
+        """
+        return self._metadata.get('entries', self._list_entries)[1]
+
+    def _list_entries(self):
         try:
-            return listdir(self._data_path)
+            return listdir(self._data_path), None
         except FileNotFoundError:
             logger.warning(f'folder not found {self._data_path}', exc_info=1)
-            self._entries_status = ('broken', _('The repository cannot be found or is badly damaged.'), _('Broken'))
+            return [], ('broken', _('The repository cannot be found or is badly damaged.'), _('Broken'))
         except PermissionError:
             logger.warning(f'permissions error listing {self._data_path}', exc_info=1)
-            self._entries_status = (
+            return [], (
                 'broken',
                 _("Permissions denied. Contact administrator to check repository's permissions."),
                 _('Broken'),
             )
         except OSError as e:
             logger.warning(f'error listing folder {self._data_path}', exc_info=1)
-            self._entries_status = ('broken', _("%s. Contact administrator if problem persist.") % e, _('Broken'))
-        return []
+            return [], ('broken', _("%s. Contact administrator if problem persist.") % e, _('Broken'))
+
+    @property
+    def _catalog(self):
+        """
+        Metadata entries of rdiff-backup-data classified by type.
+        """
+        metadata = [
+            self.current_mirror,
+            self.error_log,
+            self.mirror_metadata,
+            self.file_statistics,
+            self.session_statistics,
+        ]
+        return self._metadata.get(
+            'catalog', lambda: MetadataCatalog.build(self._entries, {m._prefix: m._cls for m in metadata})
+        )
+
+    @property
+    def _chars_to_quote(self):
+        """
+        Characters quoted by rdiff-backup in this repository.
+        """
+        return self._metadata.get('chars_to_quote', self._read_chars_to_quote)
+
+    def _read_chars_to_quote(self):
+        try:
+            with open(os.path.join(self._data_path, b'chars_to_quote'), 'rb') as f:
+                return f.read().rstrip(b'\r\n')
+        except FileNotFoundError:
+            return b''
+        except OSError:
+            logger.warning('fail to read chars_to_quote of %r', self._data_path, exc_info=1)
+            return b''
+
+    def quote(self, path):
+        """
+        Quote the given path as found in the backup. Used to convert the
+        unquoted paths recorded in rdiff-backup-data into the paths
+        expected by fstat() and listdir().
+        """
+        return quote(path, self._chars_to_quote)
 
     def clear_cache(self):
         """
         Clear the cache to refresh metadata.
         """
-        cached_properties = [
-            (self, '_entries'),
-            (self, 'status'),
-            (self.current_mirror, '_pairs'),
-            (self.error_log, '_pairs'),
-            (self.mirror_metadata, '_pairs'),
-            (self.file_statistics, '_pairs'),
-            (self.session_statistics, '_pairs'),
-            (self.session_statistics, '_pairs'),
-        ]
-        for obj, attr in cached_properties:
-            if attr in obj.__dict__:
-                del obj.__dict__[attr]
+        cherrypy.repocache.invalidate(self._data_path)
+        self.__dict__.pop('_metadata', None)
 
-    def listdir(self, path):
+    def _resolve_dir(self, path):
         """
-        Return a list of RdiffDirEntry each representing a file or a folder in the given path.
+        Return the mirror location, the relative path and the increments
+        location of the given directory.
         """
-        # Compute increment directory location.
         full_path = os.path.realpath(os.path.join(self.full_path, path.strip(b'/')))
         relative_path = os.path.relpath(full_path, self.full_path)
         if relative_path.startswith(RDIFF_BACKUP_DATA):
@@ -942,55 +1524,372 @@ class RdiffRepo(object):
         increment_path = os.path.normpath(os.path.join(self._increment_path, relative_path))
         if not full_path.startswith(self.full_path) or not increment_path.startswith(self.full_path):
             raise AccessDeniedError('%s make reference outside the repository' % self._decode(path))
+        return full_path, relative_path, increment_path
+
+    def listdir(self, path, as_of=None):
+        """
+        Return a list of RdiffDirEntry each representing a file or a folder in the given path.
+
+        When `as_of` is defined, return the content of the directory as it
+        was at the given backup date.
+        """
+        if as_of is not None:
+            return self._listdir_as_of(path, as_of)
+        # Compute increment directory location.
+        full_path, relative_path, increment_path = self._resolve_dir(path)
 
         # Get list of all increments and existing file and folder
         try:
-            existing_items = os.listdir(full_path)
+            with os.scandir(full_path) as it:
+                existing_items = {e.name: e for e in it}
             if relative_path == b'.':
-                existing_items.remove(RDIFF_BACKUP_DATA)
+                existing_items.pop(RDIFF_BACKUP_DATA, None)
         except (NotADirectoryError, FileNotFoundError):
             existing_items = None
         except OSError:
             raise AccessDeniedError(path)
         try:
-            increment_items = os.listdir(increment_path)
+            increments = cherrypy.dircache.derive(increment_path, 'increments', _group_increments)
         except (NotADirectoryError, FileNotFoundError):
-            increment_items = None
+            increments = None
         except OSError:
             raise AccessDeniedError(path)
         # Raise error if nothing is found
-        if existing_items is None and increment_items is None:
+        if existing_items is None and increments is None:
             raise DoesNotExistError(path)
 
         # Merge information from both location
         # Regroup all information into RdiffDirEntry
-        entries = {}
-        for name in existing_items or []:
-            entries[name] = RdiffDirEntry(
+        existing_items = existing_items or {}
+        increments = increments or {}
+        prefix = b'' if relative_path == b'.' else relative_path + b'/'
+        entries = [
+            RdiffDirEntry(
                 self,
-                os.path.normpath(os.path.join(relative_path, name)),
-                exists=True,
-                increments=[],
+                prefix + name,
+                exists=name in existing_items,
+                increments=increments.get(name, ()),
+                dir_entry=existing_items.get(name),
             )
-        for item in increment_items or []:
-            try:
-                increment = IncrementEntry(item)
-            except ValueError:
-                # Ignore any increment that cannot be parsed
-                continue
-            entry = entries.get(increment.name, None)
-            if not entry:
-                # Create a new Direntry
-                entry = entries[increment.name] = RdiffDirEntry(
+            for name in existing_items.keys() | increments.keys()
+        ]
+        return sorted(entries, key=lambda e: e.path)
+
+    def _mirror_metadata_records(self, date):
+        """
+        Yield the records of every file and folder present at the given
+        backup date. mirror_metadata diffs are reverse diffs: the state is
+        rebuilt from the next snapshot by applying the diffs down to the
+        requested date.
+        """
+        chain = self.mirror_metadata[date:]
+        if not chain or chain[0].date != date:
+            raise DoesNotExistError(str(date))
+        for idx, entry in enumerate(chain):
+            if entry.is_snapshot:
+                break
+        else:
+            raise DoesNotExistError('mirror_metadata snapshot not found for %s' % date)
+        records = chain[idx].records()
+        for entry in reversed(chain[:idx]):
+            records = _patch_metadata(records, entry.records())
+        return records
+
+    def diff(self, start, end, cursor=None):
+        """
+        Iterate over the paths added, removed or modified between two backup
+        dates as MetadataChange sorted like mirror_metadata. The records of
+        both dates are streamed and merged, so memory usage doesn't depend on
+        the number of files. `cursor` is the path of the last change returned
+        by a previous call; iteration resumes right after it.
+        """
+        if start > end:
+            start, end = end, start
+        changes = _diff_metadata(self._mirror_metadata_records(start), self._mirror_metadata_records(end))
+        if cursor is not None:
+            key = _metadata_key(cursor)
+            changes = itertools.dropwhile(lambda c: _metadata_key(c.path) <= key, changes)
+        return changes
+
+    def file_changes(self, start, end, states=None, cursor=None, limit=None):
+        """
+        Return a list of FileChange for the files deleted or changed by the
+        backups made between `start` and `end`, sorted by path. Each path is
+        reported once per state with the most recent backup date and the
+        last known size. `restore_date` is the last backup date where this
+        version of the file can be restored. `cursor` is the (path, state) of
+        the last change returned by a previous call.
+
+        The file_statistics of the range are streamed once into an index
+        cached per date range.
+        """
+        if start > end:
+            start, end = end, start
+        entries = self.file_statistics[start:end]
+        if not entries:
+            raise DoesNotExistError(str(end))
+
+        def _rows():
+            for entry in entries:
+                epoch = entry.date.epoch
+                for row in entry._rows():
+                    yield row + (epoch,)
+
+        key = b'.%d' % entries[0].date.epoch
+        with cherrypy.indexcache.open_index(FileChangesIndex, entries[-1].path, _rows, key=key) as index:
+            rows = index.query(states, cursor, limit)
+        # Use backup dates to keep the timezone.
+        dates = self.backup_dates
+        epochs = [d.epoch for d in dates]
+        changes = []
+        for path, state, size, epoch in rows:
+            idx = bisect.bisect_left(epochs, epoch)
+            date = dates[idx] if idx < len(epochs) and epochs[idx] == epoch else RdiffTime(epoch)
+            # A deleted file is last available in the previous backup.
+            restore_date = date if state != 'deleted' else (dates[idx - 1] if idx > 0 else None)
+            changes.append(FileChange(path, state, size, date, restore_date))
+        return changes
+
+    def _mirror_metadata_index(self, date):
+        """
+        Return the index of the tree recorded at the given backup date.
+        """
+        source = self.mirror_metadata[date]
+        return cherrypy.indexcache.open_index(
+            MirrorMetadataIndex, source.path, lambda: self._mirror_metadata_records(date)
+        )
+
+    def build_metadata_index(self, date=None):
+        """
+        Build the index of the tree recorded at the given backup date, or at
+        the last backup date, if not already built.
+        """
+        date = date or self.last_backup_date
+        try:
+            index = self._mirror_metadata_index(date)
+        except KeyError:
+            # No mirror_metadata for this date.
+            return
+        index.close()
+
+    def _filename_index(self):
+        index_path = cherrypy.indexcache.get_index_path(
+            os.path.join(self._data_path, b'filenames'), FilenameIndex.SUFFIX
+        )
+        return FilenameIndex.open(index_path)
+
+    def update_filename_index(self):
+        """
+        Add the backup dates not yet indexed to the file names index. The
+        index is first built from the last mirror_metadata snapshot, then
+        extended backward using the reverse diffs and forward as new
+        backups are made. Each date is committed separately so an
+        interrupted update is resumed on next call.
+        """
+        entries = self.mirror_metadata[:]
+        epochs = [entry.date.epoch for entry in entries]
+        if not entries:
+            return
+
+        def _name(path):
+            return self._decode(path.rsplit(b'/', 1)[-1])
+
+        with self._filename_index() as index:
+            oldest, newest = index.oldest, index.newest
+            if newest is not None and newest not in epochs:
+                # Repository history doesn't match the index.
+                index.reset()
+                oldest = newest = None
+            if newest is None:
+                if not entries[-1].is_snapshot:
+                    return
+                for record in entries[-1].records():
+                    if record[0] != b'.':
+                        index.add(record[0], _name(record[0]))
+                oldest = newest = epochs[-1]
+                index.set_dates(oldest, newest)
+
+            # Index newer backups.
+            idx = epochs.index(newest)
+            for prev, entry in zip(entries[idx:], entries[idx + 1 :]):
+                for change in self.diff(prev.date, entry.date):
+                    if change.change == 'added':
+                        index.add(change.path, _name(change.path), first=entry.date.epoch)
+                    elif change.change == 'removed':
+                        index.set_last(change.path, prev.date.epoch)
+                newest = entry.date.epoch
+                index.set_dates(oldest, newest)
+
+            # Index older backups.
+            idx = epochs.index(oldest) if oldest in epochs else bisect.bisect_left(epochs, oldest)
+            for entry, next_entry in zip(entries[:idx][::-1], entries[1 : idx + 1][::-1]):
+                if entry.is_snapshot:
+                    changes = (
+                        (c.path, c.change)
+                        for c in _diff_metadata(entry.records(), self._mirror_metadata_records(next_entry.date))
+                    )
+                else:
+                    # Entries of a reverse diff exist at this date or are deleted (type None).
+                    changes = (
+                        (
+                            record[0],
+                            (
+                                'added'
+                                if record[1] == 'None'
+                                else ('modified' if index.exists_first(record[0]) else 'removed')
+                            ),
+                        )
+                        for record in entry.records()
+                    )
+                for path, change in changes:
+                    if path == b'.':
+                        continue
+                    elif change == 'added':
+                        index.set_first(path, next_entry.date.epoch)
+                    elif change == 'removed':
+                        index.add(path, _name(path), last=entry.date.epoch)
+                oldest = entry.date.epoch
+                index.set_dates(oldest, newest)
+
+    def search(self, query, limit=None):
+        """
+        Search the file names index for files and folders with a name
+        containing `query`. Return a list of (path, ranges) where `ranges`
+        is a list of (first, last) backup dates where the path exists.
+        """
+        with self._filename_index() as index:
+            results = index.search(query, limit)
+        # Use backup dates to keep the timezone.
+        dates = {entry.date.epoch: entry.date for entry in self.mirror_metadata}
+
+        def _date(epoch):
+            return dates.get(epoch) or RdiffTime(epoch)
+
+        return [(path, [(_date(first), _date(last)) for first, last in ranges]) for path, ranges in results]
+
+    def _listdir_as_of(self, path, date, cursor=None, limit=None, reverse=False):
+        full_path, relative_path, increment_path = self._resolve_dir(path)
+        # mirror_metadata records unquoted names.
+        unquoted_path = unquote(relative_path)
+        try:
+            with self._mirror_metadata_index(date) as index:
+                if unquoted_path == b'.':
+                    row = index.get(b'', b'.')
+                else:
+                    parent, unused, name = unquoted_path.rpartition(b'/')
+                    row = index.get(parent or b'.', name)
+                if row is None or row[0] != 'dir':
+                    raise DoesNotExistError(path)
+                rows = index.listdir(unquoted_path, cursor and unquote(cursor), limit, reverse)
+        except KeyError:
+            raise DoesNotExistError(path)
+        # Current state of the mirror and increments.
+        try:
+            mirror_names = cherrypy.dircache.derive(full_path, 'names', frozenset)
+        except OSError:
+            mirror_names = frozenset()
+        try:
+            increments = cherrypy.dircache.derive(increment_path, 'increments', _group_increments)
+        except OSError:
+            increments = {}
+        prefix = b'' if relative_path == b'.' else relative_path + b'/'
+        entries = []
+        for name, type_, size, mtime, sha1, target in rows:
+            name = self.quote(name)
+            isdir = type_ == 'dir'
+            if type_ == 'sym' and target is not None:
+                # Same as the mirror: follow symlinks to folders and report
+                # the size of the symlink itself.
+                isdir = os.path.isdir(os.path.join(full_path, target))
+                size = len(target)
+            entries.append(
+                RdiffDirEntry(
                     self,
-                    os.path.normpath(os.path.join(relative_path, increment.name)),
-                    exists=False,
-                    increments=[increment] if increment else [],
+                    prefix + name,
+                    exists=name in mirror_names,
+                    increments=increments.get(name, ()),
+                    isdir=isdir,
+                    file_size=-1 if isdir else (size or 0),
                 )
-            else:
-                # Add increment to dir entry
-                bisect.insort_left(entry._increments, increment)
-        return sorted(list(entries.values()), key=lambda e: e.path)
+            )
+        return entries
+
+    def iter_listdir(self, path, cursor=None, limit=None, sort='name', as_of=None):
+        """
+        Iterate over the RdiffDirEntry of the given path ordered by name.
+
+        Unlike listdir(), the sorted mirror and increments listings are kept
+        in cache and merged while iterating, so only the entries returned get
+        created. `cursor` is the name of the last entry returned by a previous
+        call; iteration resumes right after it. `limit` is the maximum number
+        of entries to return. `sort` is either 'name' or '-name'. `as_of`
+        is the backup date to list, like listdir().
+        """
+        assert cursor is None or isinstance(cursor, bytes)
+        if sort not in ['name', '-name']:
+            raise ValueError('invalid sort: %s' % sort)
+        if as_of is not None:
+            return iter(self._listdir_as_of(path, as_of, cursor, limit, sort == '-name'))
+        full_path, relative_path, increment_path = self._resolve_dir(path)
+
+        # Get sorted names of existing file and folder and increments.
+        try:
+            mirror_names = cherrypy.dircache.derive(full_path, 'sorted', sorted)
+        except (NotADirectoryError, FileNotFoundError):
+            mirror_names = None
+        except OSError:
+            raise AccessDeniedError(path)
+        try:
+            increments = cherrypy.dircache.derive(increment_path, 'increments', _group_increments)
+            increment_names = cherrypy.dircache.derive(
+                increment_path, 'increment_names', lambda unused: sorted(increments)
+            )
+        except (NotADirectoryError, FileNotFoundError):
+            increments = increment_names = None
+        except OSError:
+            raise AccessDeniedError(path)
+        # Raise error if nothing is found
+        if mirror_names is None and increment_names is None:
+            raise DoesNotExistError(path)
+        mirror_names = mirror_names or []
+        increments = increments or {}
+        increment_names = increment_names or []
+
+        reverse = sort == '-name'
+        step = -1 if reverse else 1
+
+        def _start(names):
+            if cursor is None:
+                return len(names) - 1 if reverse else 0
+            if reverse:
+                return bisect.bisect_left(names, cursor) - 1
+            return bisect.bisect_right(names, cursor)
+
+        def _iter():
+            # Merge both sorted listings.
+            prefix = b'' if relative_path == b'.' else relative_path + b'/'
+            i = _start(mirror_names)
+            j = _start(increment_names)
+            count = 0
+            while limit is None or count < limit:
+                a = mirror_names[i] if 0 <= i < len(mirror_names) else None
+                b = increment_names[j] if 0 <= j < len(increment_names) else None
+                if a is None and b is None:
+                    return
+                if a is None or b is None:
+                    name = a or b
+                else:
+                    name = max(a, b) if reverse else min(a, b)
+                if name == a:
+                    i += step
+                if name == b:
+                    j += step
+                if relative_path == b'.' and name == RDIFF_BACKUP_DATA:
+                    continue
+                yield RdiffDirEntry(self, prefix + name, exists=name == a, increments=increments.get(name, ()))
+                count += 1
+
+        return _iter()
 
     def fstat(self, path):
         """Return a new instance of DirEntry to represent the given path."""
@@ -1014,30 +1913,17 @@ class RdiffRepo(object):
         except (OSError, ValueError):
             exists = False
 
-        # Create dir entry
-        prefix = os.path.basename(full_path)
-        entry = RdiffDirEntry(self, relative_path, exists, [])
-
         # Get incremement data
+        name = os.path.basename(full_path)
         try:
-            for item in os.listdir(increment_path):
-                if not item.startswith(prefix):
-                    # Ignore increment not matching our path
-                    continue
-                try:
-                    increment = IncrementEntry(item)
-                except ValueError:
-                    # Ignore any increment that cannot be parsed
-                    continue
-                if increment.name != prefix:
-                    # Ignore increment not matching our path
-                    continue
-                # Add increment to dir entry
-                bisect.insort_left(entry._increments, increment)
+            increments = cherrypy.dircache.derive(increment_path, 'increments', _group_increments).get(name, [])
         except FileNotFoundError:
             # Nothing to do when path doesn't has increments.
             # This happen for symlink.
-            pass
+            increments = []
+
+        # Create dir entry
+        entry = RdiffDirEntry(self, relative_path, exists, increments)
 
         # Check if path exists or has increment. If not raise an exception.
         if not exists and not entry._increments:
@@ -1106,11 +1992,13 @@ class RdiffRepo(object):
 
         `kind` must be one of the supported archive type or none to use `zip` for folder and `raw` for file.
 
-        Return a filename and a fileobj.
+        Return a filename and a fileobj. When the same restore was completed
+        before, the fileobj is a regular file read from the restore cache.
+        When the same restore is in progress, the fileobj reads its output.
         """
         assert isinstance(path, bytes)
         assert restore_as_of, "restore_as_of must be defined"
-        assert kind in ['tar', 'tar.bz2', 'tar.gz', 'tbz2', 'tgz', 'zip', 'raw', None]
+        assert kind is None or kind in ARCHIVERS
 
         # Define proper kind according to path type.
         path_obj = self.fstat(path)
@@ -1127,6 +2015,27 @@ class RdiffRepo(object):
         else:
             filename = "%s.%s" % (path_obj.display_name, kind)
 
+        # When the mirror didn't change since the requested date, read the
+        # files directly from the mirror without running rdiff-backup.
+        full_path = os.path.join(self.full_path, path_obj.path)
+        cache_key = (self.full_path, path_obj.path, int(restore_as_of), kind, os.stat(self._data_path).st_mtime_ns)
+        if self._is_mirror_current(path_obj, int(restore_as_of)):
+            if kind == 'raw':
+                return filename, open(full_path, 'rb')
+            fileobj = cherrypy.restore_cache.open(
+                cache_key,
+                functools.partial(
+                    pipe_archive,
+                    full_path,
+                    kind=kind,
+                    encoding=self._encoding.name,
+                    exclude=[RDIFF_BACKUP_DATA] if path_obj.isroot else [],
+                    unquote=unquote,
+                    compression=cherrypy.archive.compression,
+                ),
+            )
+            return filename, fileobj
+
         # Search full path location of rdiff-backup.
         rdiff_backup = find_rdiff_backup()
 
@@ -1139,18 +2048,44 @@ class RdiffRepo(object):
         if os.environ.get('TMPDIR'):
             env['TMPDIR'] = os.environ['TMPDIR']
 
-        # Execute the restore process and pipe the result.
-        fileobj = pipe_restore(
-            rdiff_backup,
-            path=os.path.join(self.full_path, unquote(path_obj.path)),
-            restore_as_of=restore_as_of,
-            kind=kind,
-            encoding=self._encoding.name,
-            env=env,
+        # Execute the restore process and pipe the result. Identical restores
+        # in progress share the same process and completed restores are served
+        # from cache. rdiff-backup-data mtime changes with every backup, so
+        # outdated entries are never reused.
+        fileobj = cherrypy.restore_cache.open(
+            cache_key,
+            functools.partial(
+                pipe_restore,
+                rdiff_backup,
+                path=os.path.join(self.full_path, unquote(path_obj.path)),
+                restore_as_of=restore_as_of,
+                kind=kind,
+                encoding=self._encoding.name,
+                env=env,
+                compression=cherrypy.archive.compression,
+            ),
         )
 
         return filename, fileobj
 
+    def _is_mirror_current(self, path_obj, restore_as_of):
+        """
+        Check if the mirror content of the given entry is the same as it was
+        at `restore_as_of`.
+        """
+        if not path_obj.exists or self.status[0] != 'ok':
+            return False
+        last_backup_date = self.last_backup_date
+        if last_backup_date and restore_as_of >= last_backup_date.epoch:
+            return True
+        # Content of a folder may change without increment of the folder itself.
+        # Symlinks are restored by rdiff-backup.
+        if path_obj.isdir or not stat.S_ISREG(os.lstat(os.path.join(self.full_path, path_obj.path)).st_mode):
+            return False
+        # Each increment keep the previous version of the file, so the mirror
+        # is the same if the file didn't change since that date.
+        return all(increment.date.epoch < restore_as_of for increment in path_obj._increments)
+
     @property
     def restore_log(self):
         """
@@ -1158,10 +2093,16 @@ class RdiffRepo(object):
         """
         return RestoreLogEntry(self, b'restore.log')
 
-    @cached_property
+    @property
     def status(self):
         """Check if a backup is in progress for the current repo."""
+        status = self._metadata.get('status', self._get_status)
+        if status[0] == 'in_progress':
+            # Backup in progress may terminate at any time.
+            self._metadata.pop('status')
+        return status
 
+    def _get_status(self):
         # Read content of the file and check if pid still exists
 
         # Make sure repoRoot is a valid rdiff-backup repository
@@ -1183,7 +2124,7 @@ class RdiffRepo(object):
                 logger.debug('pid [%s] does not exists', pid)
 
         # If entries status is defined return this status.
-        if getattr(self, '_entries_status', False):
+        if self._entries_status:
             return self._entries_status
 
         # If multiple current_mirror file exists and none of them are associated to a PID, this mean the last backup was interrupted.
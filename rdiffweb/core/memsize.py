@@ -0,0 +1,49 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Memory usage estimation of cached objects, used by the in-memory caches to
+enforce their size limit.
+"""
+
+import array
+import sys
+
+
+def estimate_size(obj, seen=None):
+    """
+    Rough estimate of the memory used by `obj` and the objects it references.
+    Objects already in `seen` are not counted twice.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (bytes, str, int, float, array.array)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        return size + sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(v, seen) for v in obj)
+    if not type(obj).__module__.startswith('rdiffweb.'):
+        # Don't walk into foreign objects like lazy translations.
+        return size
+    if hasattr(obj, '__dict__'):
+        size += estimate_size(vars(obj), seen)
+    for name in getattr(type(obj), '__slots__', ()):
+        size += estimate_size(getattr(obj, name, None), seen)
+    return size
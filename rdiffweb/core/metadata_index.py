@@ -0,0 +1,126 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import logging
+import os
+
+import cherrypy
+from cherrypy.process.plugins import SimplePlugin
+
+from rdiffweb.core.model import ErrorLog, ErrorLogFile, FileStatisticsSummary, RepoObject
+
+_logger = logging.getLogger(__name__)
+
+
+class MetadataIndexPlugin(SimplePlugin):
+    """
+    Periodically build the index of the tree recorded by the last backup of
+    each repository, so browsing a recent backup doesn't have to wait for
+    mirror_metadata files to be decoded. The same job summarizes the
+    file_statistics and records the error_log of every backup into the
+    database.
+    """
+
+    # Interval in seconds between two executions. Zero to disable.
+    interval = 900
+
+    # Number of largest files and folders kept for each backup.
+    top_count = 20
+
+    # Maximum depth of folders for which increment size is summed.
+    top_depth = 2
+
+    def start(self):
+        if not self.interval:
+            return
+        self.bus.log('Start MetadataIndex plugin')
+        self.bus.publish('scheduler:add_job', self.metadata_index_job, self.interval, run_on_start=True)
+
+    def stop(self):
+        self.bus.log('Stop MetadataIndex plugin')
+        self.bus.publish('scheduler:remove_job', self.metadata_index_job)
+
+    stop.priority = 49
+
+    def graceful(self):
+        """Reload of subscribers."""
+        self.stop()
+        self.start()
+
+    def metadata_index_job(self):
+        # A race condition may occur.
+        if cherrypy.db.session is None:
+            return
+        # Make sure to start from a clean session.
+        cherrypy.db.clear_sessions()
+        with cherrypy.db.session.begin():
+            repos = RepoObject.query.all()
+            cherrypy.db.session.expunge_all()
+        for repo in repos:
+            if not os.path.isdir(repo.full_path):
+                continue
+            try:
+                if repo.status[0] != 'ok':
+                    continue
+                repo.build_metadata_index()
+                self._update_file_statistics_summary(repo)
+                self._update_error_log(repo)
+            except Exception:
+                _logger.exception("fail to build metadata index for repo [%r]", repo.full_path)
+            finally:
+                cherrypy.db.session.rollback()
+
+    def _update_file_statistics_summary(self, repo):
+        """
+        Summarize the file_statistics of backups not yet summarized, starting
+        with the most recent one. Summaries of deleted backups are removed.
+        """
+        epochs = {entry.date.epoch for entry in repo.file_statistics}
+        with cherrypy.db.session.begin():
+            existing = FileStatisticsSummary.get_backup_dates(repo)
+            stale = existing - epochs
+            if stale:
+                FileStatisticsSummary.query.filter(
+                    FileStatisticsSummary.repoid == repo.id,
+                    FileStatisticsSummary.backup_date.in_(stale),
+                ).delete()
+        for entry in reversed(repo.file_statistics[:]):
+            if entry.date.epoch in existing:
+                continue
+            summary = entry.summary(self.top_count, self.top_depth)
+            with cherrypy.db.session.begin():
+                FileStatisticsSummary.set_summary(repo, entry.date, summary)
+
+    def _update_error_log(self, repo):
+        """
+        Record the errors of error_log files not yet recorded. Errors of
+        deleted backups are removed.
+        """
+        entries = {entry.date.epoch: entry for entry in repo.error_log}
+        with cherrypy.db.session.begin():
+            recorded = {int(d.timestamp()): d for d in ErrorLogFile.get_backup_dates(repo)}
+            ErrorLog.delete_errors(repo, [d for epoch, d in recorded.items() if epoch not in entries])
+        for epoch, entry in sorted(entries.items()):
+            if epoch in recorded:
+                continue
+            with cherrypy.db.session.begin():
+                ErrorLog.add_errors(repo, entry.date, entry.errors())
+
+
+cherrypy.metadata_index = MetadataIndexPlugin(cherrypy.engine)
+cherrypy.metadata_index.subscribe()
+
+cherrypy.config.namespaces['metadata_index'] = lambda key, value: setattr(cherrypy.metadata_index, key, value)
@@ -18,6 +18,8 @@ from sqlalchemy import event
 from sqlalchemy.engine import Engine
 
 from ._diskusage import DiskUsage  # noqa
+from ._errorlog import ErrorLog, ErrorLogFile, errorlog_errorclass_index, errorlog_repoid_index  # noqa
+from ._filestatistics import FileStatisticsSummary  # noqa
 from ._message import Message  # noqa
 from ._repo import RepoObject  # noqa
 from ._session import SessionObject  # noqa
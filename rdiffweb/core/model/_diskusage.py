@@ -79,8 +79,8 @@ class DiskUsage(Base):
             repo.increments_size = increments_size
             if mirror_size or increments_size:
                 repo.total_size = mirror_size + increments_size
-            elif repo.session_statistics:
-                repo.total_size = repo.session_statistics[-1].sourcefilesize
+            elif repo.session_statistics_series:
+                repo.total_size = repo.session_statistics_series['sourcefilesize'][-1]
             else:
                 repo.total_size = 0
 
@@ -0,0 +1,110 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2026 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import itertools
+
+import cherrypy
+import cherrypy_foundation.plugins.db  # noqa
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+
+from ._timestamp import Timestamp
+
+Base = cherrypy.db.base
+
+
+class ErrorLog(Base):
+    """
+    A single error reported in the error_log of a backup.
+    """
+
+    __tablename__ = 'errorlogs'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    # Number of errors inserted at once.
+    _BATCH = 500
+
+    id = Column('ErrorLogID', Integer, primary_key=True, autoincrement=True)
+    repoid = Column('RepoID', Integer, ForeignKey("repos.RepoID", ondelete="CASCADE"), nullable=False)
+    repo = relationship('RepoObject', lazy=True)
+    backup_date = Column('BackupDate', Timestamp, nullable=False)
+    path = Column('Path', String, nullable=False)
+    error_class = Column('ErrorClass', String, nullable=False)
+    message = Column('Message', String, nullable=False)
+
+    def __repr__(self):
+        return f"ErrorLog({self.repoid!r}, {self.backup_date!r}, {self.error_class!r}, {self.path!r})"
+
+    @classmethod
+    def add_errors(cls, repo_obj, date, errors):
+        """
+        Record the errors of the given backup date. `errors` is an iterable
+        of (error_class, path, message).
+        """
+        errors = iter(errors)
+        count = 0
+        while True:
+            batch = [
+                {
+                    'RepoID': repo_obj.id,
+                    'BackupDate': date,
+                    'Path': repo_obj._decode(path),
+                    'ErrorClass': error_class,
+                    'Message': message,
+                }
+                for error_class, path, message in itertools.islice(errors, cls._BATCH)
+            ]
+            if not batch:
+                break
+            cherrypy.db.session.execute(cls.__table__.insert(), batch)
+            count += len(batch)
+        ErrorLogFile(repoid=repo_obj.id, backup_date=date, error_count=count).add()
+        return count
+
+    @classmethod
+    def delete_errors(cls, repo_obj, dates):
+        """
+        Delete the errors of the given backup dates.
+        """
+        if not dates:
+            return
+        cls.query.filter(cls.repoid == repo_obj.id, cls.backup_date.in_(dates)).delete(synchronize_session=False)
+        ErrorLogFile.query.filter(ErrorLogFile.repoid == repo_obj.id, ErrorLogFile.backup_date.in_(dates)).delete(
+            synchronize_session=False
+        )
+
+
+class ErrorLogFile(Base):
+    """
+    Keep track of the error_log files already recorded.
+    """
+
+    __tablename__ = 'errorlogfiles'
+
+    repoid = Column('RepoID', Integer, ForeignKey("repos.RepoID", ondelete="CASCADE"), nullable=False, primary_key=True)
+    backup_date = Column('BackupDate', Timestamp, nullable=False, primary_key=True)
+    error_count = Column('ErrorCount', Integer, nullable=False, default=0)
+
+    @classmethod
+    def get_backup_dates(cls, repo_obj):
+        """
+        Return the list of backup dates already recorded.
+        """
+        return [row.backup_date for row in cls.query.with_entities(cls.backup_date).filter(cls.repoid == repo_obj.id)]
+
+
+errorlog_repoid_index = Index('errorlog_repoid_index', ErrorLog.repoid, ErrorLog.backup_date)
+errorlog_errorclass_index = Index('errorlog_errorclass_index', ErrorLog.error_class, ErrorLog.backup_date)
@@ -0,0 +1,83 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2026 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import cherrypy
+import cherrypy_foundation.plugins.db  # noqa
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, LargeBinary, SmallInteger, String
+from sqlalchemy.orm import relationship
+
+Base = cherrypy.db.base
+
+
+class FileStatisticsSummary(Base):
+    """
+    Largest files and folders of a single backup computed from its
+    file_statistics. Rows are ranked by value for each kind of summary.
+    """
+
+    __tablename__ = 'filestatisticssummaries'
+
+    KINDS = ['size', 'increment_size', 'folder_increment_size']
+
+    repoid = Column('RepoID', Integer, ForeignKey("repos.RepoID", ondelete="CASCADE"), nullable=False, primary_key=True)
+    repo = relationship('RepoObject', lazy=True)
+    backup_date = Column('BackupDate', BigInteger, nullable=False, primary_key=True)
+    kind = Column('Kind', String, nullable=False, primary_key=True)
+    rank = Column('Rank', SmallInteger, nullable=False, primary_key=True)
+    path = Column('Path', LargeBinary, nullable=False)
+    value = Column('Value', BigInteger, nullable=False)
+
+    def __repr__(self):
+        return f"FileStatisticsSummary({self.repoid!r}, {self.backup_date!r}, {self.kind!r}, {self.path!r}, {self.value!r})"
+
+    @classmethod
+    def get_summary(cls, repo_obj, date):
+        """
+        Return the summary of the given backup date as a dict of lists of
+        (path, value) or None if not yet computed.
+        """
+        rows = (
+            cls.query.with_entities(cls.kind, cls.path, cls.value)
+            .filter(cls.repoid == repo_obj.id, cls.backup_date == date.epoch)
+            .order_by(cls.kind, cls.rank)
+            .all()
+        )
+        if not rows:
+            return None
+        summary = {kind: [] for kind in cls.KINDS}
+        for kind, path, value in rows:
+            summary.setdefault(kind, []).append((path, value))
+        return summary
+
+    @classmethod
+    def get_backup_dates(cls, repo_obj):
+        """
+        Return the set of backup dates, as epoch, with a summary.
+        """
+        return {
+            row.backup_date
+            for row in cls.query.with_entities(cls.backup_date).filter(cls.repoid == repo_obj.id).distinct()
+        }
+
+    @classmethod
+    def set_summary(cls, repo_obj, date, summary):
+        """
+        Replace the summary of the given backup date.
+        """
+        cls.query.filter(cls.repoid == repo_obj.id, cls.backup_date == date.epoch).delete()
+        for kind, items in summary.items():
+            for rank, (path, value) in enumerate(items):
+                cls(repoid=repo_obj.id, backup_date=date.epoch, kind=kind, rank=rank, path=path, value=value).add()
@@ -15,6 +15,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import codecs
 import encodings
+import itertools
 import os
 import sys
 from datetime import datetime, timedelta, timezone
@@ -115,6 +116,9 @@ def _split_path(path):
 class RepoObject(MessageMixin, Base, RdiffRepo):
     DEFAULT_REPO_ENCODING = codecs.lookup((sys.getfilesystemencoding() or 'utf-8').lower()).name
 
+    # Number of entries for which disk usage get queried at once.
+    _DISK_USAGE_BATCH = 500
+
     STATUS_DELETING = 'deleting'  # Mark for deletion.
 
     __tablename__ = 'repos'
@@ -404,15 +408,16 @@ class RepoObject(MessageMixin, Base, RdiffRepo):
         required_calendar_days = self._count_active_days_backward(now, self.inactivity)
         cutoff = now - timedelta(days=required_calendar_days)
 
-        if not self.session_statistics:
+        series = self.session_statistics_series
+        if not series:
             return None
 
         # Use slice to get sessions within the inactivity window
-        recent_sessions = self.session_statistics[cutoff:now]
+        recent = series.range(cutoff, now)
 
         # Check if any session has file activity
-        for stats in recent_sessions:
-            if stats.newfiles > 0 or stats.deletedfiles > 0 or stats.changedfiles > 0:
+        for attr in ['newfiles', 'deletedfiles', 'changedfiles']:
+            if any(series[attr][recent]):
                 return False  # Found activity
 
         return True
@@ -445,29 +450,57 @@ class RepoObject(MessageMixin, Base, RdiffRepo):
 
         return repo_status
 
-    def listdir(self, path):
+    def listdir(self, path, as_of=None):
         """
         Override this implementation to include disk usage data.
         """
         # Get on disk values
-        entries = super().listdir(path)
+        entries = super().listdir(path, as_of=as_of)
         if not entries:
             return []
+        if as_of is not None:
+            # Disk usage represent the current state of the repository.
+            return entries
+        self._attach_disk_usage(path, entries)
+        return entries
+
+    def iter_listdir(self, path, cursor=None, limit=None, sort='name', as_of=None):
+        """
+        Override this implementation to include disk usage data.
+        """
+        entries = super().iter_listdir(path, cursor=cursor, limit=limit, sort=sort, as_of=as_of)
+        if as_of is not None:
+            # Disk usage represent the current state of the repository.
+            return entries
+
+        def _iter():
+            # Query disk usage by batch to keep memory usage low.
+            while True:
+                batch = list(itertools.islice(entries, self._DISK_USAGE_BATCH))
+                if not batch:
+                    return
+                self._attach_disk_usage(path, batch)
+                yield from batch
+
+        return _iter()
 
-        # Query disk usage for the given path
+    def _attach_disk_usage(self, path, entries):
+        """
+        Query disk usage of the given entries located in `path`.
+        """
         from ._diskusage import DiskUsage
 
         # Normalize path for database lookup.
         path = os.path.normpath(path).strip(b'/')
         if path == b'.':
             path = b''
-        du_by_path = {
-            du.logical_path: du
-            for du in DiskUsage.query.filter(
-                DiskUsage.repoid == self.id,
-                DiskUsage.parent_path == path,
-            ).all()
-        }
+        query = DiskUsage.query.filter(
+            DiskUsage.repoid == self.id,
+            DiskUsage.parent_path == path,
+        )
+        if len(entries) <= self._DISK_USAGE_BATCH:
+            query = query.filter(DiskUsage.child_name.in_([os.path.basename(entry.path) for entry in entries]))
+        du_by_path = {du.logical_path: du for du in query.all()}
 
         for entry in entries:
             du = du_by_path.get(entry.path)
@@ -478,8 +511,6 @@ class RepoObject(MessageMixin, Base, RdiffRepo):
                 entry.mirror_size = None
                 entry.increments_size = None
 
-        return entries
-
 
 @event.listens_for(Base.metadata, 'after_create')
 def update_repo_schema(target, conn, **kw):
@@ -480,7 +480,9 @@ class NotificationPlugin(SimplePlugin):
             "total_interrupted": status_counts["interrupted"],
             "total_in_progress": status_counts["in_progress"],
             # Errors
-            "error_count": sum(r.session_statistics[-1].errors for r in repo_objs if r.last_backup_date),
+            "error_count": sum(
+                r.session_statistics_series['errors'][-1] for r in repo_objs if r.session_statistics_series
+            ),
             # Storage
             "disk_usage": userobj.disk_usage,
             "disk_quota": userobj.disk_quota,
@@ -488,7 +490,9 @@ class NotificationPlugin(SimplePlugin):
             "activity_start": activity_start,
             "activity_end": activity_end,
             "activity_dates": [
-                d.date for repo in repo_objs for d in repo.session_statistics[activity_start:activity_end]
+                d
+                for series in (r.session_statistics_series for r in repo_objs)
+                for d in series.dates[series.range(activity_start, activity_end)]
             ],
         }
 
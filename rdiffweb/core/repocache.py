@@ -0,0 +1,167 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+Process-wide cache of parsed repository metadata.
+
+A new RdiffRepo is created for every request. Without this cache, the content
+of rdiff-backup-data would be listed and parsed again on every page. Metadata
+is keyed by the rdiff-backup-data location and is reused until the folder
+mtime changes.
+"""
+
+import functools
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import cherrypy
+from cherrypy.process.plugins import SimplePlugin
+
+from rdiffweb.core.memsize import estimate_size
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class RepoMetadata:
+    """
+    Metadata of a single repository computed lazily.
+
+    mtime: modification time of rdiff-backup-data when this metadata was created.
+    previous: values of the outdated metadata this one replace, if any. Used
+    to update metadata incrementally. Each previous value is released once
+    the same key is computed again.
+    on_resize: called without argument when the size of the metadata grows.
+    """
+
+    def __init__(self, mtime, previous=None, on_resize=None):
+        self.mtime = mtime
+        self.previous = previous or {}
+        self.on_resize = on_resize
+        self.size = 0
+        self._values = {}
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, func):
+        """
+        Return the value of `key`, computing it with `func()` when missing.
+        """
+        value = self._values.get(key, _MISSING)
+        if value is _MISSING:
+            value = func()
+            # Only estimate the size of the new value and keep a running total.
+            size = estimate_size(key) + estimate_size(value)
+            with self._lock:
+                self._values[key] = value
+                self.previous.pop(key, None)
+                self.size += size - self._sizes.get(key, 0)
+                self._sizes[key] = size
+            if self.on_resize:
+                self.on_resize()
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+            self.size -= self._sizes.pop(key, 0)
+
+
+class RepoCache(SimplePlugin):
+    """
+    Bounded LRU cache of RepoMetadata keyed by rdiff-backup-data location.
+
+    max_size: approximate memory limit in bytes. Least recently used metadata
+    is evicted when the limit is reached.
+    """
+
+    max_size = 64 * 1024 * 1024
+
+    def __init__(self, bus):
+        super().__init__(bus)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stop(self):
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get(self, data_path):
+        """
+        Return the metadata of the given rdiff-backup-data folder. A new empty
+        metadata is returned if the folder changed since last call.
+        """
+        try:
+            mtime = os.stat(data_path).st_mtime_ns
+        except OSError:
+            # Don't keep track of broken repository.
+            self.invalidate(data_path)
+            return RepoMetadata(None)
+        with self._lock:
+            metadata = self._entries.get(data_path)
+            if metadata is not None and metadata.mtime == mtime:
+                self._entries.move_to_end(data_path)
+                self.hits += 1
+                return metadata
+            self.misses += 1
+            previous = metadata._values if metadata is not None else None
+            metadata = self._entries[data_path] = RepoMetadata(
+                mtime, previous, on_resize=functools.partial(self._resized, data_path)
+            )
+            self._evict()
+        return metadata
+
+    def _resized(self, data_path):
+        """
+        Called when metadata grows as values are computed to keep the cache within `max_size`.
+        """
+        with self._lock:
+            if data_path in self._entries:
+                self._evict()
+
+    def invalidate(self, data_path):
+        with self._lock:
+            self._entries.pop(data_path, None)
+
+    def _evict(self):
+        # Called with lock. Keep at least the most recent entry.
+        total = sum(m.size for m in self._entries.values())
+        while total > self.max_size and len(self._entries) > 1:
+            _key, metadata = self._entries.popitem(last=False)
+            total -= metadata.size
+            self.evictions += 1
+
+    @property
+    def size(self):
+        with self._lock:
+            return sum(m.size for m in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
+
+
+cherrypy.repocache = RepoCache(cherrypy.engine)
+cherrypy.repocache.subscribe()
+
+cherrypy.config.namespaces['repocache'] = lambda key, value: setattr(cherrypy.repocache, key, value)
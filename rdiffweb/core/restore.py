@@ -23,15 +23,27 @@ appropriate archive usable by the target system. In few circumstances it's
 impossible to properly generate a valid filename depending of the archive types.
 """
 
+import argparse
 import logging
 import os
 import shutil
 import stat
+import struct
 import subprocess
+import sys
 import tarfile
 import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from zipfile import ZIP_DEFLATED, ZIP_STORED, ZipFile
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 logger = logging.getLogger(__name__)
 
 # Log used by rdiff-backup
@@ -42,29 +54,180 @@ TOKEN2 = b'Processing changed file '
 CUST_EXIT_CODE = 65
 
 
+class ArchiveSettings(object):
+    """
+    Settings used to create archives.
+
+    compression_level: compression level of archives. When undefined, the default of each format is used.
+    compression_threads: number of threads used to compress archives. When undefined, all CPUs are used.
+    """
+
+    compression_level = None
+
+    compression_threads = None
+
+    @property
+    def compression(self):
+        """
+        Compression settings to be used to create archives.
+        """
+        return {'level': self.compression_level, 'threads': self.compression_threads}
+
+
 class RestoreException(Exception):
     """Raised when restore fail."""
 
     pass
 
 
+class ParallelGzipWriter(object):
+    """
+    Write a gzip stream by compressing blocks of data in multiple threads.
+    Like pigz, each block is compressed independently using the end of the
+    previous block as dictionary, so the output is a regular gzip stream.
+    """
+
+    BLOCK_SIZE = 128 * 1024
+
+    def __init__(self, fileobj, level=None, threads=None):
+        self.fileobj = fileobj
+        self.level = 9 if level is None else level
+        self.threads = threads or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(self.threads) if self.threads > 1 else None
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._previous = b''
+        self._crc = 0
+        self._size = 0
+        # Write gzip header without filename.
+        self.fileobj.write(b'\x1f\x8b\x08\x00' + struct.pack('<L', int(time.time())) + b'\x00\xff')
+
+    def _compress(self, data, zdict, last):
+        if zdict:
+            c = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS, zlib.DEF_MEM_LEVEL, 0, zdict)
+        else:
+            c = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        # Sync flush keep the blocks byte aligned to be concatenated.
+        return c.compress(data) + c.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+    def _submit(self, data, last=False):
+        zdict = self._previous[-32768:]
+        self._previous = data
+        if self._executor is None:
+            self.fileobj.write(self._compress(data, zdict, last))
+            return
+        self._pending.append(self._executor.submit(self._compress, data, zdict, last))
+        # Limit the amount of data in memory.
+        while len(self._pending) > self.threads * 2:
+            self.fileobj.write(self._pending.popleft().result())
+
+    def write(self, data):
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        self._buffer.extend(data)
+        while len(self._buffer) >= self.BLOCK_SIZE:
+            block = bytes(self._buffer[: self.BLOCK_SIZE])
+            del self._buffer[: self.BLOCK_SIZE]
+            self._submit(block)
+        return len(data)
+
+    def close(self):
+        if self._buffer is None:
+            return
+        self._submit(bytes(self._buffer), last=True)
+        self._buffer = None
+        while self._pending:
+            self.fileobj.write(self._pending.popleft().result())
+        if self._executor:
+            self._executor.shutdown()
+        self.fileobj.write(struct.pack('<LL', self._crc & 0xFFFFFFFF, self._size & 0xFFFFFFFF))
+
+
+def _compressor(fileobj, compression, level=None, threads=None):
+    """
+    Return a writer compressing data into `fileobj` using `compression`.
+    """
+    assert compression in ['gz', 'zst']
+    if compression == 'gz':
+        return ParallelGzipWriter(fileobj, level=level, threads=threads)
+    # zstd use its own worker threads only when more than one is requested.
+    cctx = zstandard.ZstdCompressor(level=3 if level is None else level, threads=threads if threads > 1 else 0)
+    return cctx.stream_writer(fileobj, closefd=False)
+
+
+class CompressProcess(object):
+    """
+    Compress data in a separate process writing directly to `fileobj`.
+
+    Threads are not safe to be started in a process forked from the
+    multithreaded web server, as locks held at fork time, like the logging or
+    import lock, may never be released. So multithreaded compression runs in
+    a new python interpreter instead.
+    """
+
+    def __init__(self, fileobj, compression, level=None, threads=None):
+        assert compression in ['gz', 'zst']
+        cmd = [sys.executable, '-m', 'rdiffweb.core.restore', compression]
+        if level is not None:
+            cmd += ['--level', str(level)]
+        if threads:
+            cmd += ['--threads', str(threads)]
+        # Make sure rdiffweb is importable even when not installed.
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+        # Flush data already written by us before the new process write to it.
+        fileobj.flush()
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=fileobj, env=env)
+
+    def write(self, data):
+        return self._proc.stdin.write(data)
+
+    def close(self):
+        if self._proc.stdin.closed:
+            return
+        self._proc.stdin.close()
+        returncode = self._proc.wait()
+        if returncode != 0:
+            raise OSError('compression process return non-zero exit status: %s' % returncode)
+
+
+def _has_fileno(fileobj):
+    try:
+        fileobj.fileno()
+        return True
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
 class TarArchiver(object):
     """
     Archiver to create tar archive (with compression).
     """
 
-    def __init__(self, dest, compression=''):
-        assert compression in ['', 'gz', 'bz2']
-        mode = "w|" + compression
+    def __init__(self, dest, compression='', level=None, threads=None):
+        assert compression in ['', 'gz', 'bz2', 'zst']
 
-        # Open the tar archive with the right method.
+        # Open the destination file or stream.
         if isinstance(dest, str):
-            self.z = tarfile.open(name=dest, mode=mode, encoding='UTF-8', format=tarfile.PAX_FORMAT)
-            self.fileobj = None
+            dest = self.fileobj = open(dest, 'wb')
         else:
-            self.z = tarfile.open(fileobj=dest, mode=mode, encoding='UTF-8', format=tarfile.PAX_FORMAT)
             self.fileobj = dest
 
+        # Compress gzip and zstd outside tarfile. With multiple threads, the
+        # compression runs in a separate process.
+        self.compressor = None
+        if compression in ['gz', 'zst']:
+            threads = threads or os.cpu_count() or 1
+            if threads > 1 and _has_fileno(dest):
+                dest = self.compressor = CompressProcess(dest, compression, level=level, threads=threads)
+            else:
+                dest = self.compressor = _compressor(dest, compression, level=level, threads=1)
+        mode = "w|bz2" if compression == 'bz2' else "w|"
+
+        # Open the tar archive with the right method.
+        self.z = tarfile.open(fileobj=dest, mode=mode, encoding='UTF-8', format=tarfile.PAX_FORMAT)
+
     def addfile(self, filename, arcname, encoding):
         assert isinstance(filename, bytes)
         assert isinstance(arcname, bytes)
@@ -83,6 +246,9 @@ class TarArchiver(object):
     def close(self):
         # Close tar archive
         self.z.close()
+        # Flush compressed data.
+        if self.compressor:
+            self.compressor.close()
         # Also close file object.
         if self.fileobj:
             self.fileobj.close()
@@ -94,9 +260,9 @@ class ZipArchiver(object):
     Can write uncompressed, or compressed with deflate.
     """
 
-    def __init__(self, dest, compress=True):
+    def __init__(self, dest, compress=True, level=None, threads=None):
         compress = compress and ZIP_DEFLATED or ZIP_STORED
-        self.z = ZipFile(dest, 'w', compress)
+        self.z = ZipFile(dest, 'w', compress, compresslevel=level)
 
     def addfile(self, filename, arcname, encoding):
         assert isinstance(filename, bytes)
@@ -126,7 +292,7 @@ class RawArchiver(object):
     Used to stream a single file.
     """
 
-    def __init__(self, dest):
+    def __init__(self, dest, level=None, threads=None):
         assert dest
         self.dest = dest
         if isinstance(self.dest, str):
@@ -148,14 +314,19 @@ class RawArchiver(object):
 
 ARCHIVERS = {
     'tar': TarArchiver,
-    'tbz2': lambda dest: TarArchiver(dest, 'bz2'),
-    'tar.bz2': lambda dest: TarArchiver(dest, 'bz2'),
-    'tar.gz': lambda dest: TarArchiver(dest, 'gz'),
-    'tgz': lambda dest: TarArchiver(dest, 'gz'),
+    'tbz2': lambda dest, **kwargs: TarArchiver(dest, 'bz2', **kwargs),
+    'tar.bz2': lambda dest, **kwargs: TarArchiver(dest, 'bz2', **kwargs),
+    'tar.gz': lambda dest, **kwargs: TarArchiver(dest, 'gz', **kwargs),
+    'tgz': lambda dest, **kwargs: TarArchiver(dest, 'gz', **kwargs),
     'zip': ZipArchiver,
     'raw': RawArchiver,
 }
 
+# zstd compression is only available with zstandard library.
+if zstandard is not None:
+    ARCHIVERS['tar.zst'] = lambda dest, **kwargs: TarArchiver(dest, 'zst', **kwargs)
+    ARCHIVERS['tzst'] = lambda dest, **kwargs: TarArchiver(dest, 'zst', **kwargs)
+
 
 class _wrap_close:
     """Wrap fileobject."""
@@ -166,6 +337,11 @@ class _wrap_close:
         self._pid = pid
         self._return_code = None
 
+    @property
+    def returncode(self):
+        """Exit status of the restore process once closed."""
+        return self._return_code
+
     def close(self):
         self._stream.close()
         if self._return_code is None:
@@ -233,23 +409,11 @@ def _yield_previous_lines(stream):
         yield previous_line
 
 
-def pipe_restore(rdiff_backup, path, restore_as_of, kind, encoding, env={}):
+def _pipe(target, **kwargs):
     """
-    Fork execution to restore and archive files in a separate process to woraround python Global Interpreter Lock.
-
-    Used to restore a file or a directory.
-
-    rdiff_backup: location of rdiff-backup executable to be used.
-    path: relative or absolute file or folder to be restored (unquoted)
-    restore_as_of: date to restore
-    kind: type of archive to generate or raw to stream a single file.
-    encoding: encoding of the repository (used to properly encode the filename in archive)
+    Fork execution of `target` writing its output to a pipe. The child
+    process sends a status header followed by the archive.
     """
-    assert rdiff_backup
-    assert isinstance(path, bytes)
-    assert isinstance(restore_as_of, int)
-    assert kind in ARCHIVERS
-
     # Create a pipe for file transfert
     rfile, wfile = os.pipe()
 
@@ -272,16 +436,7 @@ def pipe_restore(rdiff_backup, path, restore_as_of, kind, encoding, env={}):
         os.close(rfile)
         try:
             with os.fdopen(wfile, 'wb') as dest:
-                return_code = _restore(
-                    rdiff_backup=rdiff_backup,
-                    path=path,
-                    restore_as_of=restore_as_of,
-                    kind=kind,
-                    encoding=encoding,
-                    dest=dest,
-                    env=env,
-                    send_header=1,
-                )
+                return_code = target(dest=dest, send_header=1, **kwargs)
                 os._exit(return_code)
         except Exception as e:
             # We need to catch _any_ exception so that it doesn't
@@ -291,7 +446,99 @@ def pipe_restore(rdiff_backup, path, restore_as_of, kind, encoding, env={}):
             os._exit(CUST_EXIT_CODE)
 
 
-def _restore(rdiff_backup, path, restore_as_of, kind, encoding, dest, env={}, send_header=False):
+def pipe_restore(rdiff_backup, path, restore_as_of, kind, encoding, env={}, compression={}):
+    """
+    Fork execution to restore and archive files in a separate process to woraround python Global Interpreter Lock.
+
+    Used to restore a file or a directory.
+
+    rdiff_backup: location of rdiff-backup executable to be used.
+    path: relative or absolute file or folder to be restored (unquoted)
+    restore_as_of: date to restore
+    kind: type of archive to generate or raw to stream a single file.
+    encoding: encoding of the repository (used to properly encode the filename in archive)
+    compression: compression `level` and number of `threads` used to create the archive.
+    """
+    assert rdiff_backup
+    assert isinstance(path, bytes)
+    assert isinstance(restore_as_of, int)
+    assert kind in ARCHIVERS
+    return _pipe(
+        _restore,
+        rdiff_backup=rdiff_backup,
+        path=path,
+        restore_as_of=restore_as_of,
+        kind=kind,
+        encoding=encoding,
+        env=env,
+        compression=compression,
+    )
+
+
+def pipe_archive(path, kind, encoding, exclude=[], unquote=None, compression={}):
+    """
+    Fork execution to archive a folder of the mirror as is, without
+    running rdiff-backup. Only valid when the folder didn't change since the
+    date to be restored.
+
+    path: folder to be archived
+    kind: type of archive to generate.
+    encoding: encoding of the repository (used to properly encode the filename in archive)
+    exclude: names to be excluded from the top level folder.
+    unquote: function used to remove quoted characters from filenames.
+    compression: compression `level` and number of `threads` used to create the archive.
+    """
+    assert isinstance(path, bytes)
+    assert kind in ARCHIVERS
+    return _pipe(
+        _archive,
+        path=path,
+        kind=kind,
+        encoding=encoding,
+        exclude=exclude,
+        unquote=unquote,
+        compression=compression,
+    )
+
+
+def _walk(path, exclude=[]):
+    """
+    Yield every file, folder and symlink of `path`, parent folder first.
+    Symlinks to folders are not followed.
+    """
+    yield path
+    for dirpath, dirnames, filenames in os.walk(path):
+        if dirpath == path:
+            dirnames[:] = [name for name in dirnames if name not in exclude]
+            filenames = [name for name in filenames if name not in exclude]
+        dirnames.sort()
+        for name in sorted(dirnames + filenames):
+            yield os.path.join(dirpath, name)
+
+
+def _archive(path, kind, encoding, dest, exclude=[], unquote=None, send_header=False, compression={}):
+    assert isinstance(path, bytes)
+    assert kind in ARCHIVERS
+
+    if send_header:
+        dest.write(b'ok\n')
+    archive = ARCHIVERS[kind](dest, **compression)
+    try:
+        for fullpath in _walk(path, exclude):
+            arcname = os.path.relpath(fullpath, path)
+            if unquote:
+                arcname = unquote(arcname)
+            try:
+                archive.addfile(fullpath, arcname, encoding)
+            except Exception:
+                # Same as restore, continue with the next file.
+                logger.debug('error: fail to add %r' % fullpath, exc_info=1)
+        return 0
+    finally:
+        archive.close()
+
+
+def _restore(rdiff_backup, path, restore_as_of, kind, encoding, dest, env={}, send_header=False, compression={}):
     assert isinstance(path, bytes)
     assert isinstance(restore_as_of, int)
     assert kind in ARCHIVERS
@@ -344,7 +591,7 @@ def _restore(rdiff_backup, path, restore_as_of, kind, encoding, dest, env={}, se
                     dest.write(b'ok\n')
                 if archive is None:
                     # Then send archive.
-                    archive = ARCHIVERS[kind](dest)
+                    archive = ARCHIVERS[kind](dest, **compression)
                 archive.addfile(fullpath, arcname, encoding)
             except Exception:
                 # Many error may happen when trying to add a file to the
@@ -374,3 +621,22 @@ def _restore(rdiff_backup, path, restore_as_of, kind, encoding, dest, env={}, se
             shutil.rmtree(tmp_output, ignore_errors=True)
         elif os.path.isfile(tmp_output):
             os.remove(tmp_output)
+
+
+def main(args=None):
+    """
+    Compress stdin to stdout. Used by `CompressProcess`.
+    """
+    parser = argparse.ArgumentParser(description='compress stdin to stdout')
+    parser.add_argument('compression', choices=['gz', 'zst'])
+    parser.add_argument('--level', type=int)
+    parser.add_argument('--threads', type=int)
+    args = parser.parse_args(args)
+    writer = _compressor(sys.stdout.buffer, args.compression, level=args.level, threads=args.threads or 1)
+    shutil.copyfileobj(sys.stdin.buffer, writer, ParallelGzipWriter.BLOCK_SIZE)
+    writer.close()
+    sys.stdout.buffer.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+On-disk cache of restored files and archives.
+
+Restoring a large folder is expensive: rdiff-backup must rebuild every file
+and the result is compressed into an archive. When `cache_dir` is defined,
+the output of each restore is spooled to a file in this folder so identical
+requests received while the restore is in progress attach to the same spool
+instead of starting another rdiff-backup process. Each client reads the spool
+at its own pace and whichever client needs more data pulls it from the
+restore process. When `cache_dir` is undefined, the output of the restore is
+streamed directly to the client without using any disk space.
+
+Completed spools are kept in the cache folder so repeat requests are served
+directly from disk. Entries are keyed by repository, path, restore date,
+archive kind and the mtime of rdiff-backup-data, so they become unreachable
+as soon as the repository is updated. Least recently used entries are deleted
+when the size of the cache exceeds `max_size`. When a download is
+interrupted, the restore is completed in background so the download may be
+resumed from the cache.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+
+import cherrypy
+from cherrypy.process.plugins import SimplePlugin
+
+logger = logging.getLogger(__name__)
+
+# Amount of data read from the restore process at once.
+CHUNK_SIZE = 65536
+
+
+class _Spool:
+    """
+    Output of a single restore process shared by every reader.
+    """
+
+    def __init__(self, cache, digest):
+        self.cache = cache
+        self.digest = digest
+        self.ready = threading.Event()
+        self.error = None
+        self.source = None
+        self.fd = None
+        self.path = None
+        self.size = 0
+        self.done = False
+        self.readers = 1
+        self._pump_lock = threading.Lock()
+
+    def start(self, restore_func, dir):
+        self.source = restore_func()
+        fd, self.path = tempfile.mkstemp(prefix=b'.', suffix=b'.tmp', dir=dir)
+        self.fd = fd
+
+    def pump(self, offset):
+        """
+        Read the next chunk from the restore process unless data after
+        `offset` was already pulled by another reader.
+        """
+        with self._pump_lock:
+            if self.done or self.size > offset:
+                return
+            try:
+                data = self.source.read(CHUNK_SIZE)
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(self.fd, view) :]
+            except BaseException:
+                self._finish(success=False)
+                raise
+            if data:
+                self.size += len(data)
+            else:
+                self._finish(success=True)
+
+    def _finish(self, success):
+        self.source.close()
+        success = success and getattr(self.source, 'returncode', 0) == 0
+        self.cache._complete(self, success)
+        self.done = True
+
+    def abort(self):
+        if not self.done:
+            self.source.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+        os.close(self.fd)
+
+
+class _SpoolReader:
+    """
+    Read the content of a spool as it is produced. Once the restore is
+    completed, the reader becomes seekable so byte ranges may be served.
+    """
+
+    def __init__(self, spool, drain=True):
+        self._spool = spool
+        self._offset = 0
+        self._closed = False
+        self._drain = drain
+
+    def read(self, size=-1):
+        spool = self._spool
+        if size is None or size < 0:
+            # Read everything until the end of the restore.
+            while not spool.done:
+                spool.pump(spool.size)
+        while self._offset >= spool.size and not spool.done:
+            spool.pump(self._offset)
+        length = spool.size - self._offset
+        if size is not None and size >= 0:
+            length = min(length, size)
+        if length <= 0:
+            return b''
+        data = os.pread(spool.fd, length, self._offset)
+        self._offset += len(data)
+        return data
+
+    @property
+    def etag(self):
+        """
+        Identify the content of the restore.
+        """
+        return self._spool.digest.decode('ascii')
+
+    def seekable(self):
+        return self._spool.done
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if not self._spool.done:
+            raise io.UnsupportedOperation('restore in progress')
+        if whence == os.SEEK_CUR:
+            offset += self._offset
+        elif whence == os.SEEK_END:
+            offset += self._spool.size
+        self._offset = max(0, offset)
+        return self._offset
+
+    def tell(self):
+        return self._offset
+
+    def fileno(self):
+        if not self._spool.done:
+            raise io.UnsupportedOperation('restore in progress')
+        return self._spool.fd
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._spool.cache._release(self._spool, drain=self._drain)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class RestoreCache(SimplePlugin):
+    """
+    Share restores in progress and keep completed ones on disk.
+
+    cache_dir: location of the cache folder. When undefined, restores are neither shared nor cached.
+    max_size: maximum size in bytes of the cache folder.
+    """
+
+    cache_dir = None
+
+    max_size = 1024 * 1024 * 1024
+
+    def __init__(self, bus):
+        super().__init__(bus)
+        self._lock = threading.Lock()
+        # Restores in progress by key digest.
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    @property
+    def enabled(self):
+        return bool(self.cache_dir) and self.max_size > 0
+
+    def _get_digest(self, key):
+        return hashlib.sha256(repr(key).encode('utf-8', 'surrogateescape')).hexdigest().encode('ascii')
+
+    def _open_entry(self, digest):
+        entry_path = os.path.join(os.fsencode(self.cache_dir), digest)
+        try:
+            fileobj = open(entry_path, 'rb')
+        except FileNotFoundError:
+            return None
+        # The mtime of the entry is updated on every use, so identify the
+        # content with its key digest.
+        fileobj.etag = digest.decode('ascii')
+        # Update the mtime to keep track of recently used entries.
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return fileobj
+
+    def open(self, key, restore_func):
+        """
+        Return a fileobj with the content of the restore identified by `key`.
+        Completed restores are read from the cache, restores in progress are
+        shared, otherwise `restore_func()` is called to start a new restore.
+        """
+        if not self.enabled:
+            # Stream directly from the restore process.
+            return restore_func()
+        digest = self._get_digest(key)
+        with self._lock:
+            fileobj = self._open_entry(digest)
+            if fileobj is not None:
+                self.hits += 1
+                return fileobj
+            spool = self._inflight.get(digest)
+            owner = spool is None
+            if owner:
+                self.misses += 1
+                spool = self._inflight[digest] = _Spool(self, digest)
+            else:
+                spool.readers += 1
+                self.coalesced += 1
+        if not owner:
+            # Attach to the restore in progress.
+            spool.ready.wait()
+            if spool.error is not None:
+                raise spool.error
+            return _SpoolReader(spool)
+        try:
+            spool_dir = os.fsencode(self.cache_dir)
+            os.makedirs(spool_dir, mode=0o700, exist_ok=True)
+            spool.start(restore_func, spool_dir)
+        except BaseException as e:
+            spool.error = e
+            with self._lock:
+                self._inflight.pop(spool.digest, None)
+            if spool.source is not None:
+                spool.source.close()
+            raise
+        finally:
+            spool.ready.set()
+        return _SpoolReader(spool)
+
+    def _release(self, spool, drain=True):
+        """
+        Called when a reader is closed. When the last reader is closed before
+        the end, the restore is completed in background if it may be kept in
+        cache, so an interrupted download can be resumed. Otherwise, the
+        restore is stopped.
+        """
+        with self._lock:
+            spool.readers -= 1
+            if spool.readers > 0:
+                return
+            if drain and not spool.done and self.enabled and spool.size <= self.max_size:
+                spool.readers += 1
+                threading.Thread(target=self._drain, args=(spool,), name='restore-cache-drain', daemon=True).start()
+                return
+            if not spool.done and self._inflight.get(spool.digest) is spool:
+                del self._inflight[spool.digest]
+        spool.abort()
+
+    def _drain(self, spool):
+        with _SpoolReader(spool, drain=False):
+            try:
+                while not spool.done and spool.size <= self.max_size:
+                    spool.pump(spool.size)
+            except Exception:
+                logger.warning('fail to complete restore in background', exc_info=1)
+
+    def _complete(self, spool, success):
+        """
+        Called once the restore process is completed. The spool is moved
+        into the cache when successful, otherwise it's deleted. Readers
+        still attached keep reading from their file descriptor.
+        """
+        with self._lock:
+            if self._inflight.get(spool.digest) is spool:
+                del self._inflight[spool.digest]
+            if success and self.enabled and spool.size <= self.max_size:
+                entry_path = os.path.join(os.path.dirname(spool.path), spool.digest)
+                os.replace(spool.path, entry_path)
+                self._evict(os.path.dirname(entry_path))
+                return
+        try:
+            os.unlink(spool.path)
+        except OSError:
+            pass
+
+    def _evict(self, cache_dir):
+        """
+        Delete least recently used entries to keep the cache within `max_size`.
+        """
+        entries = []
+        total = 0
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                # Skip spools of restores in progress.
+                if entry.name.startswith(b'.') or not entry.is_file(follow_symlinks=False):
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                total += st.st_size
+        entries.sort()
+        for unused, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                # Files being served remain readable until closed.
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+
+
+cherrypy.restore_cache = RestoreCache(cherrypy.engine)
+cherrypy.restore_cache.subscribe()
+
+cherrypy.config.namespaces['restore_cache'] = lambda key, value: setattr(cherrypy.restore_cache, key, value)
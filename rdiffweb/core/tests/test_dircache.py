@@ -0,0 +1,209 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import errno
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import cherrypy
+
+from rdiffweb.core.dircache import DirCache
+
+
+class DirCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='rdiffweb_tests_').encode()
+        self.cache = DirCache(cherrypy.engine)
+        self.cache.inotify = False
+        for name in [b'a', b'b']:
+            open(os.path.join(self.temp_dir, name), 'w').close()
+
+    def tearDown(self):
+        self.cache.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _touch(self, path):
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1000000))
+
+    def test_listdir(self):
+        self.assertEqual([b'a', b'b'], sorted(self.cache.listdir(self.temp_dir)))
+
+    def test_derive(self):
+        # Given a directory
+        # When deriving a value from the listing
+        value = self.cache.derive(self.temp_dir, 'count', len)
+        # Then value is computed
+        self.assertEqual(2, value)
+        # Then value is cached
+        self.assertEqual(2, self.cache.derive(self.temp_dir, 'count', lambda names: self.fail('should be cached')))
+
+    def test_derive_with_update(self):
+        # Given a derived value
+        self.cache.derive(self.temp_dir, 'count', len)
+        # When the directory get updated
+        open(os.path.join(self.temp_dir, b'c'), 'w').close()
+        self._touch(self.temp_dir)
+        # Then value is computed again
+        self.assertEqual(3, self.cache.derive(self.temp_dir, 'count', len))
+
+    def test_derive_not_found(self):
+        with self.assertRaises(FileNotFoundError):
+            self.cache.derive(os.path.join(self.temp_dir, b'invalid'), 'count', len)
+
+    def test_counters(self):
+        # Given an empty cache
+        # When listing a directory twice
+        self.cache.listdir(self.temp_dir)
+        self.cache.listdir(self.temp_dir)
+        # Then a miss and a hit are recorded
+        self.assertEqual(1, self.cache.misses)
+        self.assertEqual(1, self.cache.hits)
+        # When the directory get updated
+        open(os.path.join(self.temp_dir, b'c'), 'w').close()
+        self._touch(self.temp_dir)
+        self.cache.listdir(self.temp_dir)
+        # Then the listing is stale
+        self.assertEqual(1, self.cache.stale)
+
+    def test_size(self):
+        # Given an empty cache
+        self.assertEqual(0, self.cache.size)
+        # When listing a directory
+        self.cache.listdir(self.temp_dir)
+        size = self.cache.size
+        # Then memory usage is accounted
+        self.assertGreater(size, 0)
+        # When deriving value
+        self.cache.derive(self.temp_dir, 'names', lambda names: [n * 100 for n in names])
+        # Then memory usage includes derived value
+        self.assertGreater(self.cache.size, size)
+        # When removing the path
+        self.cache.remove_path(self.temp_dir)
+        # Then memory is released
+        self.assertEqual(0, self.cache.size)
+        self.assertEqual(0, len(self.cache))
+
+    def test_evict_max_entries(self):
+        # Given a cache with limited number of entries
+        self.cache.max_entries = 2
+        paths = [os.path.join(self.temp_dir, name) for name in [b'd1', b'd2', b'd3']]
+        for path in paths:
+            os.mkdir(path)
+        # When listing more directories than the limit
+        self.cache.listdir(paths[0])
+        self.cache.listdir(paths[1])
+        self.cache.listdir(paths[0])
+        self.cache.listdir(paths[2])
+        # Then the least recently used listing is evicted
+        self.assertEqual(2, len(self.cache))
+        self.assertEqual(1, self.cache.evictions)
+        self.cache.listdir(paths[0])
+        self.assertEqual(2, self.cache.hits)
+        self.cache.listdir(paths[1])
+        self.assertEqual(4, self.cache.misses)
+
+    def test_evict_max_size(self):
+        # Given a cache with limited memory
+        self.cache.listdir(self.temp_dir)
+        self.cache.max_size = self.cache.size
+        path = os.path.join(self.temp_dir, b'subdir')
+        os.mkdir(path)
+        # When listing another directory
+        self.cache.listdir(path)
+        # Then the previous listing is evicted
+        self.assertEqual(1, len(self.cache))
+        self.assertEqual(1, self.cache.evictions)
+        self.assertLessEqual(self.cache.size, self.cache.max_size)
+
+    def test_run(self):
+        # Given a cached directory
+        self.cache.listdir(self.temp_dir)
+        # When the directory get updated
+        open(os.path.join(self.temp_dir, b'c'), 'w').close()
+        self._touch(self.temp_dir)
+        # When running background refresh
+        self.cache.run()
+        # Then listing is refreshed
+        self.assertEqual(1, self.cache.refresh_cycles)
+        self.assertEqual(1, self.cache.refreshes)
+        self.assertEqual([b'a', b'b', b'c'], sorted(self.cache.listdir(self.temp_dir)))
+        self.assertEqual(1, self.cache.hits)
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'inotify is only available on Linux')
+class DirCacheInotifyTest(DirCacheTest):
+    def setUp(self):
+        super().setUp()
+        self.cache.inotify = True
+
+    def test_listdir_without_lstat(self):
+        # Given a watched directory
+        self.cache.listdir(self.temp_dir)
+        # When listing the directory again
+        with mock.patch('os.lstat', side_effect=AssertionError('should not be called')):
+            # Then listing is served from cache
+            self.assertEqual([b'a', b'b'], sorted(self.cache.listdir(self.temp_dir)))
+
+    def test_listdir_with_file_created(self):
+        # Given a watched directory
+        self.cache.listdir(self.temp_dir)
+        # When a file get created
+        open(os.path.join(self.temp_dir, b'c'), 'w').close()
+        # Then listing is updated
+        self.assertEqual([b'a', b'b', b'c'], sorted(self.cache.listdir(self.temp_dir)))
+
+    def test_listdir_with_file_deleted(self):
+        # Given a watched directory
+        self.cache.listdir(self.temp_dir)
+        # When a file get deleted
+        os.remove(os.path.join(self.temp_dir, b'a'))
+        # Then listing is updated
+        self.assertEqual([b'b'], sorted(self.cache.listdir(self.temp_dir)))
+
+    def test_listdir_with_file_renamed(self):
+        # Given a watched directory
+        self.cache.listdir(self.temp_dir)
+        # When a file get renamed
+        os.rename(os.path.join(self.temp_dir, b'a'), os.path.join(self.temp_dir, b'c'))
+        # Then listing is updated
+        self.assertEqual([b'b', b'c'], sorted(self.cache.listdir(self.temp_dir)))
+
+    def test_listdir_with_directory_deleted(self):
+        # Given a watched directory
+        path = os.path.join(self.temp_dir, b'subdir')
+        os.mkdir(path)
+        self.cache.listdir(path)
+        # When the directory get deleted
+        os.rmdir(path)
+        # Then an error is raised
+        with self.assertRaises(FileNotFoundError):
+            self.cache.listdir(path)
+
+    def test_listdir_with_watch_limit(self):
+        # Given the inotify watch limit is reached
+        with mock.patch(
+            'rdiffweb.core.inotify.Inotify.add_watch', side_effect=OSError(errno.ENOSPC, 'No space left on device')
+        ):
+            self.cache.listdir(self.temp_dir)
+        # When a file get created
+        open(os.path.join(self.temp_dir, b'c'), 'w').close()
+        self._touch(self.temp_dir)
+        # Then listing is updated using mtime
+        self.assertEqual([b'a', b'b', b'c'], sorted(self.cache.listdir(self.temp_dir)))
@@ -0,0 +1,40 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import cherrypy
+
+import rdiffweb.core.filename_index  # noqa
+import rdiffweb.test
+from rdiffweb.core.model import RepoObject, UserObject
+
+
+class FilenameIndexTest(rdiffweb.test.WebCase):
+    def test_check_schedule(self):
+        # Given the application is started
+        # Then filename_index job should be schedule
+        self.assertEqual(
+            1, len([job for job in cherrypy.scheduler.get_jobs() if job.name.endswith('filename_index_job')])
+        )
+
+    def test_filename_index_job(self):
+        # Given a repository
+        userobj = UserObject.get_user(self.USERNAME)
+        repo = RepoObject.get_repo('admin/testcases', userobj)
+        self.assertEqual([], repo.search('Untitled Testcase.doc'))
+        # When the job is running.
+        cherrypy.filename_index.filename_index_job()
+        # Then file names get indexed
+        self.assertEqual(4, len(repo.search('Untitled Testcase.doc')))
@@ -0,0 +1,401 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import cherrypy
+
+from rdiffweb.core.indexcache import (
+    FileChangesIndex,
+    FilenameIndex,
+    FileStatisticsIndex,
+    IndexCache,
+    MirrorMetadataIndex,
+)
+
+
+class IndexCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='rdiffweb_tests_')
+        self.cache = IndexCache(cherrypy.engine)
+        self.cache.cache_dir = os.path.join(self.temp_dir, 'cache')
+        self.source = os.path.join(self.temp_dir, 'file_statistics.2014-11-05T16:05:07-05:00.data').encode()
+        with open(self.source, 'wb') as f:
+            f.write(b'foo')
+        self.rows = [
+            (b'.', 1, 0, 0, None),
+            (b'Revisions/Data', 0, 9, 9, None),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_open_index(self):
+        # Given a source file
+        # When opening the index
+        with self.cache.open_index(FileStatisticsIndex, self.source, lambda: iter(self.rows)) as index:
+            # Then the index is built
+            self.assertEqual((0, 9, 9, None), index.get(b'Revisions/Data'))
+            self.assertIsNone(index.get(b'invalid'))
+        # Then index get stored in cache folder
+        self.assertTrue(os.path.isfile(self.cache.get_index_path(self.source, FileStatisticsIndex.SUFFIX)))
+
+    def test_open_index_reused(self):
+        # Given an existing index
+        with self.cache.open_index(FileStatisticsIndex, self.source, lambda: iter(self.rows)):
+            pass
+        # When opening the index again
+        with self.cache.open_index(FileStatisticsIndex, self.source, lambda: self.fail('should not rebuild')) as index:
+            # Then the existing index is used
+            self.assertEqual((1, 0, 0, None), index.get(b'.'))
+
+    def test_open_index_rebuild_when_source_changed(self):
+        # Given an existing index
+        with self.cache.open_index(FileStatisticsIndex, self.source, lambda: iter(self.rows)):
+            pass
+        # When the source file get updated
+        with open(self.source, 'ab') as f:
+            f.write(b'bar')
+        # Then index get rebuilt
+        with self.cache.open_index(FileStatisticsIndex, self.source, lambda: iter(self.rows[:1])) as index:
+            self.assertIsNone(index.get(b'Revisions/Data'))
+
+    def test_stop_without_cache_dir(self):
+        # Given a cache without cache_dir
+        self.cache.cache_dir = None
+        with self.cache.open_index(FileStatisticsIndex, self.source, lambda: iter(self.rows)):
+            pass
+        index_path = self.cache.get_index_path(self.source, FileStatisticsIndex.SUFFIX)
+        self.assertTrue(os.path.isfile(index_path))
+        # When stopping the cache
+        self.cache.stop()
+        # Then temporary folder get deleted
+        self.assertFalse(os.path.exists(index_path))
+
+    def test_open_index_fail_after_build(self):
+        # Given an index that cannot be opened once built
+        class BrokenIndex(FileStatisticsIndex):
+            @classmethod
+            def open(cls, index_path, source_stat):
+                return None
+
+        # When opening the index
+        # Then an error is raised instead of returning None
+        with self.assertRaises(OSError):
+            self.cache.open_index(BrokenIndex, self.source, lambda: iter(self.rows))
+
+    def test_open_index_concurrent(self):
+        # Given multiple threads opening the same index
+        count = []
+
+        def rows():
+            count.append(1)
+            time.sleep(0.1)
+            return iter(self.rows)
+
+        def open_index():
+            with self.cache.open_index(FileStatisticsIndex, self.source, rows) as index:
+                self.assertEqual((0, 9, 9, None), index.get(b'Revisions/Data'))
+
+        threads = [threading.Thread(target=open_index) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # Then the index is built once
+        self.assertEqual(1, len(count))
+        # Then build locks are released
+        self.assertEqual({}, self.cache._build_locks)
+
+    def test_cleanup(self):
+        # Given indexes for an existing and a deleted source file
+        deleted = os.path.join(self.temp_dir, 'file_statistics.2014-11-06T16:05:07-05:00.data').encode()
+        with open(deleted, 'wb') as f:
+            f.write(b'foo')
+        for source in [self.source, deleted]:
+            with self.cache.open_index(FileStatisticsIndex, source, lambda: iter(self.rows)):
+                pass
+            with self.cache.open_index(FileChangesIndex, source, lambda: iter([]), key=b'.1415221507'):
+                pass
+        os.remove(deleted)
+        # When cleaning the cache
+        self.cache.cleanup()
+        # Then only indexes of the deleted source file are removed
+        self.assertTrue(os.path.isfile(self.cache.get_index_path(self.source, FileStatisticsIndex.SUFFIX)))
+        self.assertTrue(
+            os.path.isfile(self.cache.get_index_path(self.source, b'.1415221507' + FileChangesIndex.SUFFIX))
+        )
+        self.assertFalse(os.path.exists(self.cache.get_index_path(deleted, FileStatisticsIndex.SUFFIX)))
+        self.assertFalse(os.path.exists(self.cache.get_index_path(deleted, b'.1415221507' + FileChangesIndex.SUFFIX)))
+
+    def test_cleanup_deleted_folder(self):
+        # Given an index of a source file in a folder that get deleted
+        source_dir = os.path.join(self.temp_dir, 'repo')
+        os.mkdir(source_dir)
+        source = os.path.join(source_dir, 'file_statistics.2014-11-05T16:05:07-05:00.data').encode()
+        with open(source, 'wb') as f:
+            f.write(b'foo')
+        with self.cache.open_index(FileStatisticsIndex, source, lambda: iter(self.rows)):
+            pass
+        index_path = self.cache.get_index_path(source, FileStatisticsIndex.SUFFIX)
+        shutil.rmtree(source_dir)
+        # When cleaning the cache
+        self.cache.cleanup()
+        # Then the folder of the indexes is removed
+        self.assertFalse(os.path.exists(os.path.dirname(index_path)))
+
+
+class FileStatisticsIndexQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='rdiffweb_tests_')
+        self.cache = IndexCache(cherrypy.engine)
+        self.cache.cache_dir = os.path.join(self.temp_dir, 'cache')
+        self.source = os.path.join(self.temp_dir, 'file_statistics.2014-11-05T16:05:07-05:00.data').encode()
+        with open(self.source, 'wb') as f:
+            f.write(b'foo')
+        self.rows = [
+            (b'.', 1, 0, 0, None),
+            (b'deleted.txt', 1, None, 12, 4),
+            (b'new_100%.txt', 1, 30, None, 0),
+            (b'unchanged.txt', 0, 20, 20, None),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _query(self, *args, **kwargs):
+        with self.cache.open_index(FileStatisticsIndex, self.source, lambda: iter(self.rows)) as index:
+            return index.query(*args, **kwargs)
+
+    def test_query(self):
+        # When querying the index without criteria
+        total, filtered, rows = self._query()
+        # Then all rows are returned sorted by path
+        self.assertEqual(4, total)
+        self.assertEqual(4, filtered)
+        self.assertEqual(
+            [
+                (b'.', 'changed', 0, None),
+                (b'deleted.txt', 'deleted', 12, 4),
+                (b'new_100%.txt', 'new', 30, 0),
+                (b'unchanged.txt', 'unchanged', 20, None),
+            ],
+            rows,
+        )
+
+    def test_query_page(self):
+        # When querying a page sorted by size
+        total, filtered, rows = self._query(start=1, length=2, order='size', reverse=True)
+        # Then only requested rows are returned
+        self.assertEqual((4, 4), (total, filtered))
+        self.assertEqual([b'unchanged.txt', b'deleted.txt'], [r[0] for r in rows])
+
+    def test_query_search(self):
+        # When searching with LIKE special characters
+        total, filtered, rows = self._query(search=b'0%')
+        # Then characters are matched literally
+        self.assertEqual((4, 1), (total, filtered))
+        self.assertEqual([b'new_100%.txt'], [r[0] for r in rows])
+        # Then search is case insensitive
+        self.assertEqual(3, self._query(search=b'TXT')[1])
+
+    def test_query_states(self):
+        # When filtering by states
+        total, filtered, rows = self._query(states=['new', 'deleted'], order='state')
+        # Then only matching rows are returned
+        self.assertEqual((4, 2), (total, filtered))
+        self.assertEqual([b'deleted.txt', b'new_100%.txt'], [r[0] for r in rows])
+
+    def test_query_invalid_order(self):
+        with self.assertRaises(ValueError):
+            self._query(order='path; DROP TABLE source')
+
+
+class FileChangesIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='rdiffweb_tests_')
+        self.cache = IndexCache(cherrypy.engine)
+        self.cache.cache_dir = os.path.join(self.temp_dir, 'cache')
+        self.source = os.path.join(self.temp_dir, 'file_statistics.2014-11-05T16:05:07-05:00.data').encode()
+        with open(self.source, 'wb') as f:
+            f.write(b'foo')
+        self.rows = [
+            (b'.', 1, 0, 0, None, 1),
+            (b'a.txt', 1, None, 12, 4, 1),
+            (b'b.txt', 1, 30, 20, 0, 1),
+            (b'a.txt', 1, 14, None, 0, 2),
+            (b'a.txt', 1, None, 14, 4, 3),
+            (b'c.txt', 0, 20, 20, None, 3),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _query(self, *args, **kwargs):
+        with self.cache.open_index(FileChangesIndex, self.source, lambda: iter(self.rows), key=b'.1') as index:
+            return index.query(*args, **kwargs)
+
+    def test_query(self):
+        # When querying the index
+        rows = self._query()
+        # Then deleted and changed files are returned with the most recent date
+        self.assertEqual(
+            [
+                (b'.', 'changed', 0, 1),
+                (b'a.txt', 'deleted', 14, 3),
+                (b'b.txt', 'changed', 30, 1),
+            ],
+            rows,
+        )
+
+    def test_query_states(self):
+        self.assertEqual([b'a.txt'], [r[0] for r in self._query(states=['deleted'])])
+
+    def test_query_cursor(self):
+        # When querying after a cursor
+        rows = self._query(cursor=(b'a.txt', 'deleted'), limit=1)
+        # Then following rows are returned
+        self.assertEqual([(b'b.txt', 'changed', 30, 1)], rows)
+
+    def test_open_index_with_key(self):
+        # Given an index for a date range
+        self._query()
+        # When opening an index for another range of the same source
+        with self.cache.open_index(FileChangesIndex, self.source, lambda: iter(self.rows[3:]), key=b'.2') as index:
+            # Then a distinct index is built
+            self.assertEqual([(b'a.txt', 'deleted', 14, 3)], index.query())
+
+
+class MirrorMetadataIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='rdiffweb_tests_')
+        self.cache = IndexCache(cherrypy.engine)
+        self.cache.cache_dir = os.path.join(self.temp_dir, 'cache')
+        self.source = os.path.join(self.temp_dir, 'mirror_metadata.2014-11-05T16:05:07-05:00.snapshot').encode()
+        with open(self.source, 'wb') as f:
+            f.write(b'foo')
+        self.rows = [
+            (b'.', 'dir', None, 1, None, None),
+            (b'a', 'dir', None, 2, None, None),
+            (b'a/d.txt', 'reg', 5, 5, bytes.fromhex('4aab1959407e5394d912c93c1fab5d4edf24c14c'), None),
+            (b'a/e', 'dir', None, 6, None, None),
+            (b'a/f', 'sym', None, 7, None, b'../a b.txt'),
+            (b'a b.txt', 'reg', 3, 3, None, None),
+            (b'c.txt', 'unknown', 4, 4, None, None),
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _open_index(self):
+        return self.cache.open_index(MirrorMetadataIndex, self.source, lambda: iter(self.rows))
+
+    def test_get(self):
+        with self._open_index() as index:
+            self.assertEqual(('dir', None, 1, None, None), index.get(b'', b'.'))
+            self.assertEqual(
+                ('reg', 5, 5, bytes.fromhex('4aab1959407e5394d912c93c1fab5d4edf24c14c'), None),
+                index.get(b'a', b'd.txt'),
+            )
+            self.assertEqual(('sym', None, 7, None, b'../a b.txt'), index.get(b'a', b'f'))
+            self.assertEqual((None, 4, 4, None, None), index.get(b'.', b'c.txt'))
+            self.assertIsNone(index.get(b'.', b'd.txt'))
+            self.assertIsNone(index.get(b'invalid', b'd.txt'))
+
+    def test_listdir(self):
+        with self._open_index() as index:
+            # When listing a directory
+            # Then only direct children are returned sorted by name
+            self.assertEqual([b'a', b'a b.txt', b'c.txt'], [r[0] for r in index.listdir(b'.')])
+            self.assertEqual([b'd.txt', b'e', b'f'], [r[0] for r in index.listdir(b'a')])
+            self.assertEqual([], index.listdir(b'a/e'))
+            self.assertEqual([], index.listdir(b'invalid'))
+            # When listing after a cursor
+            self.assertEqual([b'a b.txt'], [r[0] for r in index.listdir(b'.', cursor=b'a', limit=1)])
+            self.assertEqual([b'a b.txt', b'a'], [r[0] for r in index.listdir(b'.', cursor=b'c.txt', reverse=True)])
+
+    def test_open_index_reused(self):
+        # Given an existing index
+        with self._open_index():
+            pass
+        # When opening the index again
+        with self.cache.open_index(MirrorMetadataIndex, self.source, lambda: self.fail('should not rebuild')) as index:
+            # Then the existing index is used
+            self.assertEqual([b'a', b'a b.txt', b'c.txt'], [r[0] for r in index.listdir(b'.')])
+
+    def test_open_index_invalid(self):
+        # Given a corrupted index
+        index_path = self.cache.get_index_path(self.source, MirrorMetadataIndex.SUFFIX)
+        os.makedirs(os.path.dirname(index_path))
+        with open(index_path, 'wb') as f:
+            f.write(b'invalid')
+        # When opening the index
+        # Then the index is rebuilt
+        with self._open_index() as index:
+            self.assertEqual(('dir', None, 2, None, None), index.get(b'.', b'a'))
+
+
+class FilenameIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='rdiffweb_tests_')
+        self.index = FilenameIndex.open(os.path.join(self.temp_dir, 'cache', 'filenames.db').encode())
+        self.index.add(b'Documents', 'Documents')
+        self.index.add(b'Documents/Report_Final.xlsx', 'Report_Final.xlsx', last=20)
+        self.index.add(b'Documents/report.txt', 'report.txt', first=30)
+        self.index.set_dates(10, 40)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_search(self):
+        # When searching a file name
+        # Then matching paths are returned with the dates they exist
+        self.assertEqual([(b'Documents/Report_Final.xlsx', [(10, 20)])], self.index.search('final.x'))
+        self.assertEqual(
+            [(b'Documents/Report_Final.xlsx', [(10, 20)]), (b'Documents/report.txt', [(30, 40)])],
+            self.index.search('REPORT'),
+        )
+        # Then only names are matched
+        self.assertEqual([], self.index.search('Documents/report'))
+        # Then short queries are supported
+        self.assertEqual([b'Documents/report.txt'], [r[0] for r in self.index.search('.t')])
+        self.assertEqual(1, len(self.index.search('report', limit=1)))
+
+    def test_set_first_and_last(self):
+        # Given a file deleted then created again
+        self.index.set_last(b'Documents/report.txt', 35)
+        self.index.add(b'Documents/report.txt', 'report.txt', first=38)
+        # Given a folder created at a later date
+        self.index.set_first(b'Documents', 20)
+        self.index.set_dates(10, 40)
+        # Then all ranges are returned
+        self.assertEqual([(b'Documents/report.txt', [(30, 35), (38, 40)])], self.index.search('report.txt'))
+        self.assertEqual([(b'Documents', [(20, 40)])], self.index.search('documents'))
+        self.assertFalse(self.index.exists_first(b'Documents'))
+        self.assertTrue(self.index.exists_first(b'Documents/Report_Final.xlsx'))
+
+    def test_reset(self):
+        # When resetting the index
+        self.index.reset()
+        # Then the index is empty
+        self.assertIsNone(self.index.newest)
+        self.assertEqual([], self.index.search('report'))
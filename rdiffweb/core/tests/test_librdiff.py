@@ -15,6 +15,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import datetime
+import gzip
 import importlib.resources
 import os
 import shutil
@@ -33,11 +34,17 @@ from rdiffweb.core.librdiff import (
     DoesNotExistError,
     FileStatisticsEntry,
     IncrementEntry,
+    MetadataCatalog,
     RdiffDirEntry,
     RdiffRepo,
     RdiffTime,
     SessionStatisticsEntry,
+    _diff_metadata,
+    _patch_metadata,
+    open_metadata,
     rdiff_backup_version,
+    read_lines_from,
+    tail_lines,
     unquote,
 )
 
@@ -179,6 +186,46 @@ class FileStatisticsEntryTest(unittest.TestCase):
         size = entry.get_source_size(bytes('<F!chïer> (@vec) {càraçt#èrë} $épêcial', encoding='utf-8'))
         self.assertEqual(286, size)
 
+    def test_query(self):
+        # Given a file statistics
+        entry = FileStatisticsEntry(self.repo, b'file_statistics.2014-11-05T16:05:07-05:00.data.gz')
+        # When querying the largest files matching a search
+        total, filtered, lines = entry.query(length=2, order='size', reverse=True, search='data')
+        # Then a single page is returned
+        self.assertEqual(19, total)
+        self.assertEqual(4, filtered)
+        self.assertEqual(
+            [
+                ('test\\\\test/some data', 'unchanged', 226, None),
+                ('Char ;090 to quote/Data', 'unchanged', 21, None),
+            ],
+            lines,
+        )
+        # When filtering by state
+        total, filtered, lines = entry.query(states=['changed'])
+        self.assertEqual([('Revisions', 'changed', 0, None), ('Revisions/Data', 'changed', 9, 72)], lines)
+
+    def test_summary(self):
+        # Given a file statistics
+        entry = FileStatisticsEntry(self.repo, b'file_statistics.2014-11-05T16:05:07-05:00.data.gz')
+        # When summarizing the largest files
+        summary = entry.summary(count=2, depth=1)
+        # Then only the largest files and folders are returned
+        self.assertEqual(
+            {
+                'size': [
+                    (b'\xec\x9d\xb4\xeb\xa3\xa8\xeb\xa7\x88 YIRUMA - River Flows in You.mp3', 3636731),
+                    (
+                        b'R\xc3\xa9pertoire (@vec) {c\xc3\xa0ra\xc3\xa7t#\xc3\xa8r\xc3\xab} $\xc3\xa9p\xc3\xaacial/Untitled Testcase.doc',
+                        14848,
+                    ),
+                ],
+                'increment_size': [(b'Revisions/Data', 72)],
+                'folder_increment_size': [(b'Revisions', 72)],
+            },
+            summary,
+        )
+
 
 class LogEntryTest(unittest.TestCase):
     def setUp(self):
@@ -204,6 +251,168 @@ class LogEntryTest(unittest.TestCase):
         self.assertIsNotNone(entry)
         self.assertEqual(entry.tail(), expected_content)
 
+    def test_errors(self):
+        # Given an error log
+        entry = self.repo.error_log[RdiffTime('2015-11-20T07:27:46-05:00')]
+        # When parsing errors
+        errors = list(entry.errors())
+        # Then each error is returned with its class, path and message
+        self.assertEqual([('SpecialFileError', b'home/coucou', 'Socket error: AF_UNIX path too long')], errors)
+
+    def test_errors_read_invalid_gzip(self):
+        entry = self.repo.error_log[RdiffTime('2019-05-22T09:19:09-04:00')]
+        with self.assertRaises(OSError):
+            entry.read()
+
+
+class TailLinesTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='rdiffweb_tests_')
+        self.path = os.path.join(self.temp_dir, 'backup.log').encode()
+        self.lines = [b'line %d with some content\n' % i for i in range(10000)]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, data, mode='wb'):
+        with open(self.path, mode) as f:
+            f.write(data)
+
+    @parameterized.expand([(1,), (2,), (2000,), (9999,), (10000,), (20000,)])
+    def test_tail_lines(self, num):
+        # Given a file larger than a block
+        self._write(b''.join(self.lines))
+        # When reading last lines
+        # Then last lines are returned
+        self.assertEqual(b''.join(self.lines[-num:]), tail_lines(self.path, num))
+
+    def test_tail_lines_without_trailing_newline(self):
+        self._write(b'foo\nbar\nbaz')
+        self.assertEqual(b'bar\nbaz', tail_lines(self.path, 2))
+
+    def test_tail_lines_empty(self):
+        self._write(b'')
+        self.assertEqual(b'', tail_lines(self.path, 10))
+
+    def test_tail_lines_with_end(self):
+        # Given a file being written
+        self._write(b'foo\nbar\n')
+        end = os.path.getsize(self.path)
+        self._write(b'baz\n', 'ab')
+        # When reading last lines up to a given position
+        # Then content written after is ignored
+        self.assertEqual(b'foo\nbar\n', tail_lines(self.path, 10, end))
+
+    def test_read_lines_from(self):
+        # Given a file with incomplete last line
+        self._write(b'foo\nbar\nba')
+        # When reading from an offset
+        offset, data = read_lines_from(self.path, 4)
+        # Then only complete lines are returned
+        self.assertEqual((4, b'bar\n'), (offset, data))
+        # When the line is completed
+        self._write(b'z\n', 'ab')
+        # Then the line is returned
+        self.assertEqual((8, b'baz\n'), read_lines_from(self.path, 8))
+
+    def test_read_lines_from_truncated(self):
+        # Given a file truncated by log rotation
+        self._write(b'foo\n')
+        # When reading from an offset after the end of file
+        # Then file is read from the beginning
+        self.assertEqual((0, b'foo\n'), read_lines_from(self.path, 100))
+
+    def test_read_lines_from_long_line(self):
+        # Given a line longer than the read size
+        self._write(b'a' * 100)
+        # When reading
+        # Then the line is returned by chunk
+        self.assertEqual((0, b'a' * 10), read_lines_from(self.path, 0, size=10))
+
+
+class OpenMetadataTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='rdiffweb_tests_')
+        self.data = b''.join(b'home/file%d.txt 1 %d %d NA\n' % (i, i, i) for i in range(10000))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _write(self, name, data):
+        path = os.path.join(self.temp_dir, name).encode()
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_open_metadata(self):
+        path = self._write('file_statistics.data', self.data)
+        with open_metadata(path) as f:
+            self.assertEqual(self.data, f.read())
+
+    def test_open_metadata_gzip(self):
+        path = self._write('file_statistics.data.gz', gzip.compress(self.data))
+        with open_metadata(path, buffer_size=1024) as f:
+            self.assertEqual(self.data.splitlines(keepends=True), list(f))
+
+    def test_open_metadata_gzip_multiple_members(self):
+        path = self._write('file_statistics.data.gz', gzip.compress(b'foo\n') + gzip.compress(b'bar\n'))
+        with open_metadata(path) as f:
+            self.assertEqual(b'foo\nbar\n', f.read())
+
+    def test_open_metadata_tail_gzip(self):
+        # Given a compressed log file
+        self._write('error_log.2015-11-20T07:27:46-05:00.data.gz', gzip.compress(self.data))
+        repo = MockRdiffRepo()
+        repo._data_path = self.temp_dir.encode()
+        entry = repo.error_log[RdiffTime('2015-11-20T07:27:46-05:00')]
+        # When reading last lines
+        data = entry.tail(num=2)
+        # Then only last lines are returned
+        self.assertEqual(b''.join(self.data.splitlines(keepends=True)[-2:]).decode(), data)
+
+    def test_open_metadata_gzip_truncated(self):
+        # Given a gzip file being written by rdiff-backup
+        data = gzip.compress(self.data)
+        path = self._write('file_statistics.data.gz', data[: len(data) // 2])
+        # When reading the file
+        with open_metadata(path) as f:
+            content = f.read()
+        # Then partial content is returned.
+        self.assertTrue(self.data.startswith(content))
+
+
+class PatchMetadataTest(unittest.TestCase):
+    def test_patch_metadata(self):
+        # Given records of a newer state
+        base = [(b'.', 'dir'), (b'a', 'dir'), (b'a/b', 'reg'), (b'a b', 'reg'), (b'c', 'reg')]
+        # Given a diff adding, replacing and removing entries
+        diff = [(b'a', 'dir'), (b'a/a', 'reg'), (b'a/b', 'None'), (b'a b', 'sym'), (b'd', 'reg')]
+        # When applying the diff
+        records = list(_patch_metadata(base, diff))
+        # Then records are merged in path order
+        self.assertEqual(
+            [(b'.', 'dir'), (b'a', 'dir'), (b'a/a', 'reg'), (b'a b', 'sym'), (b'c', 'reg'), (b'd', 'reg')],
+            records,
+        )
+
+
+class DiffMetadataTest(unittest.TestCase):
+    def test_diff_metadata(self):
+        # Given records of two backup dates
+        old = [(b'.', 'dir', None, 1), (b'a', 'dir', None, 1), (b'a/b', 'reg', 3, 1), (b'c', 'reg', 4, 1)]
+        new = [(b'.', 'dir', None, 2), (b'a', 'dir', None, 2), (b'a b', 'reg', 3, 2), (b'c', 'reg', 5, 2)]
+        # When comparing records
+        changes = list(_diff_metadata(old, new))
+        # Then added, removed and modified files are returned
+        self.assertEqual(
+            [
+                (b'a/b', 'removed', 'reg', 3, None),
+                (b'a b', 'added', 'reg', None, 3),
+                (b'c', 'modified', 'reg', 4, 5),
+            ],
+            changes,
+        )
+
 
 class RdiffRepoTest(unittest.TestCase):
     def setUp(self):
@@ -461,6 +670,175 @@ class RdiffRepoTest(unittest.TestCase):
             return
         self.assertEqual(listdir, sorted([d.display_name for d in self.repo.listdir(path)]))
 
+    def test_listdir_as_of(self):
+        # Given a folder deleted from the repository
+        date = RdiffTime('2014-11-01T15:50:26-04:00')
+        # When listing the folder as of a backup date
+        entries = self.repo.listdir(b"R\xc3\xa9pertoire Supprim\xc3\xa9", as_of=date)
+        # Then entries at this date are returned
+        self.assertEqual(
+            ['Untitled Empty Text File', 'Untitled Empty Text File 2', 'Untitled Empty Text File 3'],
+            [e.display_name for e in entries],
+        )
+        self.assertEqual([False, False, False], [e.exists for e in entries])
+        # When listing a folder created later
+        # Then an error is raised
+        with self.assertRaises(DoesNotExistError):
+            self.repo.listdir(b"Subdirectory", as_of=date)
+
+    def test_listdir_as_of_quoted(self):
+        # Given folders with quoted characters
+        date = RdiffTime('2016-02-02T16:30:40-05:00')
+        # When listing the root folder as of a backup date
+        entries = {e.path: e for e in self.repo.listdir(b"", as_of=date)}
+        # Then entries path are quoted as in the mirror
+        self.assertTrue(entries[b'Char ;059090 to quote'].exists)
+        # When listing the quoted folder
+        entries = self.repo.listdir(b"Char ;059090 to quote", as_of=date)
+        # Then entries are found in the mirror
+        self.assertEqual(
+            [(b'Char ;059090 to quote/Data', True), (b'Char ;059090 to quote/Untitled Testcase.doc', True)],
+            [(e.path, e.exists) for e in entries],
+        )
+        # When listing a deleted folder with quoted characters
+        entries = self.repo.listdir(b"Char ;090 to quote", as_of=RdiffTime('2014-11-03T19:04:57-05:00'))
+        # Then entries path are quoted
+        self.assertEqual(
+            [b'Char ;090 to quote/Data', b'Char ;090 to quote/Untitled Testcase.doc'], [e.path for e in entries]
+        )
+        self.assertEqual(['Data', 'Untitled Testcase.doc'], [e.display_name for e in entries])
+
+    def test_get_file_size_not_found(self):
+        # Given an entry missing from file_statistics
+        entry = RdiffDirEntry(self.repo, b'invalid', exists=False, increments=[])
+        # When getting the file size at a date
+        # Then -1 is returned without warning
+        with self.assertNoLogs('rdiffweb.core.librdiff', level='WARNING'):
+            self.assertEqual(-1, entry.get_file_size(RdiffTime('2014-11-05T16:05:07-05:00')))
+
+    def test_listdir_as_of_symlink(self):
+        # Given symlinks in the last backup
+        date = RdiffTime('2016-02-02T16:30:40-05:00')
+        # When listing the root folder as of the last backup date
+        entries = {e.path: e for e in self.repo.listdir(b"", as_of=date)}
+        # Then symlinks are the same as the current listing
+        current = {e.path: e for e in self.repo.listdir(b"")}
+        for name in [b'SymlinkToSubdirectory', b'BrokenSymlink']:
+            self.assertEqual(
+                (current[name].isdir, current[name].file_size), (entries[name].isdir, entries[name].file_size)
+            )
+        self.assertTrue(entries[b'SymlinkToSubdirectory'].isdir)
+        self.assertEqual(-1, entries[b'SymlinkToSubdirectory'].file_size)
+        self.assertFalse(entries[b'BrokenSymlink'].isdir)
+        self.assertEqual(7, entries[b'BrokenSymlink'].file_size)
+
+    def test_quote(self):
+        # Given a repository quoting "Z"
+        # When quoting a path
+        # Then quoted characters and the quoting char are quoted
+        self.assertEqual(b'Char ;090 to quote', self.repo.quote(b'Char Z to quote'))
+        self.assertEqual(b'Char ;059090 to quote', self.repo.quote(b'Char ;090 to quote'))
+        self.assertEqual(b'Revisions/Data', self.repo.quote(b'Revisions/Data'))
+
+    def test_diff(self):
+        # Given two backup dates
+        start = RdiffTime('2014-11-01T15:49:47-04:00')
+        end = RdiffTime('2014-11-01T15:50:26-04:00')
+        # When comparing the backups
+        changes = list(self.repo.diff(start, end))
+        # Then modified files are returned
+        self.assertEqual([(b'Fichier @ <root>', 'modified', 'reg', 0, 13)], changes)
+        # Then order of dates doesn't matter
+        self.assertEqual(changes, list(self.repo.diff(end, start)))
+
+    def test_diff_with_cursor(self):
+        # Given a list of changes
+        start = RdiffTime('2014-11-01T15:49:47-04:00')
+        end = RdiffTime('2016-02-02T16:30:40-05:00')
+        changes = [c.path for c in self.repo.diff(start, end)]
+        # When resuming after a cursor
+        # Then following changes are returned
+        self.assertEqual(changes[4:], [c.path for c in self.repo.diff(start, end, cursor=changes[3])])
+
+    def test_file_changes(self):
+        # Given a range of backup dates
+        start = RdiffTime('2014-11-01T15:49:47-04:00')
+        end = RdiffTime('2014-11-05T16:05:07-05:00')
+        # When searching for deleted files
+        changes = self.repo.file_changes(start, end, states=['deleted'])
+        # Then deleted files are returned with the last date they exist
+        self.assertEqual(
+            [
+                b'Char Z to quote',
+                b'Char Z to quote/Data',
+                b'Char Z to quote/Untitled Testcase.doc',
+                b'R\xc3\xa9pertoire Existant/Fichier supprim\xc3\xa9',
+                b'R\xc3\xa9pertoire Supprim\xc3\xa9',
+                b'R\xc3\xa9pertoire Supprim\xc3\xa9/Untitled Empty Text File',
+                b'R\xc3\xa9pertoire Supprim\xc3\xa9/Untitled Empty Text File 2',
+                b'R\xc3\xa9pertoire Supprim\xc3\xa9/Untitled Empty Text File 3',
+            ],
+            [c.path for c in changes],
+        )
+        self.assertEqual(
+            (
+                b'R\xc3\xa9pertoire Existant/Fichier supprim\xc3\xa9',
+                'deleted',
+                19,
+                RdiffTime('2014-11-01T15:51:29-04:00'),
+                RdiffTime('2014-11-01T15:51:15-04:00'),
+            ),
+            changes[3],
+        )
+        # Then changed files are also returned on demand
+        changes = self.repo.file_changes(start, end, cursor=(b'DIR\xef\xbf\xbd/Data', 'changed'), limit=1)
+        self.assertEqual(
+            [(b'Fichier @ <root>', 'changed', 13, RdiffTime('2014-11-05T16:01:02-05:00'))],
+            [c[:4] for c in changes],
+        )
+
+    def test_update_filename_index(self):
+        # When indexing file names
+        self.repo.update_filename_index()
+        # Then files are found with the dates they exist
+        self.assertEqual(
+            [
+                (
+                    b'R\xc3\xa9pertoire Supprim\xc3\xa9/Untitled Empty Text File 3',
+                    [(RdiffTime('2014-11-01T15:49:47-04:00'), RdiffTime('2014-11-01T15:51:15-04:00'))],
+                )
+            ],
+            self.repo.search('empty text file 3'),
+        )
+        # Then each backup date matches the content of mirror_metadata
+        with self.repo._filename_index() as index:
+            ranges = index._conn.execute('SELECT path, first, last FROM ranges JOIN paths ON id = path_id').fetchall()
+            oldest, newest = index.oldest, index.newest
+        for entry in self.repo.mirror_metadata:
+            epoch = entry.date.epoch
+            expected = {r[0] for r in self.repo._mirror_metadata_records(entry.date) if r[0] != b'.'}
+            paths = {
+                path
+                for path, first, last in ranges
+                if (oldest if first is None else first) <= epoch <= (newest if last is None else last)
+            }
+            self.assertEqual(expected, paths, str(entry.date))
+
+    def test_update_filename_index_resumed(self):
+        # Given an index of the last backup only
+        self.repo.update_filename_index()
+        with self.repo._filename_index() as index:
+            index.reset()
+            for record in self.repo.mirror_metadata[-1].records():
+                if record[0] != b'.':
+                    index.add(record[0], self.repo._decode(record[0].rsplit(b'/', 1)[-1]))
+            index.set_dates(self.repo.last_backup_date.epoch, self.repo.last_backup_date.epoch)
+        self.assertEqual([], self.repo.search('Empty Text File 3'))
+        # When updating the index
+        self.repo.update_filename_index()
+        # Then older backups get indexed
+        self.assertEqual(1, len(self.repo.search('Empty Text File 3')))
+
     def test_listdir_outside_repo(self):
         with self.assertRaises(AccessDeniedError):
             self.repo.listdir(b"../")
@@ -495,6 +873,61 @@ class RdiffRepoTest(unittest.TestCase):
             list(dir_entry.change_dates),
         )
 
+    @parameterized.expand([(b"",), (b"Subdirectory",), (b"R\xc3\xa9pertoire Supprim\xc3\xa9",)])
+    def test_iter_listdir(self, path):
+        # Given a directory
+        expected = [(e.path, e.exists, e.isdir) for e in self.repo.listdir(path)]
+        # When iterating over entries
+        # Then same entries are returned
+        self.assertEqual(expected, [(e.path, e.exists, e.isdir) for e in self.repo.iter_listdir(path)])
+        # Then entries are returned in reverse order
+        self.assertEqual(
+            expected[::-1], [(e.path, e.exists, e.isdir) for e in self.repo.iter_listdir(path, sort='-name')]
+        )
+
+    @parameterized.expand([('name',), ('-name',)])
+    def test_iter_listdir_with_cursor(self, sort):
+        # Given a directory with multiple entries
+        expected = [e.path for e in self.repo.iter_listdir(b"", sort=sort)]
+        # When iterating by page using a cursor
+        pages = []
+        cursor = None
+        while True:
+            page = [e.path for e in self.repo.iter_listdir(b"", cursor=cursor, limit=3, sort=sort)]
+            if not page:
+                break
+            pages.append(page)
+            cursor = page[-1]
+        # Then all entries are returned once
+        self.assertEqual(expected, [path for page in pages for path in page])
+        self.assertTrue(all(len(page) <= 3 for page in pages))
+
+    def test_iter_listdir_invalid(self):
+        with self.assertRaises(DoesNotExistError):
+            self.repo.iter_listdir(b'invalid')
+        with self.assertRaises(DoesNotExistError):
+            self.repo.iter_listdir(b'rdiff-backup-data')
+        with self.assertRaises(AccessDeniedError):
+            self.repo.iter_listdir(b'../')
+        with self.assertRaises(ValueError):
+            self.repo.iter_listdir(b'', sort='size')
+
+    def test_listdir_stat(self):
+        # Given a directory with files and folders
+        # When listing entries
+        children = {e.path: e for e in self.repo.listdir(b"")}
+        # Then stat information comes from the listing
+        entry = children[b'Revisions']
+        self.assertTrue(entry.isdir)
+        self.assertEqual(-1, entry.file_size)
+        st = os.lstat(os.path.join(self.testcases_dir, b'Revisions'))
+        self.assertEqual(RdiffTime(int(st.st_mtime)), entry.mtime)
+        self.assertIsInstance(entry._increments, tuple)
+        # Then deleted entries doesn't have modification time
+        deleted = [e for e in children.values() if not e.exists]
+        self.assertTrue(deleted)
+        self.assertIsNone(deleted[0].mtime)
+
     def test_with_rdiff_backup_data(self):
         with self.assertRaises(DoesNotExistError):
             self.repo.fstat(b'rdiff-backup-data')
@@ -565,6 +998,29 @@ class RdiffRepoTest(unittest.TestCase):
         data = stream.read()
         self.assertTrue(data.startswith(expected_startswith))
 
+    def test_restore_from_mirror(self):
+        # Given a file not changed since the requested date
+        # When restoring the file
+        filename, stream = self.repo.restore(b'Revisions/Data', restore_as_of=1454448640, kind='raw')
+        # Then the file is read directly from the mirror
+        with stream:
+            self.assertTrue(stream.seekable())
+            self.assertEqual(b'Version3\n', stream.read())
+
+    def test_is_mirror_current(self):
+        # Given a file modified multiple time
+        entry = self.repo.fstat(b'Revisions/Data')
+        last_increment = entry._increments[-1].date
+        next_backup_date = next(d for d in self.repo.backup_dates if d > last_increment)
+        # Then mirror is used for dates after the last change
+        self.assertTrue(self.repo._is_mirror_current(entry, 1454448640))
+        self.assertTrue(self.repo._is_mirror_current(entry, next_backup_date.epoch))
+        self.assertFalse(self.repo._is_mirror_current(entry, last_increment.epoch))
+        # Then mirror is not used for folder unless it's the last backup
+        folder = self.repo.fstat(b'Revisions')
+        self.assertTrue(self.repo._is_mirror_current(folder, 1454448640))
+        self.assertFalse(self.repo._is_mirror_current(folder, next_backup_date.epoch))
+
     def test_unquote(self):
         self.assertEqual(b'Char ;090 to quote', unquote(b'Char ;059090 to quote'))
 
@@ -685,6 +1141,36 @@ Starting restore of /home/ikus060/Downloads/testcases to /tmp/tmpBRxRxe/root as
         else:
             self.assertEqual(expected_value, str(self.repo.session_statistics[value].date))
 
+    def test_session_statistics_series(self):
+        series = self.repo.session_statistics_series
+        self.assertEqual(len(self.repo.session_statistics), len(series))
+        self.assertEqual(self.repo.session_statistics.keys()[:], series.dates)
+        for attr in SessionStatisticsEntry.ATTRS:
+            self.assertEqual(getattr(self.repo.session_statistics[-1], attr), series[attr][-1], attr)
+        # Range include both start and stop dates.
+        r = series.range(RdiffTime('2014-11-02T17:23:41-05:00'), RdiffTime('2014-11-03T19:04:57-05:00'))
+        self.assertEqual(
+            [str(d) for d in series.dates[r]],
+            ['2014-11-02T17:23:41-05:00', '2014-11-03T15:46:47-05:00', '2014-11-03T19:04:57-05:00'],
+        )
+
+    def test_session_statistics_series_updated(self):
+        # Given a series
+        series = self.repo.session_statistics_series
+        self.assertIs(series, RdiffRepo(self.testcases_dir, encoding='utf-8').session_statistics_series)
+        # When a new backup get created
+        data_path = os.path.join(self.testcases_dir, b'rdiff-backup-data')
+        shutil.copy(
+            os.path.join(data_path, b'session_statistics.2016-02-02T16:30:40-05:00.data'),
+            os.path.join(data_path, b'session_statistics.2016-02-03T16:30:40-05:00.data'),
+        )
+        os.utime(data_path, ns=(0, os.stat(data_path).st_mtime_ns + 1000000))
+        # Then the series is updated
+        new_series = RdiffRepo(self.testcases_dir, encoding='utf-8').session_statistics_series
+        self.assertEqual(len(series) + 1, len(new_series))
+        self.assertEqual('2016-02-03T16:30:40-05:00', str(new_series.dates[-1]))
+        self.assertEqual(series['sourcefilesize'][-1], new_series['sourcefilesize'][-1])
+
     @parameterized.expand(
         [
             ("with_file", b'Revisions/Data'),
@@ -729,6 +1215,43 @@ class SessionStatisticsEntryTest(unittest.TestCase):
         self.assertEqual(0, entry.errors)
 
 
+class MetadataCatalogTest(unittest.TestCase):
+    def test_build(self):
+        # Given rdiff-backup-data entries
+        entries = [
+            b'session_statistics.2014-11-02T09:16:43-05:00.data',
+            b'file_statistics.2014-11-02T09:16:43-05:00.data.gz',
+            b'session_statistics.2014-11-02T09;05816;05843-04;05800.data',
+            b'session_statistics.invalid.data',
+            b'session_statistics.2014-11-02T09:16:43-05:00.unknown',
+            b'increments',
+        ]
+        # When classifying the entries
+        catalog = MetadataCatalog.build(
+            entries,
+            {
+                SessionStatisticsEntry.PREFIX: SessionStatisticsEntry,
+                FileStatisticsEntry.PREFIX: FileStatisticsEntry,
+            },
+        )
+        # Then entries are sorted by date and invalid entries are ignored
+        session_statistics = catalog[SessionStatisticsEntry.PREFIX]
+        self.assertEqual(
+            [
+                b'session_statistics.2014-11-02T09;05816;05843-04;05800.data',
+                b'session_statistics.2014-11-02T09:16:43-05:00.data',
+            ],
+            session_statistics.names,
+        )
+        self.assertEqual([1414934203, 1414937803], list(session_statistics.epochs))
+        self.assertEqual([RdiffTime(1414934203), RdiffTime(1414937803)], session_statistics.dates)
+        self.assertEqual(
+            [b'file_statistics.2014-11-02T09:16:43-05:00.data.gz'], catalog[FileStatisticsEntry.PREFIX].names
+        )
+        # Then dates are shared between metadata types
+        self.assertIs(session_statistics.dates[1], catalog[FileStatisticsEntry.PREFIX].dates[0])
+
+
 class RdiffTimeTest(unittest.TestCase):
     def test_add(self):
         """Check if addition with timedelta is working as expected."""
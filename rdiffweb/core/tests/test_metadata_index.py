@@ -0,0 +1,91 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+
+import cherrypy
+
+import rdiffweb.core.metadata_index  # noqa
+import rdiffweb.test
+from rdiffweb.core.indexcache import MirrorMetadataIndex
+from rdiffweb.core.model import ErrorLog, FileStatisticsSummary, RepoObject, UserObject
+
+
+class MetadataIndexTest(rdiffweb.test.WebCase):
+    def test_check_schedule(self):
+        # Given the application is started
+        # Then metadata_index job should be schedule
+        self.assertEqual(
+            1, len([job for job in cherrypy.scheduler.get_jobs() if job.name.endswith('metadata_index_job')])
+        )
+
+    def test_metadata_index_job(self):
+        # Given a repository
+        userobj = UserObject.get_user(self.USERNAME)
+        repo = RepoObject.get_repo('admin/testcases', userobj)
+        source = repo.mirror_metadata[repo.last_backup_date].path
+        index_path = cherrypy.indexcache.get_index_path(source, MirrorMetadataIndex.SUFFIX)
+        # When the job is running.
+        cherrypy.metadata_index.metadata_index_job()
+        # Then the index of the last backup get created
+        self.assertTrue(os.path.isfile(index_path))
+
+    def test_file_statistics_summary(self):
+        # Given a repository
+        userobj = UserObject.get_user(self.USERNAME)
+        repo = RepoObject.get_repo('admin/testcases', userobj)
+        # Given a summary of a backup that doesn't exists anymore
+        FileStatisticsSummary(repoid=repo.id, backup_date=1, kind='size', rank=0, path=b'foo', value=1).add().commit()
+        # When the job is running.
+        cherrypy.metadata_index.metadata_index_job()
+        # Then every backup get summarized
+        repo = RepoObject.get_repo('admin/testcases', UserObject.get_user(self.USERNAME))
+        self.assertEqual(
+            {entry.date.epoch for entry in repo.file_statistics}, FileStatisticsSummary.get_backup_dates(repo)
+        )
+        # Then the largest files are recorded
+        summary = FileStatisticsSummary.get_summary(repo, repo.file_statistics[-1].date)
+        self.assertEqual(
+            (b'\xec\x9d\xb4\xeb\xa3\xa8\xeb\xa7\x88 YIRUMA - River Flows in You.mp3', 3636731),
+            summary['size'][0],
+        )
+        self.assertEqual([(b'Char ;059090 to quote', 2915)], summary['folder_increment_size'])
+
+    def test_error_log(self):
+        # Given a repository with errors in the last backup
+        userobj = UserObject.get_user(self.USERNAME)
+        repo = RepoObject.get_repo('admin/testcases', userobj)
+        with open(repo.error_log[-1].path, 'wb') as f:
+            f.write(
+                b"ListError: 'Revisions/Data' [Errno 13] Permission denied: b'Revisions/Data'\n"
+                b"UpdateError Fichier @ <root> Updated mirror temp file does not match source\n"
+            )
+        # When the job is running.
+        cherrypy.metadata_index.metadata_index_job()
+        # Then errors are recorded
+        self.assertEqual(
+            [
+                ('ListError', 'Revisions/Data', "[Errno 13] Permission denied: b'Revisions/Data'"),
+                ('UpdateError', 'Fichier', '@ <root> Updated mirror temp file does not match source'),
+            ],
+            ErrorLog.query.with_entities(ErrorLog.error_class, ErrorLog.path, ErrorLog.message)
+            .order_by(ErrorLog.id)
+            .all(),
+        )
+        # When the job is running again
+        cherrypy.metadata_index.metadata_index_job()
+        # Then errors are not recorded twice
+        self.assertEqual(2, ErrorLog.query.count())
@@ -0,0 +1,149 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import cherrypy
+
+from rdiffweb.core.librdiff import RdiffRepo
+from rdiffweb.core.repocache import RepoCache
+
+
+class RepoCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='rdiffweb_tests_')
+        self.cache = RepoCache(cherrypy.engine)
+        self.data_path = os.path.join(self.temp_dir, 'repo1', 'rdiff-backup-data').encode()
+        os.makedirs(self.data_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _touch(self, path):
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1000000))
+
+    def test_get(self):
+        # Given an empty cache
+        # When getting metadata twice
+        metadata = self.cache.get(self.data_path)
+        self.assertEqual('foo', metadata.get('key', lambda: 'foo'))
+        # Then the same metadata is returned
+        self.assertIs(metadata, self.cache.get(self.data_path))
+        self.assertEqual('foo', self.cache.get(self.data_path).get('key', lambda: self.fail('should be cached')))
+        self.assertEqual(2, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+        self.assertEqual(1, len(self.cache))
+
+    def test_get_with_mtime_changed(self):
+        # Given cached metadata
+        metadata = self.cache.get(self.data_path)
+        metadata.get('key', lambda: 'foo')
+        # When rdiff-backup-data get updated
+        self._touch(self.data_path)
+        # Then new metadata is returned
+        new_metadata = self.cache.get(self.data_path)
+        self.assertIsNot(metadata, new_metadata)
+        self.assertEqual('bar', new_metadata.get('key', lambda: 'bar'))
+        self.assertEqual(2, self.cache.misses)
+
+    def test_get_with_previous(self):
+        # Given cached metadata
+        self.cache.get(self.data_path).get('key', lambda: 'foo')
+        # When rdiff-backup-data get updated
+        self._touch(self.data_path)
+        # Then previous value is available until computed again.
+        metadata = self.cache.get(self.data_path)
+        self.assertEqual('foo', metadata.previous.get('key'))
+        metadata.get('key', lambda: 'bar')
+        self.assertNotIn('key', metadata.previous)
+
+    def test_size(self):
+        # Given cached metadata
+        metadata = self.cache.get(self.data_path)
+        # When computing values
+        metadata.get('key1', lambda: [b'%d' % i for i in range(100)])
+        size = metadata.size
+        metadata.get('key2', lambda: b'foo')
+        # Then the size is increased by the size of the new value only
+        self.assertGreater(size, 0)
+        self.assertGreater(metadata.size, size)
+        # When removing a value
+        metadata.pop('key2')
+        # Then its size is removed
+        self.assertEqual(size, metadata.size)
+
+    def test_get_not_found(self):
+        # Given a repository that doesn't exists
+        data_path = os.path.join(self.temp_dir, 'invalid', 'rdiff-backup-data').encode()
+        # When getting metadata
+        metadata = self.cache.get(data_path)
+        # Then metadata is not kept in cache
+        self.assertIsNotNone(metadata)
+        self.assertEqual(0, len(self.cache))
+
+    def test_invalidate(self):
+        # Given cached metadata
+        metadata = self.cache.get(self.data_path)
+        # When invalidating the cache
+        self.cache.invalidate(self.data_path)
+        # Then new metadata is returned
+        self.assertIsNot(metadata, self.cache.get(self.data_path))
+
+    def test_evict(self):
+        # Given a cache with limited size
+        self.cache.max_size = 16 * 1024
+        data_path2 = os.path.join(self.temp_dir, 'repo2', 'rdiff-backup-data').encode()
+        os.makedirs(data_path2)
+        # When adding metadata larger than the limit
+        self.cache.get(self.data_path).get('entries', lambda: [b'%d' % i for i in range(1000)])
+        self.cache.get(data_path2)
+        # Then least recently used metadata get evicted
+        self.assertEqual(1, len(self.cache))
+        self.assertEqual(1, self.cache.evictions)
+        self.assertEqual(0, self.cache.hits)
+        self.cache.get(data_path2)
+        self.assertEqual(1, self.cache.hits)
+
+    def test_evict_when_growing(self):
+        # Given a cache with limited size holding two repositories
+        self.cache.max_size = 16 * 1024
+        data_path2 = os.path.join(self.temp_dir, 'repo2', 'rdiff-backup-data').encode()
+        os.makedirs(data_path2)
+        metadata1 = self.cache.get(self.data_path)
+        metadata2 = self.cache.get(data_path2)
+        self.assertEqual(2, len(self.cache))
+        # When metadata grows after being added to the cache
+        metadata2.get('entries', lambda: [b'%d' % i for i in range(1000)])
+        # Then least recently used metadata get evicted
+        self.assertEqual(1, len(self.cache))
+        self.assertEqual(1, self.cache.evictions)
+        self.assertIs(metadata2, self.cache.get(data_path2))
+        self.assertIsNot(metadata1, self.cache.get(self.data_path))
+
+    def test_shared_between_repos(self):
+        # Given two instances of the same repository
+        repo1 = RdiffRepo(os.path.join(self.temp_dir, 'repo1'), encoding='utf-8')
+        repo2 = RdiffRepo(os.path.join(self.temp_dir, 'repo1'), encoding='utf-8')
+        # When listing the metadata
+        # Then the same listing is shared
+        self.assertIs(repo1._entries, repo2._entries)
+        # When clearing the cache
+        repo1.clear_cache()
+        # Then a new listing is made
+        self.assertIsNot(repo2._entries, repo1._entries)
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+import gzip
 import io
 import os
 import tarfile
@@ -22,8 +23,16 @@ import unittest
 from zipfile import ZipFile
 
 import rdiffweb.test
-from rdiffweb.core.librdiff import find_rdiff_backup
-from rdiffweb.core.restore import RestoreException, _restore, pipe_restore
+from rdiffweb.core.librdiff import find_rdiff_backup, unquote
+from rdiffweb.core.restore import (
+    ARCHIVERS,
+    CompressProcess,
+    ParallelGzipWriter,
+    RestoreException,
+    _restore,
+    pipe_archive,
+    pipe_restore,
+)
 
 EXPECTED = {}
 EXPECTED["이루마 YIRUMA - River Flows in You.mp3"] = 3636731
@@ -59,7 +68,7 @@ TAR_EXPECTED["SymlinkToSubdirectory"] = 0
 TAR_EXPECTED["Fichier avec non asci char \udcc9velyne M\udce8re.txt"] = 18
 
 
-class RestoreTest(rdiffweb.test.WebCase):
+class AbstractArchiveTest(rdiffweb.test.WebCase):
     maxDiff = None
 
     def setUp(self):
@@ -69,9 +78,6 @@ class RestoreTest(rdiffweb.test.WebCase):
         self.path = os.path.join(self.testcases.encode('ascii'), b'testcases')
         assert os.path.isdir(self.path)
 
-        # Define location of rdiff-backup
-        self.rdiff_backup = find_rdiff_backup()
-
     def assertInZip(self, expected_files, filename, equal=True):
         """
         Check if the given `expected_files` exists in the Zip archive.
@@ -142,6 +148,14 @@ class RestoreTest(rdiffweb.test.WebCase):
             for expected_file in expected_files:
                 self.assertIn(expected_file, actual)
 
+
+class RestoreTest(AbstractArchiveTest):
+    def setUp(self):
+        super().setUp()
+
+        # Define location of rdiff-backup
+        self.rdiff_backup = find_rdiff_backup()
+
     def test_restore_pipe_zip_file(self):
         """
         Check creation of a zip trough a pipe.
@@ -359,3 +373,139 @@ class RestoreTest(rdiffweb.test.WebCase):
 
 if __name__ == "__main__":
     unittest.main()
+
+
+class ArchiveTest(AbstractArchiveTest):
+    """
+    Archive the mirror directly, doesn't require rdiff-backup.
+    """
+
+    def test_pipe_archive_zip(self):
+        # Given the mirror of a repository
+        # When archiving the mirror
+        fileobj = pipe_archive(self.path, kind='zip', encoding='utf-8', exclude=[b'rdiff-backup-data'], unquote=unquote)
+        # Then the archive is the same as restoring the last backup
+        self.assertInZip(ZIP_EXPECTED, fileobj)
+
+    def test_pipe_archive_tar_gz(self):
+        # Given the mirror of a repository
+        # When archiving the mirror
+        fileobj = pipe_archive(
+            self.path, kind='tar.gz', encoding='utf-8', exclude=[b'rdiff-backup-data'], unquote=unquote
+        )
+        # Then the archive is the same as restoring the last backup
+        self.assertInTar(TAR_EXPECTED, fileobj, mode='r|gz')
+
+    def test_pipe_archive_subfolder(self):
+        # Given a folder with quoted characters
+        # When archiving the folder
+        fileobj = pipe_archive(
+            os.path.join(self.path, b'Char ;059090 to quote'), kind='tar', encoding='utf-8', unquote=unquote
+        )
+        # Then the archive contains the folder content
+        self.assertInTar({'Data': 21, 'Untitled Testcase.doc': 14848}, fileobj, mode='r|')
+
+    def test_pipe_archive_tar_gz_with_compression(self):
+        # Given compression settings
+        compression = {'level': 1, 'threads': 1}
+        # When archiving the mirror
+        fileobj = pipe_archive(
+            self.path,
+            kind='tar.gz',
+            encoding='utf-8',
+            exclude=[b'rdiff-backup-data'],
+            unquote=unquote,
+            compression=compression,
+        )
+        # Then the archive is valid
+        self.assertInTar(TAR_EXPECTED, fileobj, mode='r|gz')
+
+    def test_pipe_archive_tar_gz_with_threads(self):
+        # Given compression with multiple threads
+        compression = {'level': 6, 'threads': 4}
+        # When archiving the mirror
+        fileobj = pipe_archive(
+            self.path,
+            kind='tar.gz',
+            encoding='utf-8',
+            exclude=[b'rdiff-backup-data'],
+            unquote=unquote,
+            compression=compression,
+        )
+        # Then the archive is valid
+        self.assertInTar(TAR_EXPECTED, fileobj, mode='r|gz')
+
+    @unittest.skipIf('tar.zst' not in ARCHIVERS, 'zstandard not installed')
+    def test_pipe_archive_tar_zst(self):
+        import zstandard
+
+        # Given the mirror of a repository
+        # When archiving the mirror as zstd
+        fileobj = pipe_archive(
+            self.path, kind='tar.zst', encoding='utf-8', exclude=[b'rdiff-backup-data'], unquote=unquote
+        )
+        # Then the archive is valid
+        with zstandard.ZstdDecompressor().stream_reader(fileobj) as reader:
+            self.assertInTar(TAR_EXPECTED, reader, mode='r|')
+
+
+class CompressProcessTest(unittest.TestCase):
+    def _compress(self, data, compression):
+        with tempfile.TemporaryFile() as out:
+            out.write(b'header\n')
+            writer = CompressProcess(out, compression, threads=2)
+            for i in range(0, len(data), 10000):
+                writer.write(data[i : i + 10000])
+            writer.close()
+            out.seek(0)
+            return out.read()
+
+    def test_write_gz(self):
+        # Given data larger than a block
+        data = b''.join(b'line %d of data\n' % i for i in range(100000))
+        # When compressing in a separate process
+        value = self._compress(data, 'gz')
+        # Then data previously written is kept
+        self.assertTrue(value.startswith(b'header\n'))
+        # Then the result is a valid gzip stream
+        self.assertEqual(data, gzip.decompress(value[len(b'header\n') :]))
+
+    @unittest.skipIf('tar.zst' not in ARCHIVERS, 'zstandard not installed')
+    def test_write_zst(self):
+        import zstandard
+
+        # Given data larger than a block
+        data = b''.join(b'line %d of data\n' % i for i in range(100000))
+        # When compressing in a separate process
+        value = self._compress(data, 'zst')
+        # Then the result is a valid zstd stream
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(value[len(b'header\n') :])) as reader:
+            self.assertEqual(data, reader.read())
+
+
+class ParallelGzipWriterTest(unittest.TestCase):
+    def _compress(self, data, threads):
+        out = io.BytesIO()
+        writer = ParallelGzipWriter(out, level=6, threads=threads)
+        # Write in chunks of various size.
+        for i in range(0, len(data), 10000):
+            writer.write(data[i : i + 10000])
+        writer.close()
+        return out.getvalue()
+
+    def test_write(self):
+        # Given data larger than a block
+        data = b''.join(b'line %d of data\n' % i for i in range(100000)) + os.urandom(300000)
+        for threads in [1, 4]:
+            # When compressing the data
+            compressed = self._compress(data, threads)
+            # Then the result is a valid gzip stream
+            self.assertEqual(data, gzip.decompress(compressed))
+            self.assertLess(len(compressed), len(data))
+
+    def test_write_empty(self):
+        # Given no data
+        # When compressing
+        compressed = self._compress(b'', 4)
+        # Then the result is a valid gzip stream
+        self.assertEqual(b'', gzip.decompress(compressed))
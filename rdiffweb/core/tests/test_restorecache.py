@@ -0,0 +1,249 @@
+# rdiffweb, A web interface to rdiff-backup repositories
+# Copyright (C) 2012-2025 rdiffweb contributors
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import cherrypy
+
+from rdiffweb.core.restorecache import CHUNK_SIZE, RestoreCache
+
+
+class _FakeRestore(io.BytesIO):
+    def __init__(self, data, returncode=0):
+        super().__init__(data)
+        self._returncode = returncode
+        self.returncode = None
+
+    def seekable(self):
+        return False
+
+    def close(self):
+        self.returncode = self._returncode
+        super().close()
+
+
+class RestoreCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix='rdiffweb_tests_')
+        self.cache = RestoreCache(cherrypy.engine)
+        self.cache.cache_dir = self.temp_dir
+        self.cache.max_size = 1024
+        self.restore_count = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _open(self, key, data, returncode=0):
+        def restore_func():
+            self.restore_count += 1
+            return _FakeRestore(data, returncode)
+
+        return self.cache.open(key, restore_func)
+
+    def _restore(self, key, data, returncode=0, read_all=True):
+        with self._open(key, data, returncode) as fileobj:
+            if read_all:
+                return b''.join(iter(lambda: fileobj.read(100), b''))
+            return fileobj.read(10)
+
+    def test_open_without_cache_dir(self):
+        # Given a cache without folder
+        self.cache.cache_dir = None
+        # When restoring twice the same file
+        self.assertEqual(b'data', self._restore('key', b'data'))
+        self.assertEqual(b'data', self._restore('key', b'data'))
+        # Then restore is executed twice
+        self.assertEqual(2, self.restore_count)
+        self.assertEqual([], os.listdir(self.temp_dir))
+
+    def test_open_without_cache_dir_streamed(self):
+        # Given a cache without folder
+        self.cache.cache_dir = None
+        # When restoring a file
+        with self._open('key', b'data') as fileobj:
+            # Then the output of the restore is returned without spool
+            self.assertIsInstance(fileobj, _FakeRestore)
+            self.assertEqual(b'data', fileobj.read())
+
+    def test_open(self):
+        # Given a completed restore
+        with self._open('key', b'a' * 500) as f:
+            self.assertEqual(b'a' * 500, f.read())
+            etag = f.etag
+        # When opening the same key
+        with self._open('key', b'') as f:
+            # Then the content is read from cache
+            self.assertTrue(f.seekable())
+            self.assertEqual(b'a' * 500, f.read())
+            # Then the content keeps the same etag
+            self.assertEqual(etag, f.etag)
+        self.assertEqual(1, self.restore_count)
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(1, self.cache.misses)
+        # Then no temporary file remains
+        self.assertEqual(1, len(os.listdir(self.temp_dir)))
+
+    def test_open_with_interrupted_restore(self):
+        # Given a download interrupted before the end
+        self._restore('key', b'a' * 500, read_all=False)
+        # Then restore is completed in background and kept in cache
+        entry = os.path.join(self.temp_dir.encode(), self.cache._get_digest('key'))
+        for unused in range(100):
+            if os.path.exists(entry):
+                break
+            time.sleep(0.01)
+        self.assertEqual(b'a' * 500, self._restore('key', b''))
+        self.assertEqual(1, self.restore_count)
+
+    def test_open_with_interrupted_restore_without_cache_dir(self):
+        # Given a cache without folder
+        self.cache.cache_dir = None
+        # Given a download interrupted before the end
+        self._restore('key', b'a' * 500, read_all=False)
+        # Then next download restore the file again
+        self.assertEqual(b'a' * 500, self._restore('key', b'a' * 500))
+        self.assertEqual(2, self.restore_count)
+
+    def test_seek(self):
+        # Given a restore in progress
+        with self._open('key', b'0123456789') as reader:
+            self.assertFalse(reader.seekable())
+            # When reading the whole restore
+            self.assertEqual(b'0123456789', reader.read())
+            self.assertEqual(b'', reader.read())
+            # Then the reader is seekable
+            self.assertTrue(reader.seekable())
+            self.assertEqual(10, os.fstat(reader.fileno()).st_size)
+            reader.seek(5)
+            self.assertEqual(b'56789', reader.read())
+
+    def test_read_all(self):
+        # Given a restore in progress larger than a chunk
+        data = b'a' * (CHUNK_SIZE * 3)
+        with self._open('key', data) as reader:
+            # When reading without size
+            self.assertEqual(data, reader.read())
+            # Then the restore is completed
+            self.assertTrue(reader.seekable())
+
+    def test_open_with_failed_restore(self):
+        # Given a restore process returning an error
+        self._restore('key', b'a' * 500, returncode=1)
+        # Then nothing is cached
+        self.assertEqual([], os.listdir(self.temp_dir))
+
+    def test_open_with_entry_too_large(self):
+        # Given a restore larger than the cache
+        self.assertEqual(b'a' * 2000, self._restore('key', b'a' * 2000))
+        # Then nothing is cached
+        self.assertEqual([], os.listdir(self.temp_dir))
+
+    def test_open_with_restore_error(self):
+        # Given a restore failing to start
+        def restore_func():
+            raise ValueError('fail')
+
+        # When opening the restore
+        # Then the error is raised
+        with self.assertRaises(ValueError):
+            self.cache.open('key', restore_func)
+        # Then next restore is executed
+        self.assertEqual(b'data', self._restore('key', b'data'))
+
+    def test_open_coalesced(self):
+        # Given a restore in progress
+        data = os.urandom(300000)
+        reader1 = self._open('key', data)
+        self.assertEqual(data[0:100], reader1.read(100))
+        # When the same restore is requested
+        reader2 = self._open('key', data)
+        # Then the restore is shared
+        self.assertEqual(1, self.restore_count)
+        self.assertEqual(1, self.cache.coalesced)
+        # Then each reader get the whole content
+        self.assertEqual(data, b''.join(iter(lambda: reader2.read(1000), b'')))
+        self.assertEqual(data[100:], reader1.read())
+        self.assertEqual(b'', reader1.read())
+        reader1.close()
+        reader2.close()
+
+    def test_open_coalesced_with_first_reader_closed(self):
+        # Given two readers of the same restore
+        data = os.urandom(300000)
+        reader1 = self._open('key', data)
+        reader2 = self._open('key', data)
+        reader1.read(100)
+        # When the first reader is closed
+        reader1.close()
+        # Then second reader get the whole content
+        with reader2:
+            self.assertEqual(data, b''.join(iter(lambda: reader2.read(1000), b'')))
+        self.assertEqual(1, self.restore_count)
+
+    def test_open_coalesced_while_starting(self):
+        # Given a restore taking time to start
+        started = threading.Event()
+        resume = threading.Event()
+
+        def restore_func():
+            self.restore_count += 1
+            started.set()
+            resume.wait()
+            return _FakeRestore(b'data')
+
+        results = []
+
+        def download():
+            with self.cache.open('key', restore_func) as f:
+                results.append(f.read())
+
+        thread1 = threading.Thread(target=download)
+        thread1.start()
+        started.wait()
+        # When the same restore is requested
+        thread2 = threading.Thread(target=download)
+        thread2.start()
+        while not self.cache.coalesced:
+            time.sleep(0.01)
+        resume.set()
+        thread1.join()
+        thread2.join()
+        # Then a single restore is executed
+        self.assertEqual(1, self.restore_count)
+        self.assertEqual([b'data', b'data'], results)
+
+    def test_eviction(self):
+        # Given a cache with two entries
+        self._restore('key1', b'a' * 400)
+        self._restore('key2', b'b' * 400)
+        # Given the first entry was recently used
+        entry1 = os.path.join(self.temp_dir.encode(), self.cache._get_digest('key1'))
+        entry2 = os.path.join(self.temp_dir.encode(), self.cache._get_digest('key2'))
+        os.utime(entry2, ns=(0, os.stat(entry1).st_mtime_ns - 1000000))
+        self._open('key1', b'').close()
+        # When adding a third entry exceeding the size limit
+        self._restore('key3', b'c' * 400)
+        # Then least recently used entry is deleted
+        self.assertTrue(os.path.exists(entry1))
+        self.assertFalse(os.path.exists(entry2))
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir.encode(), self.cache._get_digest('key3'))))
+        self.assertEqual(1, self.cache.evictions)
@@ -18,6 +18,7 @@ import importlib.resources
 import json
 import logging
 import os
+from collections.abc import Iterator
 from datetime import datetime, timezone
 
 import cherrypy
@@ -46,10 +47,16 @@ from cherrypy_foundation.url import url_for
 
 import rdiffweb
 import rdiffweb.controller.filter_authorization
+import rdiffweb.core.dircache
 import rdiffweb.core.diskusage
+import rdiffweb.core.filename_index
+import rdiffweb.core.indexcache
+import rdiffweb.core.metadata_index
 import rdiffweb.core.notification
 import rdiffweb.core.quota
 import rdiffweb.core.remove_older
+import rdiffweb.core.repocache
+import rdiffweb.core.restorecache
 import rdiffweb.tools.enrich_session
 import rdiffweb.tools.errors
 import rdiffweb.tools.poppath
@@ -69,6 +76,7 @@ from rdiffweb.controller.page_mfa import MfaPage
 from rdiffweb.controller.page_prefs import PreferencesPage
 from rdiffweb.controller.page_repo_activity import RepoActivityPage
 from rdiffweb.controller.page_restore import RestorePage
+from rdiffweb.controller.page_search import SearchPage
 from rdiffweb.controller.page_settings import SettingsPage
 from rdiffweb.controller.page_stats import StatsPage
 from rdiffweb.controller.static import Static
@@ -91,22 +99,102 @@ cherrypy.config.environments['development'] = {
 }
 
 
+# Size of the chunks sent to the client when streaming JSON.
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def _json_default(o):
+    if isinstance(o, RdiffTime):
+        return str(o)
+    elif isinstance(o, datetime):
+        return str(RdiffTime(o))
+    raise TypeError(repr(o) + " is not JSON serializable")
+
+
+def _is_lazy(value):
+    """
+    Return True if the value is an iterator or a dict with iterator values.
+    """
+    if isinstance(value, dict):
+        return any(isinstance(v, Iterator) for v in value.values())
+    return isinstance(value, Iterator)
+
+
+def _iterencode(value, encoder):
+    """
+    Encode the value as JSON. Iterators are encoded as arrays one item at a time.
+    """
+    if isinstance(value, Iterator):
+        yield '['
+        for i, item in enumerate(value):
+            if i:
+                yield ', '
+            yield from _iterencode(item, encoder)
+        yield ']'
+    elif _is_lazy(value):
+        yield '{'
+        for i, (key, item) in enumerate(value.items()):
+            if i:
+                yield ', '
+            yield encoder.encode(key if isinstance(key, str) else encoder.encode(key))
+            yield ': '
+            yield from _iterencode(item, encoder)
+        yield '}'
+    else:
+        yield from encoder.iterencode(value)
+
+
+def _encode_chunks(value, encoder):
+    buf = []
+    size = 0
+    for chunk in _iterencode(value, encoder):
+        chunk = chunk.encode('utf-8')
+        buf.append(chunk)
+        size += len(chunk)
+        if size >= JSON_CHUNK_SIZE:
+            yield b''.join(buf)
+            buf = []
+            size = 0
+    if buf:
+        yield b''.join(buf)
+
+
+def _stream_json(value, encoder):
+    """
+    Encode the value as JSON in chunks. The first chunk is encoded before the
+    response is started so an error raised early by the generator is reported
+    with a proper HTTP status.
+    """
+    chunks = _encode_chunks(value, encoder)
+    first = next(chunks, None)
+
+    def _stream():
+        if first is not None:
+            yield first
+        try:
+            yield from chunks
+        except Exception:
+            # Status is already sent. Abort the response to let the client
+            # know the JSON document is truncated.
+            logger.exception('fail to stream JSON response')
+            raise
+
+    return _stream()
+
+
 def _json_handler(*args, **kwargs):
     """
     Custom json handle to convert RdiffDate to string as isoformat and to use "json" instead of simplejson.
+
+    Handlers may return a generator, or a dict of generators, to stream a
+    large JSON array without building it in memory.
     """
     value = cherrypy.serving.request._json_inner_handler(*args, **kwargs)
-
-    def default(o):
-        if isinstance(o, RdiffTime):
-            return str(o)
-        elif isinstance(o, datetime):
-            return str(RdiffTime(o))
-        raise TypeError(repr(o) + " is not JSON serializable")
-
-    encode = json.JSONEncoder(default=default, ensure_ascii=False).iterencode
-    for chunk in encode(value):
-        yield chunk.encode('utf-8')
+    encoder = json.JSONEncoder(default=_json_default, ensure_ascii=False)
+    if _is_lazy(value):
+        cherrypy.serving.response.stream = True
+        return _stream_json(value, encoder)
+    return (chunk.encode('utf-8') for chunk in encoder.iterencode(value))
 
 
 def _template_processor():
@@ -180,6 +268,7 @@ class Root:
         self.delete = DeletePage()
         self.restore = RestorePage()
         self.history = HistoryPage()
+        self.search = SearchPage()
         self.stats = StatsPage()
         self.admin = AdminPage()
         self.prefs = PreferencesPage()
@@ -328,6 +417,19 @@ class RdiffwebApp(Application):
                 'smtp.encryption': cfg.email_encryption,
                 # Configre diskusage
                 'diskusage.execution_time': self.cfg.disk_usage_time,
+                # Configure index cache
+                'indexcache.cache_dir': self.cfg.cache_dir,
+                'metadata_index.interval': self.cfg.metadata_index_interval * 60,
+                'metadata_index.top_count': self.cfg.top_files_count,
+                'metadata_index.top_depth': self.cfg.top_folders_depth,
+                'filename_index.interval': self.cfg.filename_index_interval * 60,
+                'repocache.max_size': self.cfg.repo_cache_size * 1024 * 1024,
+                'dircache.max_size': self.cfg.dir_cache_size * 1024 * 1024,
+                'dircache.max_entries': self.cfg.dir_cache_entries,
+                'restore_cache.cache_dir': self.cfg.restore_cache_dir,
+                'restore_cache.max_size': self.cfg.restore_cache_size * 1024 * 1024,
+                'archive.compression_level': self.cfg.restore_compression_level,
+                'archive.compression_threads': self.cfg.restore_compression_threads,
                 # Configure remove_older plugin
                 'remove_older.execution_time': self.cfg.remove_older_time,
                 # Configure notification plugin
@@ -15,10 +15,73 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import json
+import unittest
+
 import rdiffweb.test
+from rdiffweb.core.librdiff import RdiffTime
+from rdiffweb.rdw_app import _json_default, _stream_json
 
 
 class AppTest(rdiffweb.test.WebCase):
     def test_version(self):
         """Verify return value of version."""
         self.assertIsNotNone(self.app.version)
+
+
+class StreamJsonTest(unittest.TestCase):
+    def _encode(self, value):
+        encoder = json.JSONEncoder(default=_json_default, ensure_ascii=False)
+        return list(_stream_json(value, encoder))
+
+    def test_stream_generator(self):
+        # Given a generator
+        value = ({'name': 'é%d' % i, 'date': RdiffTime(1414967021)} for i in range(3))
+        # When encoding as json
+        data = b''.join(self._encode(value))
+        # Then the generator is encoded as a list
+        self.assertEqual([{'name': 'é%d' % i, 'date': str(RdiffTime(1414967021))} for i in range(3)], json.loads(data))
+
+    def test_stream_dict_of_generator(self):
+        # Given a dict with a generator
+        value = {'data': iter([1, 2]), 'next': None, 1: True}
+        # When encoding as json
+        data = b''.join(self._encode(value))
+        # Then the output is the same as the one of json
+        self.assertEqual(json.dumps({'data': [1, 2], 'next': None, 1: True}).encode(), data)
+
+    def test_stream_chunks(self):
+        # Given a large generator
+        value = ('x' * 1000 for i in range(200))
+        # When encoding as json
+        chunks = self._encode(value)
+        # Then data is sent in multiple chunks
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(200, len(json.loads(b''.join(chunks))))
+
+    def test_stream_error_before_first_chunk(self):
+        # Given a generator raising an error before the first chunk
+        def value():
+            yield 1
+            raise ValueError('error')
+
+        encoder = json.JSONEncoder(default=_json_default, ensure_ascii=False)
+        # When encoding as json
+        # Then the error is raised before the response is started
+        with self.assertRaises(ValueError):
+            _stream_json(value(), encoder)
+
+    def test_stream_error_mid_stream(self):
+        # Given a generator raising an error after the first chunk
+        def value():
+            for i in range(200):
+                yield 'x' * 1000
+            raise ValueError('error')
+
+        encoder = json.JSONEncoder(default=_json_default, ensure_ascii=False)
+        chunks = _stream_json(value(), encoder)
+        # When streaming the response
+        # Then the error is logged and raised to abort the response
+        with self.assertLogs('rdiffweb.rdw_app', level='ERROR'):
+            with self.assertRaises(ValueError):
+                list(chunks)